@@ -0,0 +1,54 @@
+"""
+Memory held by 1k concurrent 500-week SimulationEngine runs (all stepped
+week by week, as a server would), with agent history in preallocated int32
+arrays. The dict-of-lists history the agents used to keep is measured by
+materializing it with history.to_dict() for every agent.
+
+Run from the backend folder: python -m benchmarks.bench_agent_memory
+"""
+import contextlib
+import io
+import time
+import tracemalloc
+from simulation.engine import SimulationEngine
+from .bench_batch_engine import make_demand
+
+
+def run(num_runs: int = 1000, num_weeks: int = 500):
+    demand = make_demand(num_runs, num_weeks, seed=3).T.tolist()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engines = [SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=num_weeks) for _ in range(num_runs)]
+    for week, week_demand in enumerate(demand, start=1):
+        for engine, customer_demand in zip(engines, week_demand):
+            engine.run_step(week, customer_demand)
+    elapsed = time.perf_counter() - start
+    engines_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    history_bytes = sum(agent.history.nbytes for engine in engines for agent in engine.agents)
+
+    # What the old per-agent dict of growing lists held for the same runs
+    before, _ = tracemalloc.get_traced_memory()
+    legacy = [{agent.name: agent.history.to_dict() for agent in engine.agents} for engine in engines]
+    legacy_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del legacy
+
+    print(f"{num_runs} runs x {num_weeks} weeks stepped in {elapsed:.1f}s")
+    print(f"  engines held:      {engines_bytes / 1e6:8.1f} MB (peak {peak_bytes / 1e6:.1f} MB)")
+    print(f"  array history:     {history_bytes / 1e6:8.1f} MB")
+    print(f"  dict-of-lists:     {legacy_bytes / 1e6:8.1f} MB")
+    print(f"  peak per run:      {peak_bytes / num_runs / 1e3:8.1f} KB")
+    return {
+        "seconds": elapsed,
+        "engines_mb": engines_bytes / 1e6,
+        "peak_mb": peak_bytes / 1e6,
+        "peak_kb_per_run": peak_bytes / num_runs / 1e3,
+        "array_history_mb": history_bytes / 1e6,
+        "list_history_mb": legacy_bytes / 1e6,
+    }
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,87 @@
+"""
+Per-step latency of AI chains: the legacy one-DataFrame-per-agent predict,
+SimulationEngine with per-agent and batched inference, and the batch engine
+predicting every AI order of many chains in one call. Also checks that all
+paths produce the same orders.
+
+Run from the backend folder: python -m benchmarks.bench_ai_inference
+"""
+import time
+import numpy as np
+import pandas as pd
+from simulation.engine import SimulationEngine
+from simulation.batch_engine import BatchSimulationEngine, TIER_NAMES
+from simulation.ai_agent import FEATURE_NAMES
+from simulation.model_registry import MODEL_REGISTRY
+from .bench_batch_engine import make_demand
+
+ALL_AI = {name: 'AI' for name in TIER_NAMES}
+
+
+def legacy_predict(model, agent):
+    # What AIAgent.place_upstream_order did before the batched stage
+    row = pd.DataFrame([agent.features()], columns=FEATURE_NAMES)
+    return max(0, int(model.predict(row)[0]))
+
+
+def step_latency(batch_inference: bool, demand: np.ndarray):
+    engine = SimulationEngine(agent_config=ALL_AI, enable_analyst=False, batch_inference=batch_inference)
+    start = time.perf_counter()
+    for week, customer_demand in enumerate(demand.tolist(), start=1):
+        engine.run_step(week, customer_demand)
+    return (time.perf_counter() - start) / len(demand), engine
+
+
+def check_equivalence(model, num_chains: int = 20, num_weeks: int = 60):
+    demand = make_demand(num_chains, num_weeks, seed=2)
+    batch = BatchSimulationEngine(num_chains, record_history=True, num_weeks=num_weeks,
+                                  agent_config=ALL_AI, model=model)
+    batch.run(demand)
+    for n in range(num_chains):
+        _, per_agent = step_latency(False, demand[n])
+        _, batched = step_latency(True, demand[n])
+        for i, (a, b) in enumerate(zip(per_agent.agents, batched.agents)):
+            assert a.history['placed_order_amount'] == b.history['placed_order_amount'], a.name
+            assert a.history['placed_order_amount'] == batch.history['placed_order_amount'][:, n, i].tolist(), a.name
+
+
+def run(num_weeks: int = 100, batch_chains: int = 10_000):
+    model = MODEL_REGISTRY.get()
+    if model is None:
+        return {}
+    check_equivalence(model)
+    print("Equivalence check passed: per-agent, batched and batch-engine orders match.")
+
+    engine = SimulationEngine(agent_config=ALL_AI, enable_analyst=False)
+    ai_agents = [agent for agent in engine.agents if agent.uses_model]
+    start = time.perf_counter()
+    for _ in range(num_weeks):
+        for agent in ai_agents:
+            legacy_predict(model, agent)
+    legacy = (time.perf_counter() - start) / num_weeks
+
+    demand = make_demand(1, num_weeks)[0]
+    per_agent, _ = step_latency(False, demand)
+    batched, _ = step_latency(True, demand)
+
+    demand = make_demand(batch_chains, num_weeks)
+    batch = BatchSimulationEngine(batch_chains, agent_config=ALL_AI, model=model)
+    start = time.perf_counter()
+    batch.run(demand)
+    batch_step = (time.perf_counter() - start) / num_weeks
+
+    print(f"Legacy DataFrame predicts only   : {legacy * 1e3:8.3f} ms/step")
+    print(f"SimulationEngine, per-agent      : {per_agent * 1e3:8.3f} ms/step")
+    print(f"SimulationEngine, batched        : {batched * 1e3:8.3f} ms/step")
+    print(f"BatchSimulationEngine ({batch_chains} chains): {batch_step * 1e3:8.3f} ms/step "
+          f"({batch_step / batch_chains * 1e6:.2f} us/chain-step)")
+    return {
+        "legacy_predict_ms_per_step": legacy * 1e3,
+        "engine_per_agent_ms_per_step": per_agent * 1e3,
+        "engine_batched_ms_per_step": batched * 1e3,
+        "batch_engine_us_per_chain_step": batch_step / batch_chains * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    run()
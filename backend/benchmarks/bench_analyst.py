@@ -0,0 +1,73 @@
+"""
+Load test for the analyst pipeline: many simulations stepping concurrently on
+one event loop, all using the fake LLM. Compares blocking inline commentary
+(what the server used to do) with AnalystPipeline, reporting the worst event
+loop stall and how much commentary was delivered.
+
+Run from the backend folder: python -m benchmarks.bench_analyst
+"""
+import asyncio
+import time
+from simulation.engine import SimulationEngine
+from simulation.analyst import AnalystPipeline, FakeLLM
+
+DISRUPTION = {"type": "DEMAND_SPIKE", "value": 80, "duration": 5}
+
+
+async def _watch_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _simulation(simulation_id: str, pipeline, blocking_latency: float, num_weeks: int, tick: float):
+    engine = SimulationEngine(agent_config={}, enable_analyst=True)
+    delivered = 0
+    for week in range(1, num_weeks + 1):
+        if week == 20:
+            engine.inject_disruption(DISRUPTION)
+        engine.run_step(week, 20)
+        if pipeline is None:
+            # The old path: a synchronous LLM call per event inside the loop
+            for _ in engine.analyst_requests:
+                time.sleep(blocking_latency)
+                delivered += 1
+        else:
+            for request in engine.analyst_requests:
+                pipeline.submit(simulation_id, request)
+            delivered += len(pipeline.collect(simulation_id))
+        await asyncio.sleep(tick)
+    if pipeline is not None:
+        delivered += len(await pipeline.drain(simulation_id))
+        pipeline.discard(simulation_id)
+    return delivered
+
+
+async def _load_test(num_simulations: int, use_pipeline: bool, latency: float, num_weeks: int, tick: float):
+    pipeline = AnalystPipeline(FakeLLM(latency=latency, jitter=latency / 4, seed=0), max_concurrency=16) if use_pipeline else None
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(_watch_loop_lag(stop))
+    start = time.perf_counter()
+    delivered = await asyncio.gather(*(
+        _simulation(f"sim-{i}", pipeline, latency, num_weeks, tick) for i in range(num_simulations)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await watcher, sum(delivered)
+
+
+def run(num_simulations: int = 20, latency: float = 0.1, num_weeks: int = 50, tick: float = 0.01):
+    results = {}
+    for label, use_pipeline in (("blocking", False), ("pipeline", True)):
+        elapsed, worst_lag, delivered = asyncio.run(_load_test(num_simulations, use_pipeline, latency, num_weeks, tick))
+        print(f"{label:>8}: {elapsed:7.2f}s for {num_simulations} x {num_weeks} weeks | "
+              f"worst loop stall {worst_lag * 1e3:8.1f} ms | commentary delivered {delivered}")
+        results[f"{label}_seconds"] = elapsed
+        results[f"{label}_worst_stall_ms"] = worst_lag * 1e3
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,68 @@
+"""
+Compares BatchSimulationEngine against looping SimulationEngine over the same
+demand, checks the two agree week for week, and reports chain-weeks per second.
+
+Run from the backend folder: python -m benchmarks.bench_batch_engine
+"""
+import time
+import numpy as np
+from simulation.engine import SimulationEngine
+from simulation.batch_engine import BatchSimulationEngine, TIER_NAMES
+
+
+def make_demand(num_chains: int, num_weeks: int, seed: int = 0) -> np.ndarray:
+    """
+    Random demand in the style of data_generator.py: mostly 15-35 with 5% spikes of 50-80.
+    """
+    rng = np.random.default_rng(seed)
+    demand = rng.integers(15, 36, size=(num_chains, num_weeks))
+    spikes = rng.random((num_chains, num_weeks)) < 0.05
+    demand[spikes] = rng.integers(50, 81, size=spikes.sum())
+    return demand
+
+
+def loop_engines(demand: np.ndarray):
+    engines = []
+    for chain_demand in demand:
+        engine = SimulationEngine(agent_config={}, enable_analyst=False)
+        for week, customer_demand in enumerate(chain_demand.tolist(), start=1):
+            engine.run_step(week, customer_demand)
+        engines.append(engine)
+    return engines
+
+
+def check_equivalence(num_chains: int = 50, num_weeks: int = 100):
+    demand = make_demand(num_chains, num_weeks, seed=1)
+    engines = loop_engines(demand)
+    batch = BatchSimulationEngine(num_chains, record_history=True, num_weeks=num_weeks)
+    batch.run(demand)
+    for key in ("inventory", "placed_order_amount", "cost"):
+        expected = np.array([[agent.history[key] for agent in engine.agents] for engine in engines])
+        actual = batch.history[key].transpose(1, 2, 0)
+        assert np.array_equal(expected, actual), f"Batch history '{key}' diverges from SimulationEngine"
+    for i, name in enumerate(TIER_NAMES):
+        assert all(engine.agents[i].backlog == batch.backlog[n, i] for n, engine in enumerate(engines)), name
+
+
+def run(num_chains: int = 10_000, num_weeks: int = 100, loop_chains: int = 100):
+    check_equivalence()
+    print("Equivalence check passed: batch engine matches SimulationEngine (RULE).")
+
+    demand = make_demand(loop_chains, num_weeks)
+    start = time.perf_counter()
+    loop_engines(demand)
+    loop_rate = loop_chains * num_weeks / (time.perf_counter() - start)
+
+    demand = make_demand(num_chains, num_weeks)
+    start = time.perf_counter()
+    BatchSimulationEngine(num_chains).run(demand)
+    batch_rate = num_chains * num_weeks / (time.perf_counter() - start)
+
+    print(f"SimulationEngine loop : {loop_rate:12,.0f} chain-weeks/s ({loop_chains} chains x {num_weeks} weeks)")
+    print(f"BatchSimulationEngine : {batch_rate:12,.0f} chain-weeks/s ({num_chains} chains x {num_weeks} weeks)")
+    print(f"Speed-up              : {batch_rate / loop_rate:12.1f}x")
+    return {"loop_chain_weeks_per_sec": loop_rate, "batch_chain_weeks_per_sec": batch_rate}
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,60 @@
+"""
+A 50-week run with a long bullwhip spell, with and without the commentary
+cache, using the fake LLM: reports LLM calls, wall time and hit/miss counts.
+A second pass against the on-disk tier shows the cache surviving a restart.
+
+Run from the backend folder: python -m benchmarks.bench_commentary_cache
+"""
+import asyncio
+import os
+import tempfile
+import time
+from simulation.engine import SimulationEngine
+from simulation.analyst import AnalystPipeline, CommentaryCache, FakeLLM
+from .bench_analyst import DISRUPTION
+
+
+async def _run(pipeline: AnalystPipeline, num_runs: int, num_weeks: int):
+    async def one(simulation_id: str):
+        engine = SimulationEngine(agent_config={}, enable_analyst=True)
+        for week in range(1, num_weeks + 1):
+            if week == 20:
+                engine.inject_disruption(DISRUPTION)
+            engine.run_step(week, 20)
+            for request in engine.analyst_requests:
+                pipeline.submit(simulation_id, request)
+            pipeline.collect(simulation_id)
+            await asyncio.sleep(0)
+        await pipeline.drain(simulation_id)
+
+    start = time.perf_counter()
+    # Concurrent users running the same scenario
+    await asyncio.gather(*(one(f"sim-{i}") for i in range(num_runs)))
+    return time.perf_counter() - start
+
+
+def run(num_runs: int = 10, num_weeks: int = 50, latency: float = 0.05):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        disk_path = os.path.join(tmp, "commentary.sqlite")
+        cases = (
+            ("no cache", None),
+            ("cache", CommentaryCache(disk_path=disk_path)),
+            ("restart", CommentaryCache(disk_path=disk_path)),
+        )
+        for label, cache in cases:
+            llm = FakeLLM(latency=latency, jitter=0.0)
+            pipeline = AnalystPipeline(llm, max_concurrency=4, cache=cache)
+            elapsed = asyncio.run(_run(pipeline, num_runs, num_weeks))
+            stats = {**cache.stats(), "coalesced": pipeline.coalesced} if cache else {}
+            if cache:
+                # Writes the queued entries out for the restart case
+                cache.close()
+            print(f"{label:>8}: {elapsed:6.2f}s, {llm.calls:4d} LLM calls {stats}")
+            results[f"{label.replace(' ', '_')}_llm_calls"] = llm.calls
+            results[f"{label.replace(' ', '_')}_seconds"] = elapsed
+    return results
+
+
+if __name__ == "__main__":
+    run()
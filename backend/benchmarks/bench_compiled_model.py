@@ -0,0 +1,45 @@
+"""
+Microbenchmark of the compiled NumPy predictor against the sklearn model it was
+exported from: single-row and 10k-row latency, plus the largest difference.
+
+Run from the backend folder: python -m benchmarks.bench_compiled_model
+"""
+import time
+import warnings
+import numpy as np
+from simulation.compiled_model import CompiledTreeEnsemble
+
+
+def _latency(predict, X, repeats: int) -> float:
+    predict(X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict(X)
+    return (time.perf_counter() - start) / repeats
+
+
+def run(model_path: str = 'agent_model.joblib', compiled_path: str = 'agent_model.npz'):
+    import joblib
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    model = joblib.load(model_path)
+    compiled = CompiledTreeEnsemble.load(compiled_path)
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack((rng.integers(-50, 300, 10_000), rng.integers(0, 400, 10_000),
+                         rng.random(10_000) * 120)).astype(np.float64)
+    max_diff = float(np.max(np.abs(model.predict(X) - compiled.predict(X))))
+
+    results = {"max_abs_diff": max_diff}
+    for label, rows, repeats in (("single_row", X[:1], 2000), ("batch_10k", X, 20)):
+        sklearn_s = _latency(model.predict, rows, repeats)
+        compiled_s = _latency(compiled.predict, rows, repeats)
+        print(f"{label:>10}: sklearn {sklearn_s * 1e6:10.1f} us | compiled {compiled_s * 1e6:10.1f} us "
+              f"| {sklearn_s / compiled_s:5.1f}x")
+        results[f"{label}_sklearn_us"] = sklearn_s * 1e6
+        results[f"{label}_compiled_us"] = compiled_s * 1e6
+    print(f"Max abs difference: {max_diff:.3g}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,36 @@
+"""
+Training-data generation throughput (rows per second) for each output
+format data_generator.py supports here, writing to a throwaway directory.
+Demand is seeded so every run generates the same rows.
+
+Run from the backend folder: python -m benchmarks.bench_data_generation
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import tempfile
+import time
+from data_generator import AGENT_NAMES, generate_data
+
+
+def run(num_simulations: int = 50, num_weeks: int = 100):
+    formats = ["npy", "csv"] + (["parquet"] if importlib.util.find_spec("pyarrow") else [])
+    # Every agent but the factory contributes a row per week
+    rows = num_simulations * num_weeks * (len(AGENT_NAMES) - 1)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for output_format in formats:
+            random.seed(0)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_data(os.path.join(tmp, f"data_{output_format}"), output_format, num_simulations, num_weeks)
+            rate = rows / (time.perf_counter() - start)
+            print(f"{output_format:>8}: {rate:12,.0f} rows/s ({rows:,} rows)")
+            results[f"{output_format}_rows_per_sec"] = rate
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,48 @@
+"""
+SimulationEngine steps per second for an all-RULE and an all-AI chain at
+several horizons, stepping week by week as the server does, with the
+analyst off. AI figures are skipped if no agent model is available.
+
+Run from the backend folder: python -m benchmarks.bench_engine
+"""
+import contextlib
+import io
+import time
+from simulation.engine import SimulationEngine
+from simulation.model_registry import MODEL_REGISTRY
+from .bench_batch_engine import make_demand
+
+CONFIGS = {
+    "rule": {},
+    "ai": {"Retailer": "AI", "Wholesaler": "AI", "Distributor": "AI"},
+}
+
+
+def steps_per_sec(agent_config, demand, repeats: int) -> float:
+    best = 0.0
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = SimulationEngine(agent_config=agent_config, enable_analyst=False, num_weeks=len(demand))
+        start = time.perf_counter()
+        for week, customer_demand in enumerate(demand, start=1):
+            engine.run_step(week, customer_demand)
+        best = max(best, len(demand) / (time.perf_counter() - start))
+    return best
+
+
+def run(horizons=(52, 520, 5_200), repeats: int = 3):
+    results = {}
+    for label, agent_config in CONFIGS.items():
+        if agent_config and MODEL_REGISTRY.get() is None:
+            print("No agent model found; skipping AI chains.")
+            continue
+        for num_weeks in horizons:
+            demand = make_demand(1, num_weeks, seed=num_weeks)[0].tolist()
+            rate = steps_per_sec(agent_config, demand, repeats)
+            print(f"{label.upper():>4} chain, {num_weeks:6,d} weeks: {rate:12,.0f} steps/s")
+            results[f"{label}_{num_weeks}w_steps_per_sec"] = rate
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+"""
+Cost of the run_step instrumentation: microseconds per SimulationEngine
+step with instrumentation off and on, and what the disabled probes alone
+cost (the enabled check plus one None test per phase), as a share of a step.
+
+Run from the backend folder: python -m benchmarks.bench_instrumentation
+"""
+import time
+import timeit
+import numpy as np
+from simulation.engine import SimulationEngine
+from simulation.instrumentation import INSTRUMENTS, STEP_PHASES
+
+
+def step_time(enabled: bool, num_weeks: int, repeats: int, demand) -> float:
+    """
+    Best-of-repeats microseconds per step for a fresh RULE chain.
+    """
+    previous = INSTRUMENTS.enabled
+    INSTRUMENTS.enabled = enabled
+    try:
+        best = float("inf")
+        for _ in range(repeats):
+            engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=num_weeks)
+            start = time.perf_counter()
+            for week, customer_demand in enumerate(demand, start=1):
+                engine.run_step(week, customer_demand)
+            best = min(best, (time.perf_counter() - start) / num_weeks * 1e6)
+        return best
+    finally:
+        INSTRUMENTS.enabled = previous
+
+
+def disabled_probe_time(number: int = 200_000) -> float:
+    """
+    Microseconds for the probes of one step while instrumentation is off.
+    """
+    probes = "profile = engine_profile if INSTRUMENTS.enabled else None\n" + \
+             "if profile is not None: pass\n" * (len(STEP_PHASES) + 1)
+    seconds = min(timeit.repeat(probes, globals={"INSTRUMENTS": INSTRUMENTS, "engine_profile": object()},
+                                number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+def run(num_weeks: int = 2_000, repeats: int = 5):
+    demand = np.random.default_rng(0).integers(15, 36, size=num_weeks).tolist()
+    # Warm up the interpreter and caches before timing
+    step_time(False, num_weeks, 1, demand)
+    off = step_time(False, num_weeks, repeats, demand)
+    on = step_time(True, num_weeks, repeats, demand)
+    INSTRUMENTS.reset()
+    probes = disabled_probe_time()
+
+    print(f"Instrumentation off : {off:8.2f} us/step")
+    print(f"Instrumentation on  : {on:8.2f} us/step ({(on - off) / off:+.1%})")
+    print(f"Disabled probes     : {probes:8.3f} us/step ({probes / off:.2%} of a step)")
+    return {"step_us_off": off, "step_us_on": on, "disabled_probe_us": probes}
+
+
+if __name__ == "__main__":
+    run()
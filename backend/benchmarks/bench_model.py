@@ -0,0 +1,44 @@
+"""
+Agent model cold-load time (whatever load_agent_model picks: the compiled
+export if current, else the joblib file) and predict_orders latency for the
+row counts the engines use: one agent, one batched chain, and a batch
+engine's worth of chains.
+
+Run from the backend folder: python -m benchmarks.bench_model
+"""
+import time
+import numpy as np
+from simulation.ai_agent import predict_orders
+from simulation.model_registry import DEFAULT_MODEL_PATH, load_agent_model
+
+
+def run(path: str = DEFAULT_MODEL_PATH, loads: int = 5):
+    load_seconds = []
+    model = None
+    for _ in range(loads):
+        start = time.perf_counter()
+        model = load_agent_model(path)
+        load_seconds.append(time.perf_counter() - start)
+    if model is None:
+        print(f"No agent model at '{path}'; nothing to measure.")
+        return {}
+    results = {"load_ms": min(load_seconds) * 1e3}
+    print(f"Model load         : {results['load_ms']:10.2f} ms ({type(model).__name__})")
+
+    rng = np.random.default_rng(0)
+    features = np.column_stack((rng.integers(-50, 300, 10_000), rng.integers(0, 400, 10_000),
+                                rng.random(10_000) * 120)).astype(np.float64)
+    for rows, repeats in ((1, 2000), (3, 2000), (10_000, 20)):
+        batch = features[:rows]
+        predict_orders(model, batch)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            predict_orders(model, batch)
+        latency = (time.perf_counter() - start) / repeats
+        print(f"Predict {rows:6,d} rows : {latency * 1e6:10.1f} us")
+        results[f"predict_{rows}_rows_us"] = latency * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    run()
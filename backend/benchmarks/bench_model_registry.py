@@ -0,0 +1,46 @@
+"""
+Confirms that creating engines no longer deserializes the agent model each
+time: builds many all-AI engines and reports registry load counts and times,
+then touches the model file to show a hot reload.
+
+Run from the backend folder: python -m benchmarks.bench_model_registry
+"""
+import os
+import time
+from simulation.engine import SimulationEngine
+from simulation.batch_engine import TIER_NAMES
+from simulation.model_registry import MODEL_REGISTRY, DEFAULT_MODEL_PATH, compiled_model_path
+
+ALL_AI = {name: 'AI' for name in TIER_NAMES}
+
+
+def run(num_engines: int = 200):
+    MODEL_REGISTRY.clear()
+    start = time.perf_counter()
+    SimulationEngine(agent_config=ALL_AI, enable_analyst=False)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(num_engines):
+        SimulationEngine(agent_config=ALL_AI, enable_analyst=False)
+    warm = (time.perf_counter() - start) / num_engines
+    stats = MODEL_REGISTRY.stats()
+
+    print(f"First all-AI engine         : {first * 1e3:8.2f} ms (includes the one model load)")
+    print(f"Later all-AI engines        : {warm * 1e3:8.3f} ms each ({num_engines} engines)")
+    print(f"Model loads / lookups served: {stats['total_loads']} / {stats['total_hits']}")
+    print(f"Total model load time       : {stats['total_load_seconds'] * 1e3:8.2f} ms")
+
+    # Simulate a retrained model replacing the file
+    path = compiled_model_path(DEFAULT_MODEL_PATH)
+    if os.path.exists(path):
+        now = time.time()
+        os.utime(path, (now, now))
+        MODEL_REGISTRY.check_interval = 0
+        SimulationEngine(agent_config=ALL_AI, enable_analyst=False)
+        print(f"Loads after the file changed: {MODEL_REGISTRY.stats()['total_loads']}")
+    return {"first_engine_ms": first * 1e3, "engine_ms": warm * 1e3, "model_loads": stats["total_loads"]}
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,62 @@
+"""
+Checks that NetworkEngine's chain preset matches SimulationEngine week for
+week, then times NetworkEngine on layered random networks of growing size
+(fan-in and fan-out between layers, lead times of 1-4 weeks) and reports
+microseconds per step and node-weeks per second.
+
+Run from the backend folder: python -m benchmarks.bench_network
+"""
+import time
+import numpy as np
+from simulation.network import NetworkEngine, Topology
+from benchmarks.bench_batch_engine import loop_engines, make_demand
+
+
+def layered_topology(num_nodes: int, layers: int = 5, fan_in: int = 3, max_lead_time: int = 4, seed: int = 0) -> Topology:
+    """
+    Layers of roughly equal width, each node supplied by up to fan_in random
+    nodes of the layer above; the first layer produces and the last sells.
+    """
+    rng = np.random.default_rng(seed)
+    width = max(1, num_nodes // layers)
+    names = [[f"L{layer}-{i}" for i in range(width)] for layer in range(layers)]
+    edges = []
+    for upstream, downstream in zip(names[:-1], names[1:]):
+        for name in downstream:
+            for supplier in rng.choice(len(upstream), size=min(fan_in, len(upstream)), replace=False):
+                edges.append({"from": upstream[supplier], "to": name,
+                              "lead_time": int(rng.integers(1, max_lead_time + 1)), "share": float(rng.random() + 0.5)})
+    return Topology([name for layer in names for name in layer], edges)
+
+
+def check_chain_preset(num_chains: int = 20, num_weeks: int = 100):
+    demand = make_demand(num_chains, num_weeks, seed=2)
+    for engine, chain_demand in zip(loop_engines(demand), demand):
+        network = NetworkEngine.chain(record_history=True, num_weeks=num_weeks).run(chain_demand)
+        for key in ("inventory", "placed_order_amount", "cost"):
+            expected = np.array([agent.history[key] for agent in engine.agents]).T
+            assert np.array_equal(expected, network.history[key]), f"Chain preset history '{key}' diverges"
+        assert network.backlog.tolist() == [agent.backlog for agent in engine.agents]
+
+
+def run(sizes=(100, 1_000, 5_000, 20_000), num_weeks: int = 100):
+    check_chain_preset()
+    print("Equivalence check passed: the chain preset matches SimulationEngine (RULE).")
+
+    results = {}
+    for num_nodes in sizes:
+        topology = layered_topology(num_nodes)
+        engine = NetworkEngine(topology)
+        demand = make_demand(len(engine.demand_nodes), num_weeks)
+        start = time.perf_counter()
+        engine.run(demand)
+        seconds = time.perf_counter() - start
+        rate = topology.num_nodes * num_weeks / seconds
+        print(f"{topology.num_nodes:7,d} nodes / {topology.num_edges:7,d} edges: "
+              f"{seconds / num_weeks * 1e6:10,.0f} us/step {rate:14,.0f} node-weeks/s")
+        results[f"network_{num_nodes}_node_weeks_per_sec"] = rate
+    return results
+
+
+if __name__ == "__main__":
+    run()
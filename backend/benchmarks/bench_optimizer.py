@@ -0,0 +1,66 @@
+"""
+The policy optimizer end to end: throughput (chain-weeks per second) for
+1, 2 and all cores, how much pruning saves against scoring every candidate on
+every replicate, and the cost it finds against the default policy. Checks
+that the result does not depend on the process count and that
+SimulationEngine, given the returned agent_config, reproduces its cost.
+
+Run from the backend folder: python -m benchmarks.bench_optimizer
+"""
+import contextlib
+import io
+import os
+from simulation.engine import SimulationEngine
+from simulation.optimizer import PolicyOptimizer, PolicyProblem
+from simulation.scenario import compile_scenario
+import numpy as np
+
+
+def check_engine_agrees(problem: PolicyProblem, agent_config: dict, expected: float):
+    rng = np.random.default_rng([problem.spec["seed"], 0])
+    timeline = compile_scenario(problem.spec["scenario"], problem.num_weeks, rng)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = SimulationEngine(agent_config, enable_analyst=False, num_weeks=problem.num_weeks, scenario=timeline)
+    for week in range(1, problem.num_weeks + 1):
+        engine.run_step(week)
+    assert sum(engine.metrics.total_cost) == expected, "SimulationEngine disagrees with the optimizer's evaluation"
+
+
+def run(weeks: int = 100, candidates: int = 64, generations: int = 3, max_replicates: int = 64):
+    problem_spec = {"weeks": weeks}
+    results = {}
+    figures = {}
+    for processes in sorted({1, 2, os.cpu_count() or 1}):
+        optimizer = PolicyOptimizer(PolicyProblem(problem_spec), candidates=candidates, generations=generations,
+                                    max_replicates=max_replicates, processes=processes, seed=0)
+        results[processes] = result = optimizer.run()
+        print(f"{processes:3d} processes: {result['chain_weeks_per_sec']:12,.0f} chain-weeks/s "
+              f"({result['chain_weeks']:,} chain-weeks in {result['seconds']:.2f}s)")
+        figures[f"optimizer_{processes}p_chain_weeks_per_sec"] = result["chain_weeks_per_sec"]
+    first, *others = results.values()
+    assert all(other["agent_config"] == first["agent_config"] and other["expected_cost"] == first["expected_cost"]
+               for other in others), "Optimizer result depends on the process count"
+
+    problem = PolicyProblem(problem_spec)
+    targets = [tier["target_inventory"] for tier in first["agent_config"].values()]
+    check_engine_agrees(problem, first["agent_config"], float(problem.evaluate(np.array([targets]), [0])[0, 0]))
+
+    # Without pruning every sampled candidate would run every replicate
+    exhaustive = sum(r["candidates"] for r in first["rounds"] if r["replicates"] == first["rounds"][0]["replicates"])
+    exhaustive_chain_weeks = exhaustive * max_replicates * weeks
+    print(f"Pruning simulated {first['chain_weeks']:,} chain-weeks instead of {exhaustive_chain_weeks:,} "
+          f"({exhaustive_chain_weeks / first['chain_weeks']:.1f}x fewer)")
+    print(f"Best expected cost {first['expected_cost']:,.1f} vs default policy {first['baseline_cost']:,.1f} "
+          f"(saving {first['improvement']:,.1f} +/- {first['improvement_std_error']:,.1f} with common random numbers)")
+    print(f"Best config: {first['agent_config']}")
+    figures.update({
+        "pruning_factor": exhaustive_chain_weeks / first["chain_weeks"],
+        "best_cost": first["expected_cost"],
+        "baseline_cost": first["baseline_cost"],
+        "seconds": first["seconds"],
+    })
+    return figures
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,126 @@
+"""
+The /runs read path over a mongomock stand-in seeded with stored runs:
+a page of runs with and without the projection that leaves out summaries
+and history, walking every page by cursor, per-config cost statistics from
+one aggregation, and a 10-week history window against the whole history.
+Checks that cursor pages visit every run exactly once, that the statistics
+match NumPy's, and that legacy runs are backfilled. Needs mongomock.
+
+Run from the backend folder: python -m benchmarks.bench_run_queries
+"""
+import datetime
+import json
+import time
+import numpy as np
+from simulation.persistence import HISTORY_BUCKET_WEEKS
+from simulation.queries import RunQueries, backfill_run_fields, ensure_indexes, run_fields, run_filter
+from simulation.scenario import TIER_NAMES
+
+CONFIGS = [{}, {"Retailer": "AI"}, {"Retailer": "AI", "Wholesaler": "AI", "Distributor": "AI"}]
+
+
+def seed(db, num_runs: int, num_weeks: int, rng: np.random.Generator):
+    runs, buckets = [], []
+    start = datetime.datetime(2025, 1, 1)
+    for n in range(num_runs):
+        costs = {tier: int(cost) for tier, cost in zip(TIER_NAMES, rng.integers(5_000, 30_000, size=len(TIER_NAMES)))}
+        config = CONFIGS[n % len(CONFIGS)]
+        metrics = {tier: {"total_cost": costs[tier], "fill_rate": float(rng.random()),
+                          "order_variance_ratio": float(rng.random() * 50)} for tier in TIER_NAMES}
+        run = {"simulation_id": f"run-{n:06d}", "agent_config": config, "weeks": num_weeks,
+               "summary": {"type": "final_summary", "summary_text": "x" * 600, "metrics": metrics,
+                           "total_cost_data": [{"name": tier, "cost": cost} for tier, cost in costs.items()]},
+               **run_fields(config, costs)}
+        run["created_at"] = start + datetime.timedelta(minutes=n)
+        runs.append(run)
+        history = rng.integers(0, 200, size=(len(TIER_NAMES), 3, num_weeks + 1)).tolist()
+        for lo in range(0, num_weeks + 1, HISTORY_BUCKET_WEEKS):
+            hi = min(lo + HISTORY_BUCKET_WEEKS, num_weeks + 1)
+            buckets.append({"simulation_id": run["simulation_id"], "start_week": lo, "end_week": hi - 1,
+                            "agents": {tier: {field: values[lo:hi] for field, values
+                                              in zip(("inventory", "placed_order_amount", "cost"), tier_history)}
+                                       for tier, tier_history in zip(TIER_NAMES, history)}})
+    db.simulations.insert_many(runs)
+    db.simulation_history.insert_many(buckets)
+    return runs
+
+
+def timed(function, repeats: int = 5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(num_runs: int = 3_000, num_weeks: int = 260, page_size: int = 50):
+    try:
+        import mongomock
+    except ImportError as e:
+        print(f"Skipping: {e}")
+        return {}
+    db = mongomock.MongoClient().chainreact_db
+    db.simulations.create_index("simulation_id", unique=True)
+    db.simulation_history.create_index([("simulation_id", 1), ("start_week", 1)])
+    ensure_indexes(db)
+    runs = seed(db, num_runs, num_weeks, np.random.default_rng(0))
+    queries = RunQueries(lambda: db)
+
+    # Legacy runs only have agent_config and the summary
+    db.simulations.insert_one({"simulation_id": "legacy", "agent_config": {}, "weeks": 50,
+                               "summary": {"total_cost_data": [{"name": tier, "cost": 1000} for tier in TIER_NAMES]}})
+    assert backfill_run_fields(db) == 1 and queries.get_run("legacy")["total_cost"] == 4000
+    db.simulations.delete_one({"simulation_id": "legacy"})
+
+    page_seconds, page = timed(lambda: queries.list_runs({}, limit=page_size))
+    full_seconds, full = timed(lambda: list(db.simulations.find({}, {"_id": 0}).sort("created_at", -1).limit(page_size)))
+    page_bytes = len(json.dumps(page["runs"], default=str))
+    full_bytes = len(json.dumps(full, default=str))
+    history_of_page = sum(len(json.dumps(bucket)) for bucket in db.simulation_history.find(
+        {"simulation_id": {"$in": [run["simulation_id"] for run in full]}}, {"_id": 0}))
+
+    start = time.perf_counter()
+    seen, cursor, pages = [], None, 0
+    while True:
+        result = queries.list_runs(run_filter(config="RULE-RULE-RULE-AI"), sort="total_cost", limit=page_size, cursor=cursor)
+        seen += [(row["total_cost"], row["simulation_id"]) for row in result["runs"]]
+        pages += 1
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    walk_seconds = time.perf_counter() - start
+    expected = sorted((r["total_cost"], r["simulation_id"]) for r in runs if r["config_key"] == "RULE-RULE-RULE-AI")
+    assert seen == expected, "Cursor pages skip or repeat runs"
+
+    stats_seconds, stats = timed(lambda: queries.stats({}))
+    for group in stats:
+        costs = np.array([r["total_cost"] for r in runs if r["config_key"] == group["config"]], dtype=np.float64)
+        assert group["runs"] == len(costs)
+        assert np.isclose(group["total_cost"]["mean"], costs.mean()) and np.isclose(group["total_cost"]["std"], costs.std())
+
+    window_seconds, window = timed(lambda: queries.history("run-000123", 100, 109))
+    whole_seconds, whole = timed(lambda: queries.history("run-000123"))
+    assert all(len(values) == 10 for agent in window["agents"].values() for values in agent.values())
+    assert whole["agents"]["Retailer"]["cost"][100:110] == window["agents"]["Retailer"]["cost"]
+
+    print(f"{num_runs} runs x {num_weeks} weeks in the stand-in")
+    print(f"Page of {page_size}, projected   : {page_seconds * 1e3:8.2f} ms, {page_bytes / 1e3:8.1f} KB")
+    print(f"Page of {page_size}, full docs   : {full_seconds * 1e3:8.2f} ms, {full_bytes / 1e3:8.1f} KB "
+          f"(+{history_of_page / 1e3:.1f} KB of history buckets)")
+    print(f"Walk one config by cursor : {walk_seconds * 1e3:8.2f} ms ({pages} pages, {len(seen)} runs)")
+    print(f"Stats, {len(stats)} configs          : {stats_seconds * 1e3:8.2f} ms")
+    print(f"History weeks 100-109     : {window_seconds * 1e3:8.2f} ms (whole run {whole_seconds * 1e3:.2f} ms)")
+    return {
+        "page_ms": page_seconds * 1e3,
+        "page_kb": page_bytes / 1e3,
+        "full_page_kb": full_bytes / 1e3,
+        "cursor_walk_ms": walk_seconds * 1e3,
+        "stats_ms": stats_seconds * 1e3,
+        "history_window_ms": window_seconds * 1e3,
+        "history_whole_ms": whole_seconds * 1e3,
+    }
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,113 @@
+"""
+Scenario timelines: how fast a scenario with many overlapping demand,
+capacity and lead-time events compiles, and what reading it costs
+SimulationEngine and BatchSimulationEngine per week compared with plain
+demand. Also checks that both engines, and a run forked from a snapshot
+mid-shock, end up in exactly the same state on the same timelines.
+
+Run from the backend folder: python -m benchmarks.bench_scenario
+"""
+import contextlib
+import io
+import time
+import numpy as np
+from simulation.engine import SimulationEngine
+from simulation.batch_engine import BatchSimulationEngine, TIER_NAMES
+from simulation.scenario import compile_scenario
+from simulation.snapshot import run_branch
+
+
+def make_scenario(num_events: int, num_weeks: int, seed: int = 0):
+    """
+    Noisy seasonal demand with num_events random overlapping events of every type.
+    """
+    rng = np.random.default_rng(seed)
+    events = []
+    for _ in range(num_events):
+        kind = rng.choice(["DEMAND_SPIKE", "DEMAND_SHIFT", "CAPACITY", "LEAD_TIME"])
+        event = {"type": str(kind), "week": int(rng.integers(1, num_weeks)), "duration": int(rng.integers(1, 12))}
+        if kind == "DEMAND_SPIKE":
+            event["value"] = int(rng.integers(40, 90))
+        elif kind == "DEMAND_SHIFT":
+            event["value"] = int(rng.integers(-10, 11))
+        elif kind == "CAPACITY":
+            event.update(tier=str(rng.choice(TIER_NAMES)), value=int(rng.integers(5, 30)))
+        else:
+            event.update(tier=str(rng.choice(TIER_NAMES[1:])), value=int(rng.integers(1, 4)))
+        events.append(event)
+    return {"demand": {"process": "uniform", "low": 15, "high": 35},
+            "seasonality": [{"period": 52, "amplitude": 0.3}, {"profile": [1.0, 1.1, 0.9, 1.0]}],
+            "noise": {"std": 2.0}, "events": events, "seed": seed}
+
+
+def quiet_engine(**kwargs) -> SimulationEngine:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return SimulationEngine(agent_config={}, enable_analyst=False, **kwargs)
+
+
+def check_equivalence(num_chains: int = 30, num_weeks: int = 120):
+    timelines = [compile_scenario(make_scenario(40, num_weeks, seed), num_weeks) for seed in range(num_chains)]
+    batch = BatchSimulationEngine(num_chains, record_history=True, num_weeks=num_weeks).run_timeline(timelines)
+    for n, timeline in enumerate(timelines):
+        engine = quiet_engine(num_weeks=num_weeks, scenario=timeline)
+        for week in range(1, num_weeks + 1):
+            engine.run_step(week)
+        for key in ("inventory", "placed_order_amount", "cost"):
+            expected = np.array([agent.history[key] for agent in engine.agents]).T
+            assert np.array_equal(expected, batch.history[key][:, n]), f"Batch history '{key}' diverges on a scenario"
+
+    # A fork taken mid-shock carries the events in force and the held-back shipments with it
+    timeline = compile_scenario(make_scenario(40, num_weeks, seed=99), num_weeks)
+    whole = quiet_engine(num_weeks=num_weeks, scenario=timeline)
+    for week in range(1, num_weeks + 1):
+        whole.run_step(week)
+    prefix = quiet_engine(num_weeks=num_weeks, scenario=compile_scenario(make_scenario(40, num_weeks, seed=99), num_weeks))
+    for week in range(1, num_weeks // 2 + 1):
+        prefix.run_step(week)
+    with contextlib.redirect_stdout(io.StringIO()):
+        branch = run_branch(prefix.snapshot(), {"weeks": num_weeks - num_weeks // 2,
+                                                "demand": timeline.base[num_weeks // 2:].tolist()})
+    assert branch["total_costs"] == dict(zip(TIER_NAMES, whole.metrics.total_cost)), "Forked scenario run diverges"
+
+
+def step_rate(scenario, num_weeks: int, runs: int) -> float:
+    engines = [quiet_engine(num_weeks=num_weeks, scenario=scenario) for _ in range(runs)]
+    start = time.perf_counter()
+    for engine in engines:
+        for week in range(1, num_weeks + 1):
+            engine.run_step(week)
+    return runs * num_weeks / (time.perf_counter() - start)
+
+
+def run(num_weeks: int = 500, num_events: int = 200, runs: int = 20, num_chains: int = 5_000):
+    check_equivalence()
+    print("Equivalence check passed: batch, looped and forked engines agree on scenario timelines.")
+
+    spec = make_scenario(num_events, num_weeks)
+    start = time.perf_counter()
+    repeats = 20
+    for _ in range(repeats):
+        timeline = compile_scenario(spec, num_weeks)
+    compile_seconds = (time.perf_counter() - start) / repeats
+
+    plain_rate = step_rate({"demand": 20}, num_weeks, runs)
+    scenario_rate = step_rate(timeline, num_weeks, runs)
+
+    start = time.perf_counter()
+    BatchSimulationEngine(num_chains).run_timeline(timeline)
+    batch_rate = num_chains * num_weeks / (time.perf_counter() - start)
+
+    print(f"Compile {num_events} events x {num_weeks} weeks : {compile_seconds * 1e3:8.2f} ms")
+    print(f"SimulationEngine, plain demand : {plain_rate:12,.0f} weeks/s")
+    print(f"SimulationEngine, shock-heavy  : {scenario_rate:12,.0f} weeks/s")
+    print(f"BatchSimulationEngine, shocks  : {batch_rate:12,.0f} chain-weeks/s ({num_chains} chains)")
+    return {
+        "compile_ms": compile_seconds * 1e3,
+        "plain_weeks_per_sec": plain_rate,
+        "scenario_weeks_per_sec": scenario_rate,
+        "batch_scenario_chain_weeks_per_sec": batch_rate,
+    }
+
+
+if __name__ == "__main__":
+    run()
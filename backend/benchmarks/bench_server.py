@@ -0,0 +1,71 @@
+"""
+End-to-end WebSocket streaming through the FastAPI app, in process: the
+fake LLM answers every analyst request after a fixed 10 ms and runs are
+persisted to an in-memory mongomock database. Reports time to the first
+frame, streamed weeks per second for one run, and the aggregate rate with
+several runs streaming at once. Needs httpx (for TestClient) and mongomock.
+
+Run from the backend folder: python -m benchmarks.bench_server
+"""
+import contextlib
+import io
+import os
+import threading
+import time
+
+
+def stream_run(client, num_weeks: int, agent_config=None):
+    """
+    Runs one simulation over a WebSocket and returns (seconds to first frame, total seconds).
+    """
+    start = time.perf_counter()
+    first_frame = None
+    with client.websocket_connect("/ws/simulation") as websocket:
+        websocket.send_json({"type": "start_simulation", "config": agent_config or {}, "weeks": num_weeks,
+                             "stream": {"tick": 0}})
+        while True:
+            message = websocket.receive_json()
+            if first_frame is None and "week" in message:
+                first_frame = time.perf_counter() - start
+            if message.get("type") in ("final_summary", "error"):
+                break
+    return first_frame, time.perf_counter() - start
+
+
+def run(num_weeks: int = 200, concurrent: int = 8, repeats: int = 3):
+    os.environ["ANALYST_BACKEND"] = "fake"
+    os.environ["MONGO_CONNECTION_STRING"] = "mongomock://"
+    try:
+        from fastapi.testclient import TestClient
+        import mongomock  # noqa: F401
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main
+    except ImportError as e:
+        print(f"Skipping: {e}")
+        return {}
+    from simulation.analyst import FakeLLM
+    main.analyst.llm = FakeLLM(latency=0.01, jitter=0.0, seed=0)
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()), TestClient(main.app) as client:
+        stream_run(client, 10)
+        runs = [stream_run(client, num_weeks) for _ in range(repeats)]
+        results["first_frame_ms"] = min(first for first, _ in runs) * 1e3
+        results["single_run_weeks_per_sec"] = num_weeks / min(total for _, total in runs)
+
+        threads = [threading.Thread(target=stream_run, args=(client, num_weeks)) for _ in range(concurrent)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results["concurrent_weeks_per_sec"] = concurrent * num_weeks / (time.perf_counter() - start)
+
+    print(f"First frame     : {results['first_frame_ms']:10.2f} ms")
+    print(f"Single run      : {results['single_run_weeks_per_sec']:10,.0f} weeks/s ({num_weeks} weeks)")
+    print(f"Concurrent runs : {results['concurrent_weeks_per_sec']:10,.0f} weeks/s ({concurrent} x {num_weeks} weeks)")
+    return results
+
+
+if __name__ == "__main__":
+    run()
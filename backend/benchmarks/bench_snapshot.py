@@ -0,0 +1,68 @@
+"""
+What-if branches two ways: replaying the shared prefix for every branch,
+versus running the prefix once and forking each branch from a snapshot.
+Also reports snapshot size and encode/decode time, and checks that a
+forked branch ends exactly where the replayed one does.
+
+Run from the backend folder: python -m benchmarks.bench_snapshot
+"""
+import time
+import numpy as np
+from simulation.engine import SimulationEngine
+from simulation.snapshot import EngineSnapshot, run_branches
+
+SPIKE = {"type": "DEMAND_SPIKE", "value": 80, "duration": 3}
+
+
+def replay(demand, spike_week: int) -> SimulationEngine:
+    engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=len(demand))
+    for week, customer_demand in enumerate(demand, start=1):
+        if week == spike_week:
+            engine.inject_disruption(SPIKE)
+        engine.run_step(week, customer_demand)
+    return engine
+
+
+def run(prefix_weeks: int = 500, branch_weeks: int = 20, branches: int = 32):
+    demand = np.random.default_rng(0).integers(15, 36, size=prefix_weeks + branch_weeks).tolist()
+    spike_weeks = [prefix_weeks + 1 + i % branch_weeks for i in range(branches)]
+
+    start = time.perf_counter()
+    replayed = [replay(demand, week) for week in spike_weeks]
+    replay_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prefix = replay(demand[:prefix_weeks], spike_week=0)
+    snapshot = prefix.snapshot()
+    branch_specs = [{"weeks": branch_weeks, "demand": demand[prefix_weeks:],
+                     "disruptions": [{"week": week, **SPIKE}]} for week in spike_weeks]
+    forked = run_branches(snapshot, branch_specs, processes=1)
+    fork_seconds = time.perf_counter() - start
+
+    for engine, result in zip(replayed, forked):
+        expected = dict(zip([agent.name for agent in engine.agents], engine.metrics.total_cost))
+        assert result["total_costs"] == expected, "Forked branch diverges from the replayed run"
+
+    start = time.perf_counter()
+    payload = snapshot.to_bytes()
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    EngineSnapshot.from_bytes(payload).restore()
+    decode_seconds = time.perf_counter() - start
+
+    print(f"Replay prefix per branch : {replay_seconds:8.3f}s ({branches} branches x {prefix_weeks + branch_weeks} weeks)")
+    print(f"Snapshot and fork        : {fork_seconds:8.3f}s ({prefix_weeks} weeks once + {branches} x {branch_weeks})")
+    print(f"Speed-up                 : {replay_seconds / fork_seconds:8.1f}x")
+    print(f"Snapshot size            : {len(payload):8,d} bytes at week {prefix_weeks} "
+          f"({len(snapshot.to_bytes(compress=False)):,d} uncompressed), "
+          f"encode {encode_seconds * 1e3:.2f} ms, decode + restore {decode_seconds * 1e3:.2f} ms")
+    return {
+        "replay_seconds": replay_seconds,
+        "fork_seconds": fork_seconds,
+        "snapshot_bytes": len(payload),
+        "snapshot_decode_ms": decode_seconds * 1e3,
+    }
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,117 @@
+"""
+Cold-start cost of the server, each measured in a fresh interpreter:
+importing main (and which heavy packages that drags in), then a real
+uvicorn process from launch until / answers and until /ready reports the
+background warm-up done. The server runs twice: with no Groq key, and with
+a key but an unreachable Groq endpoint, which must delay /ready by at most
+the discovery timeout and / not at all. Needs uvicorn and mongomock.
+
+Run from the backend folder: python -m benchmarks.bench_startup
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+HEAVY_MODULES = ["pandas", "sklearn", "joblib", "groq", "httpx", "pymongo", "mongomock"]
+
+IMPORT_PROBE = f"""
+import sys, time, json
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _environment(cache_dir: str, **overrides) -> dict:
+    env = {**os.environ, "MONGO_CONNECTION_STRING": "mongomock://",
+           "GROQ_MODEL_CACHE_PATH": os.path.join(cache_dir, "groq_model.json"), **overrides}
+    env.pop("ANALYST_BACKEND", None)
+    return {name: value for name, value in env.items() if value is not None}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not answer in time")
+
+
+def serve(env: dict, timeout: float = 30.0):
+    """
+    Starts uvicorn and returns (seconds until / answers, seconds until /ready is 200, /ready body).
+    """
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        first = _wait_for(base + "/", start + timeout) - start
+        ready = _wait_for(base + "/ready", start + timeout) - start
+        with urllib.request.urlopen(base + "/ready", timeout=1) as response:
+            state = json.load(response)
+    finally:
+        server.terminate()
+        server.wait()
+    return first, ready, state
+
+
+def run(repeats: int = 3):
+    try:
+        import mongomock  # noqa: F401
+        import uvicorn  # noqa: F401
+    except ImportError as e:
+        print(f"Skipping: {e}")
+        return {}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        offline = _environment(cache_dir, GROQ_API_KEY=None)
+        probes = [json.loads(subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=offline, capture_output=True,
+                                            text=True, check=True).stdout.strip().splitlines()[-1])
+                  for _ in range(repeats)]
+        import_seconds = min(probe["seconds"] for probe in probes)
+        heavy = probes[0]["heavy"]
+
+        runs = [serve(offline) for _ in range(repeats)]
+        first = min(run[0] for run in runs)
+        ready = min(run[1] for run in runs)
+
+        # A key but nothing listening: discovery fails (or times out) in the background
+        unreachable = _environment(cache_dir, GROQ_API_KEY="benchmark", GROQ_BASE_URL="http://127.0.0.1:9")
+        no_network_first, no_network_ready, state = serve(unreachable)
+
+    print(f"import main               : {import_seconds * 1e3:8.1f} ms (heavy modules loaded: {', '.join(heavy) or 'none'})")
+    print(f"Launch to first response  : {first * 1e3:8.1f} ms")
+    print(f"Launch to ready           : {ready * 1e3:8.1f} ms")
+    print(f"Unreachable Groq endpoint : {no_network_first * 1e3:8.1f} ms to first response, "
+          f"{no_network_ready * 1e3:.1f} ms to ready (analyst {state['steps']['analyst'].get('detail')})")
+    return {
+        "import_main_ms": import_seconds * 1e3,
+        "heavy_modules_imported": len(heavy),
+        "first_response_ms": first * 1e3,
+        "ready_ms": ready * 1e3,
+        "unreachable_llm_first_response_ms": no_network_first * 1e3,
+        "unreachable_llm_ready_ms": no_network_ready * 1e3,
+    }
+
+
+if __name__ == "__main__":
+    run()
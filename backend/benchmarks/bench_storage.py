@@ -0,0 +1,56 @@
+"""
+Training-data load time: pandas parsing training_data_v2.csv versus reading
+the same columns from memory-mapped .npy shards (full and partial loads).
+
+Run from the backend folder: python -m benchmarks.bench_storage
+"""
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from simulation.storage import ShardWriter, read_shards
+
+COLUMNS = ["inventory", "backlog", "demand_trend", "placed_order"]
+
+
+def _best_of(fn, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(num_rows: int = 1_000_000, shard_rows: int = 1 << 18):
+    rng = np.random.default_rng(0)
+    data = {
+        "inventory": rng.integers(-200, 400, num_rows).astype(np.int32),
+        "backlog": rng.integers(0, 300, num_rows).astype(np.int32),
+        "demand_trend": rng.uniform(15, 80, num_rows).astype(np.float32),
+        "placed_order": rng.integers(0, 200, num_rows).astype(np.int32),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "training.csv")
+        shard_dir = os.path.join(tmp, "training")
+        pd.DataFrame(data).to_csv(csv_path, index=False)
+        with ShardWriter(shard_dir, shard_rows=shard_rows) as writer:
+            for start in range(0, num_rows, shard_rows):
+                writer.write({name: values[start:start + shard_rows] for name, values in data.items()})
+
+        results = {
+            "csv_seconds": _best_of(lambda: pd.read_csv(csv_path, usecols=COLUMNS)),
+            "npy_seconds": _best_of(lambda: read_shards(shard_dir, COLUMNS, mmap=False)),
+            "npy_mmap_partial_seconds": _best_of(lambda: np.asarray(read_shards(shard_dir, COLUMNS, max_rows=num_rows // 10)["inventory"]).sum()),
+            "csv_bytes": os.path.getsize(csv_path),
+            "npy_bytes": sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(shard_dir) for f in files),
+        }
+    print(f"{num_rows:,} rows: CSV {results['csv_seconds']:.3f}s ({results['csv_bytes'] / 1e6:.1f} MB) | "
+          f".npy {results['npy_seconds']:.3f}s ({results['npy_bytes'] / 1e6:.1f} MB) | "
+          f"mmap first 10% {results['npy_mmap_partial_seconds']:.4f}s")
+    return results
+
+
+if __name__ == "__main__":
+    run()
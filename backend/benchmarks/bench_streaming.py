@@ -0,0 +1,57 @@
+"""
+Bytes on the wire and encode time for a 500-week run in each stream mode,
+including JSON serialization, without a network in the way.
+
+Run from the backend folder: python -m benchmarks.bench_streaming
+"""
+import contextlib
+import io
+import json
+import time
+from simulation.engine import SimulationEngine
+from simulation.streaming import StreamOptions, capture_week, make_encoder
+
+CASES = (
+    ("json", 1),
+    ("delta", 1),
+    ("delta", 25),
+    ("binary", 1),
+    ("binary", 25),
+)
+
+
+def _stream(mode: str, weeks_per_frame: int, num_weeks: int):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=num_weeks)
+    names = [agent.name for agent in engine.agents]
+    options = StreamOptions(mode, weeks_per_frame, tick=0)
+    encoder = make_encoder(options, names)
+    frames = 0
+    size = 0
+    encode_seconds = 0.0
+    for week in range(1, num_weeks + 1):
+        engine.run_step(week, 20 if week < 10 else 25)
+        start = time.perf_counter()
+        encoder.add_week(week, capture_week(engine, names), [])
+        if len(encoder) >= options.weeks_per_frame or week == num_weeks:
+            for kind, message in encoder.flush():
+                payload = message if kind == "bytes" else json.dumps(message, separators=(",", ":")).encode()
+                frames += 1
+                size += len(payload)
+        encode_seconds += time.perf_counter() - start
+    return frames, size, encode_seconds
+
+
+def run(num_weeks: int = 500):
+    results = {}
+    for mode, weeks_per_frame in CASES:
+        frames, size, seconds = _stream(mode, weeks_per_frame, num_weeks)
+        label = f"{mode}_x{weeks_per_frame}"
+        print(f"{label:>10}: {frames:4d} frames, {size / 1e3:8.1f} kB, encode {seconds * 1e3:7.1f} ms")
+        results[f"{label}_bytes"] = size
+        results[f"{label}_encode_ms"] = seconds * 1e3
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,30 @@
+"""
+Sweep throughput (chain-weeks per second) for 1, 2, ... up to all cores,
+writing results to a throwaway CSV.
+
+Run from the backend folder: python -m benchmarks.bench_sweep
+"""
+import os
+import tempfile
+from simulation.sweep import CsvResultWriter, run_sweep
+
+
+def run(seeds: int = 2000, weeks: int = 100, chunk_size: int = 1024):
+    spec = {"seeds": seeds, "weeks": weeks}
+    counts = sorted({1, 2, os.cpu_count() or 1} | {n for n in (4, 8, 16) if n < (os.cpu_count() or 1)})
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for processes in counts:
+            writer = CsvResultWriter(os.path.join(tmp, f"sweep_{processes}.csv"))
+            try:
+                stats = run_sweep(spec, writer, processes=processes, chunk_size=chunk_size, progress=False)
+            finally:
+                writer.close()
+            print(f"{processes:3d} processes: {stats['chain_weeks_per_sec']:12,.0f} chain-weeks/s "
+                  f"({stats['runs']} runs in {stats['seconds']:.2f}s)")
+            results[f"sweep_{processes}p_chain_weeks_per_sec"] = stats["chain_weeks_per_sec"]
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,62 @@
+"""
+Training cost of the agent model: the previous single-threaded
+GradientBoostingRegressor against one early-stopped
+HistGradientBoostingRegressor fit on the cached binned data, plus the time
+to build and reopen that cache and the throughput of a small candidate
+search. Test accuracy of both models is reported alongside.
+
+Run from the backend folder: python -m benchmarks.bench_training
+"""
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from simulation.training import BinnedDataset, candidates, evaluate, fit_candidate, search
+from train_model import train_legacy_model
+
+
+def run(data_path: str = 'training_data_v2', num_candidates: int = 4):
+    with tempfile.TemporaryDirectory() as directory:
+        # The cache is written next to the data, so work on a copy
+        copy = os.path.join(directory, 'data')
+        shutil.copy(data_path + '.csv', copy + '.csv')
+
+        start = time.perf_counter()
+        dataset = BinnedDataset.load(copy)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        dataset = BinnedDataset.load(copy)
+        open_seconds = time.perf_counter() - start
+
+        legacy = train_legacy_model(data_path)
+
+        split = dataset.split()
+        result = fit_candidate(dataset, split, candidates(1)[0])
+        X_test = np.asarray(dataset.codes[split.test], dtype=np.float64)
+        accuracy = evaluate(result["model"], X_test, dataset.target[split.test])
+
+        start = time.perf_counter()
+        search(dataset, ["all"], candidates(num_candidates), progress=False)
+        search_seconds = time.perf_counter() - start
+
+    print(f"Rows                      : {len(dataset):,d}")
+    print(f"Binned cache build / open : {build_seconds * 1e3:8.1f} ms / {open_seconds * 1e3:.1f} ms")
+    print(f"GradientBoostingRegressor : {legacy['training_seconds']:8.2f}s  R2 {legacy['accuracy']['r2']:.3f}")
+    print(f"HistGradientBoosting      : {result['fit_seconds']:8.2f}s  R2 {accuracy['r2']:.3f} "
+          f"({result['n_iter']} trees, early stopped)")
+    print(f"Speed-up                  : {legacy['training_seconds'] / result['fit_seconds']:8.1f}x")
+    print(f"Search of {num_candidates} candidates    : {search_seconds:8.2f}s on {os.cpu_count()} cores")
+    return {
+        "cache_build_ms": build_seconds * 1e3,
+        "cache_open_ms": open_seconds * 1e3,
+        "legacy_fit_seconds": legacy["training_seconds"],
+        "hist_fit_seconds": result["fit_seconds"],
+        "search_fits_per_sec": num_candidates / search_seconds,
+        "legacy_r2": legacy["accuracy"]["r2"],
+        "hist_r2": accuracy["r2"],
+    }
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,190 @@
+"""
+Runs the benchmark suite offline and records every figure in one JSON file,
+or compares a run against a saved baseline and exits non-zero on regression.
+
+Each benchmark module's run() returns a dict of figures; the suite keys
+them as "<benchmark>.<figure>". Figures ending in _per_sec are throughput
+(higher is better) and gate the comparison; latency, memory and size
+figures (_ms, _us, _seconds, _mb, _kb, _bytes) are lower-is-better and
+only gate with --strict. Each benchmark runs --repeat times and keeps its
+best figures. Baselines are machine-specific: record one on the machine
+that will run the comparison.
+
+Run from the backend folder:
+    python -m benchmarks.suite --output benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.suite --only engine,server --repeat 3
+"""
+import argparse
+import contextlib
+import datetime
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+# name -> (module, run() arguments sized so the whole suite takes a couple of minutes)
+SUITE = {
+    "engine": ("benchmarks.bench_engine", {}),
+    "model": ("benchmarks.bench_model", {}),
+    "data_generation": ("benchmarks.bench_data_generation", {}),
+    "server": ("benchmarks.bench_server", {}),
+    "memory": ("benchmarks.bench_agent_memory", {"num_runs": 100, "num_weeks": 200}),
+    "batch_engine": ("benchmarks.bench_batch_engine", {"num_chains": 2_000}),
+    "network": ("benchmarks.bench_network", {"sizes": (1_000, 5_000)}),
+    "streaming": ("benchmarks.bench_streaming", {}),
+    "snapshot": ("benchmarks.bench_snapshot", {}),
+    "instrumentation": ("benchmarks.bench_instrumentation", {}),
+    "training": ("benchmarks.bench_training", {}),
+    "startup": ("benchmarks.bench_startup", {}),
+    "scenario": ("benchmarks.bench_scenario", {}),
+    "run_queries": ("benchmarks.bench_run_queries", {"num_runs": 1_000}),
+    "optimizer": ("benchmarks.bench_optimizer", {}),
+}
+
+HIGHER_IS_BETTER = ("_per_sec",)
+LOWER_IS_BETTER = ("_ms", "_us", "_seconds", "_mb", "_kb", "_bytes")
+
+
+def direction(figure: str) -> int:
+    """
+    1 if a bigger figure is better, -1 if smaller is better, 0 if it is only informational.
+    """
+    if figure.endswith(HIGHER_IS_BETTER):
+        return 1
+    if figure.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def environment() -> Dict:
+    import numpy
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+    }
+    try:
+        import sklearn
+        info["scikit-learn"] = sklearn.__version__
+    except ImportError:
+        pass
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                        text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def run_benchmark(name: str, repeat: int = 1, verbose: bool = False) -> Dict[str, float]:
+    """
+    Runs one benchmark repeat times and keeps the best value of every figure.
+    Names outside SUITE run benchmarks.bench_<name> with its defaults.
+    """
+    module_name, kwargs = SUITE.get(name, (f"benchmarks.bench_{name}", {}))
+    module = importlib.import_module(module_name)
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if verbose else output):
+            figures = module.run(**kwargs) or {}
+        for figure, value in figures.items():
+            value = float(value)
+            sign = direction(figure)
+            if figure not in best or (sign > 0 and value > best[figure]) or (sign < 0 and value < best[figure]):
+                best[figure] = value
+    return best
+
+
+def run_suite(names: List[str], repeat: int = 1, verbose: bool = False) -> Dict:
+    results = {}
+    seconds = {}
+    for name in names:
+        start = time.perf_counter()
+        figures = run_benchmark(name, repeat, verbose)
+        seconds[name] = round(time.perf_counter() - start, 3)
+        print(f"{name:<16} {len(figures):3d} figures in {seconds[name]:7.1f}s")
+        for figure, value in figures.items():
+            results[f"{name}.{figure}"] = value
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "repeat": repeat,
+        "benchmark_seconds": seconds,
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, strict: bool = False) -> List[str]:
+    """
+    Prints current against baseline and returns the figures that regressed
+    by more than threshold (a fraction, e.g. 0.15 for 15%).
+    """
+    regressions = []
+    print(f"{'figure':<56} {'baseline':>14} {'current':>14} {'change':>8}")
+    ran = set(current.get("benchmark_seconds", {})) or {key.split(".", 1)[0] for key in current["results"]}
+    for key, base in sorted(baseline["results"].items()):
+        if key.split(".", 1)[0] not in ran:
+            continue
+        value = current["results"].get(key)
+        if value is None:
+            print(f"{key:<56} {base:14.4g} {'missing':>14}")
+            continue
+        change = (value - base) / base if base else 0.0
+        sign = direction(key.split(".", 1)[1])
+        gated = sign > 0 or (strict and sign < 0)
+        regressed = gated and sign * change < -threshold
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<56} {base:14.4g} {value:14.4g} {change:+8.1%}{flag}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the ChainReact benchmark suite.")
+    parser.add_argument("--only", help="Comma-separated benchmarks to run (default: the whole suite)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per benchmark; the best figures are kept")
+    parser.add_argument("--output", help="Write the results JSON here (e.g. benchmarks/baseline.json)")
+    parser.add_argument("--results", help="Compare an existing results JSON instead of running the suite")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed regression as a fraction")
+    parser.add_argument("--strict", action="store_true", help="Also gate latency, memory and size figures")
+    parser.add_argument("--verbose", action="store_true", help="Show each benchmark's own output")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        names = args.only.split(",") if args.only else list(SUITE)
+        current = run_suite(names, args.repeat, args.verbose)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"Results written to '{args.output}'.")
+
+    if not args.compare:
+        for key, value in current["results"].items():
+            print(f"{key:<56} {value:14.4g}")
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold, args.strict)
+    if regressions:
+        print(f"{len(regressions)} figure(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,66 +1,106 @@
-import pandas as pd
+import argparse
 import random
 from simulation.engine import SimulationEngine
+from simulation.storage import ShardWriter
 
-def generate_data():
+TRAINING_SCHEMA = {
+    'agent_name': 'int8',
+    'inventory': 'int32',
+    'backlog': 'int32',
+    'demand_trend': 'float32',
+    'placed_order': 'int32',
+    'weekly_cost': 'int32',
+}
+AGENT_NAMES = ["Factory", "Distributor", "Wholesaler", "Retailer"]
+
+class CsvRowWriter:
+    """
+    Writes the same column batches as ShardWriter to a CSV file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', newline='')
+        self._file.write(','.join(TRAINING_SCHEMA) + '\n')
+
+    def write(self, columns):
+        for row in zip(*(columns[name] for name in TRAINING_SCHEMA)):
+            self._file.write(','.join(str(value) for value in row) + '\n')
+
+    def close(self):
+        self._file.close()
+
+def generate_data(output='training_data_v2', output_format='npy', num_simulations=100, num_weeks=100, append=False):
     """
     Runs multiple simulations with random demand to generate an ENHANCED dataset
-    for training a smarter ML model.
+    for training a smarter ML model. Rows are streamed to disk one simulation at
+    a time as typed column batches, so memory stays flat however many runs there are.
+    With append, the runs become new shards after those already in output.
     """
-    num_simulations = 100
-    num_weeks = 100
-    all_data = []
+    if output_format == 'csv':
+        output = output if output.endswith('.csv') else output + '.csv'
+        writer = CsvRowWriter(output)
+    else:
+        writer = ShardWriter(output, TRAINING_SCHEMA, format=output_format, categories={'agent_name': AGENT_NAMES},
+                             append=append)
+    total_rows = 0
 
     print(f"Running {num_simulations} simulations to generate enhanced training data...")
 
     for i in range(num_simulations):
         # PASS enable_analyst=False TO TURN OFF API CALLS
-        engine = SimulationEngine(agent_config={}, enable_analyst=False)
+        engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=num_weeks)
         demand_history = []
+        columns = {name: [] for name in TRAINING_SCHEMA}
 
         for week in range(1, num_weeks + 1):
             if random.random() < 0.05:
                 customer_demand = random.randint(50, 80)
             else:
                 customer_demand = random.randint(15, 35)
-            
+
             demand_history.append(customer_demand)
             if len(demand_history) > 4:
                 demand_history.pop(0)
-            
+
             demand_trend = sum(demand_history) / len(demand_history)
 
             prior_states = {
                 agent.name: {'inventory': agent.inventory, 'backlog': agent.backlog}
                 for agent in engine.agents
             }
-            
+
             engine.run_step(week, customer_demand)
 
             for agent in engine.agents:
                 if agent.name == "Factory":
                     continue
-                
+
                 features = prior_states[agent.name]
-                action = agent.history["placed_order_amount"][-1]
-                result_cost = agent.history["cost"][-1]
-                
-                all_data.append({
-                    'agent_name': agent.name,
-                    'inventory': features['inventory'],
-                    'backlog': features['backlog'],
-                    'demand_trend': demand_trend,
-                    'placed_order': action,
-                    'weekly_cost': result_cost
-                })
-        
+                columns['agent_name'].append(agent.name)
+                columns['inventory'].append(features['inventory'])
+                columns['backlog'].append(features['backlog'])
+                columns['demand_trend'].append(demand_trend)
+                columns['placed_order'].append(agent.history["placed_order_amount"][-1])
+                columns['weekly_cost'].append(agent.history["cost"][-1])
+
+        writer.write(columns)
+        total_rows += len(columns['agent_name'])
+
         if (i + 1) % 10 == 0:
             print(f"  ...completed {i + 1}/{num_simulations} simulations.")
 
-    df = pd.DataFrame(all_data)
-    df.to_csv('training_data_v2.csv', index=False)
-    print("\nSuccessfully generated and saved 'training_data_v2.csv'.")
-    print(f"Dataset contains {len(df)} records.")
+    writer.close()
+    print(f"\nSuccessfully generated and saved '{output}'.")
+    print(f"Dataset contains {total_rows} records.")
 
 if __name__ == "__main__":
-    generate_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate agent training data.")
+    parser.add_argument("--output", default="training_data_v2", help="Shard directory (or CSV path with --format csv)")
+    parser.add_argument("--format", default="npy", choices=["npy", "parquet", "csv"])
+    parser.add_argument("--simulations", type=int, default=100)
+    parser.add_argument("--weeks", type=int, default=100)
+    parser.add_argument("--append", action="store_true", help="Add new shards to an existing shard directory")
+    args = parser.parse_args()
+    if args.append and args.format == 'csv':
+        parser.error("--append needs npy or parquet output")
+    generate_data(args.output, args.format, args.simulations, args.weeks, args.append)
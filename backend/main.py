@@ -1,24 +1,56 @@
 import asyncio
-import uuid
+import importlib
 import os
-from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, WebSocket, HTTPException, Query, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from simulation.engine import SimulationEngine
-from simulation.analyst import get_final_summary
-from typing import Dict
-from pymongo import MongoClient
+from simulation.analyst import AnalystPipeline, CommentaryCache
+from simulation.instrumentation import INSTRUMENTS
+from simulation.model_registry import DEFAULT_MODEL_PATH, MODEL_REGISTRY
+from simulation.persistence import RunStore
+from simulation.queries import DEFAULT_PAGE_SIZE, RunQueries, run_filter
+from simulation.scenario import normalize_event
+from simulation.streaming import StreamOptions
+from simulation.jobs import JobScheduler, SchedulerBusy, stream_job
+from simulation.broker import create_broker
+from simulation.startup import WarmUp
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # --- DATABASE CONNECTION ---
+# Finished runs are written behind a bounded queue; the client connects on the first write
 MONGO_URI = os.environ.get("MONGO_CONNECTION_STRING")
-client = MongoClient(MONGO_URI)
-db = client.chainreact_db
-simulations_collection = db.simulations
+run_store = RunStore(
+    MONGO_URI,
+    max_queue=int(os.environ.get("PERSIST_MAX_QUEUE", "256")),
+    batch_size=int(os.environ.get("PERSIST_BATCH_SIZE", "32")),
+    max_retries=int(os.environ.get("PERSIST_MAX_RETRIES", "3")),
+)
+# Read side over the same database, for the /runs endpoints
+run_queries = RunQueries(lambda: run_store.db)
+
+# Routes disruptions to whichever worker owns a run (in-process unless SIMULATION_BROKER_URL is set)
+broker = create_broker(os.environ.get("SIMULATION_BROKER_URL"))
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    run_store.start()
+    await broker.start(scheduler.disrupt)
+    # Loading the agent model and finding the LLM's model finish in the background; see /ready
+    warm_up.start()
+    yield
+    await warm_up.close()
+    await broker.close()
+    await scheduler.close()
+    # Flush queued runs and commentary before the process exits
+    await run_store.close()
+    await asyncio.to_thread(analyst.cache.close)
+
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS CONFIGURATION ---
 # This list explicitly allows your frontend (both local and deployed) to connect.
@@ -37,106 +69,288 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-active_simulations: Dict[str, SimulationEngine] = {}
+# LLM commentary runs in the background and is attached to later frames
+analyst = AnalystPipeline(
+    max_concurrency=int(os.environ.get("ANALYST_MAX_CONCURRENCY", "4")),
+    timeout=float(os.environ.get("ANALYST_TIMEOUT_SECONDS", "8")),
+    cache=CommentaryCache(
+        ttl=float(os.environ.get("COMMENTARY_CACHE_TTL_SECONDS", "3600")),
+        disk_path=os.environ.get("COMMENTARY_CACHE_PATH"),
+    ),
+)
+
+# Simulations run as background jobs that outlive any one WebSocket
+scheduler = JobScheduler(
+    analyst,
+    run_store,
+    max_concurrent=int(os.environ.get("MAX_CONCURRENT_SIMULATIONS", "32")),
+    max_jobs=int(os.environ.get("MAX_SIMULATION_JOBS", "256")),
+    retention=float(os.environ.get("SIMULATION_RETENTION_SECONDS", "300")),
+    profile_dir=os.environ.get("SIMULATION_PROFILE_DIR"),
+    max_weeks=int(os.environ.get("MAX_SIMULATION_WEEKS", "520")),
+)
+
+async def load_agent_model():
+    model = await asyncio.to_thread(MODEL_REGISTRY.get, DEFAULT_MODEL_PATH)
+    return type(model).__name__ if model is not None else "no model file; AI agents play by the rules"
+
+async def find_llm_model():
+    await analyst.warm_up()
+    return analyst.llm.status
+
+async def import_branch_runner():
+    await asyncio.to_thread(importlib.import_module, "simulation.snapshot")
+    return "simulation.snapshot"
+
+warm_up = WarmUp()
+warm_up.add("agent_model", load_agent_model)
+warm_up.add("analyst", find_llm_model)
+warm_up.add("branching", import_branch_runner)
+
+# Read when /metrics is scraped, whether or not timings are being recorded
+INSTRUMENTS.gauge("chainreact_simulations", "Simulations held by the scheduler, by status.",
+                  lambda: {("status", status): count for status, count in scheduler.stats().items()
+                           if status not in ("jobs", "max_jobs", "max_concurrent")})
+INSTRUMENTS.gauge("chainreact_analyst_pending_requests", "Analyst commentary requests waiting on the LLM.",
+                  analyst.pending)
+INSTRUMENTS.gauge("chainreact_persist_queue_depth", "Finished runs waiting to be written to MongoDB.",
+                  lambda: run_store.stats()["queued"])
+INSTRUMENTS.gauge("chainreact_model_loads", "Agent model loads from disk since startup.",
+                  lambda: MODEL_REGISTRY.stats()["total_loads"])
+INSTRUMENTS.gauge("chainreact_ready", "1 once the background warm-up has finished.",
+                  lambda: int(warm_up.ready))
+INSTRUMENTS.gauge("chainreact_instrumentation_enabled", "1 while step, model, LLM and frame timings are recorded.",
+                  lambda: int(INSTRUMENTS.enabled))
 
 class DisruptionEvent(BaseModel):
     type: str
     value: int
-    duration: int
+    duration: Optional[int] = None
+    # The tier a CAPACITY or LEAD_TIME shock hits
+    tier: Optional[str] = None
 
 @app.get("/")
 def read_root():
     return {"message": "ChainReact Backend is running"}
 
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe: 503 until the background warm-up has finished, then
+    200 with what each step did (the analyst may be offline, for instance).
+    """
+    state = warm_up.describe()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@app.get("/models/stats")
+def model_stats():
+    return MODEL_REGISTRY.stats()
+
+@app.get("/analyst/cache/stats")
+def commentary_cache_stats():
+    # Coalesced requests never reach the cache, so the pipeline counts them
+    return {**analyst.cache.stats(), "coalesced": analyst.coalesced}
+
+@app.get("/persistence/stats")
+def persistence_stats():
+    return run_store.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(INSTRUMENTS.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/instrumentation")
+def set_instrumentation(settings: Dict = Body(...)):
+    """
+    Turns timing collection on or off at runtime, e.g. {"enabled": true};
+    {"reset": true} also clears what has been recorded so far.
+    """
+    if "enabled" in settings:
+        INSTRUMENTS.enabled = bool(settings["enabled"])
+    if settings.get("reset"):
+        INSTRUMENTS.reset()
+    return {"enabled": INSTRUMENTS.enabled}
+
+@app.get("/simulations")
+def list_simulations():
+    return {"stats": scheduler.stats(), "broker": broker.describe(), "simulations": scheduler.list()}
+
+@app.post("/simulations")
+async def create_simulation(start_data: Dict = Body(...)):
+    """
+    Starts a run without a WebSocket; clients can subscribe to it later.
+    """
+    try:
+        job = scheduler.submit(start_data)
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.describe()
+
+@app.get("/simulation/{simulation_id}")
+def get_simulation(simulation_id: str):
+    job = scheduler.get(simulation_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return job.describe()
+
+@app.get("/simulation/{simulation_id}/profile")
+def get_simulation_profile(simulation_id: str):
+    job = scheduler.get(simulation_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return job.profile()
+
 @app.post("/simulation/{simulation_id}/disrupt")
-def disrupt_simulation(simulation_id: str, event: DisruptionEvent):
-    simulation_engine = active_simulations.get(simulation_id)
-    if not simulation_engine:
+async def disrupt_simulation(simulation_id: str, event: DisruptionEvent):
+    event = event.model_dump(exclude_none=True)
+    try:
+        normalize_event(event)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The run may belong to another worker; the broker finds it
+    if not await broker.disrupt(simulation_id, event):
         raise HTTPException(status_code=404, detail="Simulation not found")
-    
-    simulation_engine.inject_disruption(event.model_dump())
-    return {"message": f"Disruption '{event.type}' injected into simulation {simulation_id}"}
+    return {"message": f"Disruption '{event['type']}' injected into simulation {simulation_id}"}
+
+MAX_BRANCHES = int(os.environ.get("MAX_SIMULATION_BRANCHES", "64"))
+MAX_BRANCH_WEEKS = int(os.environ.get("MAX_SIMULATION_BRANCH_WEEKS", "520"))
+
+def _bounded_int(value, name: str, limit: int) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= limit:
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer between 1 and {limit}")
+    return value
+
+@app.post("/simulation/{simulation_id}/branches")
+async def branch_simulation(simulation_id: str, request: Dict = Body(...)):
+    """
+    Forks what-if branches from a run's current week, e.g.
+    {"branches": [{"name": "spike", "weeks": 20, "demand": 25,
+    "disruptions": [{"week": 35, "type": "DEMAND_SPIKE", "value": 80, "duration": 3}]}]}.
+    The run itself carries on untouched.
+    """
+    job = scheduler.get(simulation_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    branches = request.get("branches", [])
+    if not isinstance(branches, list) or not 0 < len(branches) <= MAX_BRANCHES:
+        raise HTTPException(status_code=400, detail=f"Give between 1 and {MAX_BRANCHES} branches")
+    from simulation.snapshot import MAX_DISRUPTIONS, run_branches
+    for branch in branches:
+        if not isinstance(branch, dict):
+            raise HTTPException(status_code=400, detail="Each branch must be an object")
+        _bounded_int(branch.get("weeks", 10), "weeks", MAX_BRANCH_WEEKS)
+        disruptions = branch.get("disruptions", [])
+        if not isinstance(disruptions, list) or len(disruptions) > MAX_DISRUPTIONS:
+            raise HTTPException(status_code=400, detail=f"disruptions must be a list of at most {MAX_DISRUPTIONS} events")
+    # More processes than cores only adds start-up cost
+    processes = min(_bounded_int(request.get("processes", 1), "processes", MAX_BRANCHES), os.cpu_count() or 1)
+    snapshot = job.engine.snapshot()
+    try:
+        results = await asyncio.to_thread(run_branches, snapshot, branches, processes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"simulation_id": simulation_id, "week": snapshot.week, "branches": results}
+
+# --- STORED RUNS ---
+# Plain def endpoints: FastAPI runs them in its thread pool, so Mongo never blocks the event loop
+
+def _run_filter(config, min_cost, max_cost, since, until, weeks) -> Dict:
+    try:
+        return run_filter(config, min_cost, max_cost, since, until, weeks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/runs")
+def list_runs(config: Optional[str] = None, min_cost: Optional[float] = None, max_cost: Optional[float] = None,
+              since: Optional[str] = None, until: Optional[str] = None, weeks: Optional[int] = None,
+              sort: str = "-created_at", limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    """
+    Stored runs without their summaries or history, e.g.
+    /runs?config=RULE-AI-AI-AI&max_cost=50000&sort=total_cost. Pass
+    next_cursor back as cursor for the next page.
+    """
+    query = _run_filter(config, min_cost, max_cost, since, until, weeks)
+    try:
+        return run_queries.list_runs(query, sort, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/runs/stats")
+def run_stats(group_by: str = "config", config: Optional[str] = None, min_cost: Optional[float] = None,
+              max_cost: Optional[float] = None, since: Optional[str] = None, until: Optional[str] = None,
+              weeks: Optional[int] = None):
+    """
+    Cost and variance statistics per agent config (or per run length) over
+    the matching runs, to compare configs side by side.
+    """
+    query = _run_filter(config, min_cost, max_cost, since, until, weeks)
+    try:
+        return {"group_by": group_by, "groups": run_queries.stats(query, group_by)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/runs/{simulation_id}")
+def get_run(simulation_id: str):
+    run = run_queries.get_run(simulation_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@app.get("/runs/{simulation_id}/history")
+def get_run_history(simulation_id: str, start_week: int = 0, end_week: Optional[int] = None,
+                    agents: Optional[List[str]] = Query(None), fields: Optional[List[str]] = Query(None)):
+    """
+    A run's weekly history for weeks start_week..end_week, optionally only
+    some agents (?agents=Retailer&agents=Wholesaler) and fields.
+    """
+    try:
+        history = run_queries.history(simulation_id, start_week, end_week, agents, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if history is None:
+        raise HTTPException(status_code=404, detail="Run history not found")
+    return history
 
 @app.websocket("/ws/simulation")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    The first message either starts a run ({"type": "start_simulation", ...})
+    or follows an existing one on this worker ({"type": "subscribe", "id": ...});
+    both may carry stream options. Disconnecting leaves the run going.
+    """
     await websocket.accept()
-    simulation_id = str(uuid.uuid4())
+    simulation_id = None
     
     try:
         start_data = await websocket.receive_json()
-        if start_data.get("type") != "start_simulation":
+        if start_data.get("type") == "start_simulation":
+            try:
+                job = scheduler.submit(start_data)
+            except (SchedulerBusy, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                return
+        elif start_data.get("type") == "subscribe":
+            job = scheduler.get(start_data.get("id"))
+            if not job:
+                await websocket.send_json({"type": "error", "detail": "Simulation not found"})
+                return
+        else:
             return
-
-        agent_config = start_data.get("config", {})
-        num_weeks = start_data.get("weeks", 50)
-        
-        engine = SimulationEngine(agent_config=agent_config, enable_analyst=True)
-        active_simulations[simulation_id] = engine
+        simulation_id = job.id
         
+        # JSON per week every 0.3s unless the client negotiates another stream mode
+        try:
+            stream = StreamOptions.from_message(start_data)
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            return
         await websocket.send_json({"type": "simulation_id", "id": simulation_id})
-        
-        customer_demand = 20
-        for week in range(1, num_weeks + 1):
-            if week == 10:
-                customer_demand = 25
-
-            engine.run_step(week, customer_demand)
-
-            current_state = {"week": week, "agents": {}}
-            for agent in engine.agents:
-                current_state["agents"][agent.name] = {
-                    "inventory": agent.history["inventory"][-1],
-                    "placed_order_amount": agent.history["placed_order_amount"][-1],
-                    "backlog": agent.backlog,
-                    "cost": agent.history["cost"][-1]
-                }
-            
-            if engine.events_this_step:
-                current_state["events"] = engine.events_this_step
-
-            await websocket.send_json(current_state)
-            await asyncio.sleep(0.3)
-        
-        total_costs = {agent.name: int(sum(agent.history['cost'])) for agent in engine.agents}
-        
-        summary_input = {
-            "agent_config": engine.agent_config,
-            "total_costs": total_costs
-        }
-        summary_text = get_final_summary(summary_input)
-
-        retailer_inv_history = engine.retailer.history['inventory']
-        retailer_total_cost = total_costs.get("Retailer", 0)
-        retailer_holding_cost = int(sum(inv * engine.retailer.holding_cost for inv in retailer_inv_history))
-        retailer_stockout_cost = retailer_total_cost - retailer_holding_cost
-        
-        final_summary_payload = {
-            "type": "final_summary",
-            "title": "Simulation Complete: AI-Generated Performance Dashboard",
-            "summary_text": summary_text,
-            "total_cost_data": [{"name": name, "cost": cost} for name, cost in total_costs.items()],
-            "inventory_stability_data": [{"week": i, "inventory": inv} for i, inv in enumerate(retailer_inv_history)],
-            "cost_breakdown_data": [
-                {"name": "Holding Cost", "value": retailer_holding_cost},
-                {"name": "Stockout Cost", "value": retailer_stockout_cost}
-            ]
-        }
-        await websocket.send_json(final_summary_payload)
-
-        db_payload = {
-            "simulation_id": simulation_id,
-            "agent_config": engine.agent_config,
-            "summary": final_summary_payload,
-            "full_history": {agent.name: agent.history for agent in engine.agents}
-        }
-        simulations_collection.insert_one(db_payload)
-        print(f"Simulation {simulation_id} results saved to MongoDB.")
+        await websocket.send_json(stream.describe(job.agent_names))
+        await stream_job(job, websocket, stream)
             
     except WebSocketDisconnect:
-        print(f"Client disconnected. Simulation {simulation_id} closing.")
+        print(f"Client disconnected from simulation {simulation_id}; the run continues.")
     except Exception as e:
         print(f"Error: {e}")
-    finally:
-        if simulation_id in active_simulations:
-            del active_simulations[simulation_id]
-            print(f"Simulation {simulation_id} removed.")
\ No newline at end of file
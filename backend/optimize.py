@@ -0,0 +1,49 @@
+import argparse
+import json
+from simulation.optimizer import DEFAULT_BOUNDS, PolicyOptimizer, PolicyProblem
+
+def main():
+    """
+    Searches per-tier target inventories for the lowest expected total cost
+    under a stochastic scenario and prints the best agent_config.
+    """
+    parser = argparse.ArgumentParser(description="ChainReact policy optimizer.")
+    parser.add_argument("--problem", help="JSON file with scenario, weeks, agent_config, holding_cost, stockout_cost and seed (defaults fill any missing key)")
+    parser.add_argument("--weeks", type=int, help="Override the number of weeks per replicate")
+    parser.add_argument("--tiers", help="Comma-separated tiers to tune (default: every RULE tier)")
+    parser.add_argument("--bounds", type=int, nargs=2, default=DEFAULT_BOUNDS, metavar=("LOW", "HIGH"), help="Target inventory range")
+    parser.add_argument("--candidates", type=int, default=64, help="Candidates sampled per generation")
+    parser.add_argument("--generations", type=int, default=3, help="Sampling generations, each narrower around the best so far")
+    parser.add_argument("--min-replicates", type=int, default=4, help="Replicates every candidate is scored on first")
+    parser.add_argument("--max-replicates", type=int, default=64, help="Replicates the finalists are scored on")
+    parser.add_argument("--eta", type=int, default=2, help="Successive halving keeps 1/eta per round")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for candidate sampling")
+    parser.add_argument("--output", help="Also write the result JSON here")
+    args = parser.parse_args()
+
+    spec = {}
+    if args.problem:
+        with open(args.problem) as f:
+            spec = json.load(f)
+    if args.weeks is not None:
+        spec["weeks"] = args.weeks
+
+    optimizer = PolicyOptimizer(PolicyProblem(spec), tiers=args.tiers.split(",") if args.tiers else None, bounds=args.bounds,
+                                candidates=args.candidates, generations=args.generations,
+                                min_replicates=args.min_replicates, max_replicates=args.max_replicates,
+                                eta=args.eta, processes=args.processes, seed=args.seed)
+    result = optimizer.run(progress=True)
+
+    print(f"\nBest expected cost {result['expected_cost']:,.1f} (+/- {result['std_error']:,.1f}) over {result['replicates']} replicates; "
+          f"default policy {result['baseline_cost']:,.1f}, saving {result['improvement']:,.1f} (+/- {result['improvement_std_error']:,.1f}).")
+    print(f"{result['candidates_evaluated']} candidates, {result['chain_weeks']:,} chain-weeks in {result['seconds']:.2f}s "
+          f"({result['chain_weeks_per_sec']:,.0f} chain-weeks/s on {result['processes']} processes).")
+    print(json.dumps({"agent_config": result["agent_config"]}, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Full result written to '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,53 @@
 # In backend/run.py
 
 from simulation.engine import SimulationEngine
+from simulation.scenario import DEFAULT_SCENARIO
+from simulation.storage import ShardWriter
+import argparse
 import json
 
-def main():
+HISTORY_SCHEMA = {
+    'week': 'int32',
+    'agent_name': 'int8',
+    'inventory': 'int32',
+    'backlog': 'int32',
+    'placed_order_amount': 'int32',
+    'cost': 'int32',
+}
+
+def main(output="simulation_results", write_json=False):
     """
     Initializes and runs the simulation, then prints the results.
+    Each week's agent states are streamed to .npy shards under output as the
+    simulation runs; write_json also dumps the old simulation_results.json.
     """
     print("Initializing ChainReact simulation...")
-    engine = SimulationEngine()
-    
     num_weeks = 50
-    customer_demand = 20
+    # Stable demand that steps up at week 10, compiled to one value per week
+    engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=num_weeks, scenario=DEFAULT_SCENARIO)
+    agent_names = [agent.name for agent in engine.agents]
+    writer = ShardWriter(output, HISTORY_SCHEMA, categories={'agent_name': agent_names})
+    
+    demand = engine.timeline.demand.tolist()
     
     print(f"Running simulation for {num_weeks} weeks...")
-    print(f"Initial stable customer demand: {customer_demand} units/week.")
+    print(f"Initial stable customer demand: {demand[0]} units/week.")
 
     for week in range(1, num_weeks + 1):
-        # Introduce a sudden, small increase in demand at week 10
-        if week == 10:
-            customer_demand = 25
-            print(f"!!! Week {week}: Customer demand permanently increases to {customer_demand} units/week. !!!")
+        if week > 1 and demand[week - 1] != demand[week - 2]:
+            print(f"!!! Week {week}: Customer demand changes to {demand[week - 1]} units/week. !!!")
             
-        engine.run_step(week, customer_demand)
+        engine.run_step(week)
+        writer.write({
+            'week': [week] * len(engine.agents),
+            'agent_name': agent_names,
+            'inventory': [agent.inventory for agent in engine.agents],
+            'backlog': [agent.backlog for agent in engine.agents],
+            'placed_order_amount': [agent.placed_order_amount for agent in engine.agents],
+            'cost': [agent.history['cost'][-1] for agent in engine.agents],
+        })
 
+    writer.close()
     print("\n--- Simulation Complete ---")
     print("--- Final Historical Order Data ---")
 
@@ -32,13 +56,19 @@ def main():
     for agent in engine.agents:
         print(f"\nAgent: {agent.name}")
         print(f"  Orders Placed: {agent.history['placed_order_amount']}")
-        all_history[agent.name] = agent.history
+        all_history[agent.name] = agent.history.to_dict()
 
-    # Optionally, save to a file to inspect the data
-    with open("simulation_results.json", "w") as f:
-        json.dump(all_history, f, indent=2)
-    print("\nFull results saved to simulation_results.json")
+    print(f"\nWeekly history saved to '{output}/'")
+    if write_json:
+        # Optionally, save to a file to inspect the data
+        with open("simulation_results.json", "w") as f:
+            json.dump(all_history, f, indent=2)
+        print("Full results saved to simulation_results.json")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run a single ChainReact simulation.")
+    parser.add_argument("--output", default="simulation_results", help="History shard directory")
+    parser.add_argument("--json", action="store_true", help="Also write simulation_results.json")
+    args = parser.parse_args()
+    main(args.output, args.json)
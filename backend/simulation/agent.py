@@ -1,5 +1,122 @@
+from array import array
+from collections.abc import Mapping, Sequence
+import numpy as np
+from .scenario import UNLIMITED
+
+HISTORY_FIELDS = ("inventory", "placed_order_amount", "cost")
+
+class HistoryColumn(Sequence):
+    """
+    Read-only view of one history field. Indexing, iteration and sum() give
+    plain ints like the list it replaces; .array is the underlying NumPy view.
+    """
+    __slots__ = ("_history", "_row")
+
+    def __init__(self, history: 'AgentHistory', row: int):
+        self._history = history
+        self._row = row
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._history.column(HISTORY_FIELDS[self._row])
+
+    def __len__(self):
+        return self._history._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._history._columns[self._row][:self._history._length][index].tolist()
+        if index < 0:
+            index += self._history._length
+        if not 0 <= index < self._history._length:
+            raise IndexError("history index out of range")
+        return self._history._columns[self._row][index]
+
+    def __iter__(self):
+        return iter(self._history._columns[self._row][:self._history._length].tolist())
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self.array.tolist())
+
+class AgentHistory(Mapping):
+    """
+    Weekly agent history kept in preallocated int32 arrays (one per field in
+    HISTORY_FIELDS) instead of growing lists of boxed ints. It reads like the
+    old dict of lists, e.g. history["cost"][-1]; to_dict() gives plain lists
+    for JSON and Mongo. Capacity doubles if a run outgrows it.
+    """
+    __slots__ = ("_columns", "_length", "_capacity")
+
+    def __init__(self, capacity: int = 64):
+        self._capacity = max(1, capacity)
+        self._columns = [array("i", bytes(4 * self._capacity)) for _ in HISTORY_FIELDS]
+        self._length = 0
+
+    def _grow(self):
+        # New buffers rather than resizing in place, so existing NumPy views stay valid
+        self._columns = [column + array("i", bytes(4 * self._capacity)) for column in self._columns]
+        self._capacity *= 2
+
+    def append(self, inventory: int, placed_order_amount: int, cost: int):
+        # Plain item stores: this runs for every agent every week
+        if self._length == self._capacity:
+            self._grow()
+        n = self._length
+        inventory_column, order_column, cost_column = self._columns
+        inventory_column[n] = inventory
+        order_column[n] = placed_order_amount
+        cost_column[n] = cost
+        self._length = n + 1
+
+    def column(self, key: str) -> np.ndarray:
+        """
+        Zero-copy NumPy view of one field's recorded weeks.
+        """
+        return np.frombuffer(self._columns[HISTORY_FIELDS.index(key)], dtype=np.int32, count=self._length)
+
+    def __getitem__(self, key: str) -> HistoryColumn:
+        return HistoryColumn(self, HISTORY_FIELDS.index(key))
+
+    def __iter__(self):
+        return iter(HISTORY_FIELDS)
+
+    def __len__(self):
+        return len(HISTORY_FIELDS)
+
+    def to_dict(self) -> dict:
+        return {key: column[:self._length].tolist() for key, column in zip(HISTORY_FIELDS, self._columns)}
+
+    def to_array(self) -> np.ndarray:
+        """
+        A (fields, weeks) int32 copy of the recorded history.
+        """
+        return np.array([self.column(key) for key in HISTORY_FIELDS], dtype=np.int32).reshape(len(HISTORY_FIELDS), -1)
+
+    @classmethod
+    def from_array(cls, values: np.ndarray, capacity: int = 0) -> 'AgentHistory':
+        """
+        Rebuilds a history from to_array() output, with room for at least capacity weeks.
+        """
+        length = values.shape[1]
+        history = cls(max(capacity, length))
+        for column, row in zip(history._columns, np.asarray(values, dtype=np.int32)):
+            column[:length] = array("i", row.tobytes())
+        history._length = length
+        return history
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self._columns)
+
 class Agent:
-    def __init__(self, name: str, target_inventory: int = 100):
+    __slots__ = ("name", "upstream_agent", "downstream_agent", "holding_cost", "stockout_cost",
+                 "inventory", "target_inventory", "backlog", "incoming_shipment",
+                 "placed_order_amount", "shipped_this_week", "capacity", "history")
+
+    def __init__(self, name: str, target_inventory: int = 100, history_capacity: int = 64):
         self.name = name
         self.upstream_agent: 'Agent' | None = None
         self.downstream_agent: 'Agent' | None = None
@@ -13,15 +130,15 @@ class Agent:
         self.incoming_shipment: int = 0
         self.placed_order_amount: int = 0
         self.shipped_this_week: int = 0
+        # Most units shipped in a week; the engine lowers it while a capacity shock is in force
+        self.capacity: int = UNLIMITED
 
-        self.history = {
-            "inventory": [self.inventory],
-            "placed_order_amount": [0],
-            "cost": [0]
-        }
+        # Sized for the whole run when the engine knows num_weeks (+1 for the week-0 state)
+        self.history = AgentHistory(history_capacity)
+        self.history.append(self.inventory, 0, 0)
 
     def __repr__(self):
-        cost_this_week = self.history["cost"][-1] if self.history["cost"] else 0
+        cost_this_week = self.history["cost"][-1] if len(self.history["cost"]) else 0
         return f"Agent({self.name}, Inv: {self.inventory}, Backlog: {self.backlog}, Order: {self.placed_order_amount}, Cost: {cost_this_week})"
     
     def receive_shipment(self):
@@ -33,7 +150,7 @@ class Agent:
             total_demand = self.backlog + customer_demand
         else:
             total_demand = self.backlog
-        units_to_ship = min(self.inventory, total_demand)
+        units_to_ship = min(self.inventory, total_demand, self.capacity)
         self.shipped_this_week = units_to_ship
         if self.downstream_agent:
             self.downstream_agent.incoming_shipment = units_to_ship
@@ -54,8 +171,5 @@ class Agent:
         self.shipped_this_week = 0
     
     def record_state(self):
-        self.history['inventory'].append(self.inventory)
-        self.history['placed_order_amount'].append(self.placed_order_amount)
-        
         cost_this_week = (self.inventory * self.holding_cost) + (self.backlog * self.stockout_cost)
-        self.history['cost'].append(cost_this_week)
\ No newline at end of file
+        self.history.append(self.inventory, self.placed_order_amount, cost_this_week)
\ No newline at end of file
@@ -1,45 +1,85 @@
-import joblib
+import time
+import warnings
+from typing import Optional
 import numpy as np
-import pandas as pd
 from .agent import Agent
+from .instrumentation import INSTRUMENTS
+from .model_registry import MODEL_REGISTRY, resolve_model_path
+
+FEATURE_NAMES = ['inventory', 'backlog', 'demand_trend']
+
+
+def predict_orders(model, features: np.ndarray) -> np.ndarray:
+    """
+    Runs a single predict over a (rows, 3) feature matrix laid out as
+    FEATURE_NAMES and turns the predictions into non-negative order amounts.
+    """
+    start = time.perf_counter() if INSTRUMENTS.enabled else None
+    with warnings.catch_warnings():
+        # The model was fitted on a DataFrame; a plain ndarray gives the same predictions
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        predicted = model.predict(features)
+    if start is not None:
+        INSTRUMENTS.observe("chainreact_model_predict_seconds", time.perf_counter() - start)
+        INSTRUMENTS.inc("chainreact_model_predict_rows_total", len(features))
+    return np.maximum(0, np.trunc(predicted)).astype(np.int64)
+
 
 class AIAgent(Agent):
-    def __init__(self, name: str, target_inventory: int = 100):
-        super().__init__(name, target_inventory)
+    __slots__ = ("demand_history", "model_path")
+
+    def __init__(self, name: str, target_inventory: int = 100,
+                 model_path: Optional[str] = None, model_version: Optional[str] = None,
+                 history_capacity: int = 64):
+        super().__init__(name, target_inventory, history_capacity)
         self.demand_history = []
-        try:
-            self.model = joblib.load('agent_model.joblib')
+        self.model_path = resolve_model_path(model_path, model_version)
+        if self.model is not None:
             print(f"AIAgent '{self.name}' initialized and model loaded successfully.")
-        except FileNotFoundError:
-            print(f"ERROR: Could not find 'agent_model.joblib'. Please train the model first.")
-            self.model = None
+
+    @property
+    def model(self):
+        # Shared through the registry, so agents never load their own copy
+        return MODEL_REGISTRY.get(self.model_path)
 
     def fulfill_downstream_orders(self, customer_demand: int = 0):
         if self.name == "Retailer":
             demand_this_week = self.backlog + customer_demand
         else:
             demand_this_week = self.backlog
-        
+
         self.demand_history.append(demand_this_week)
         if len(self.demand_history) > 4:
             self.demand_history.pop(0)
 
         super().fulfill_downstream_orders(customer_demand)
 
-    def place_upstream_order(self):
-        if self.name == "Factory" or not self.model:
-            super().place_upstream_order()
-            return
+    @property
+    def uses_model(self) -> bool:
+        return self.name != "Factory" and self.model is not None
 
+    def features(self) -> list:
+        """
+        Returns this week's [inventory, backlog, demand_trend] feature row.
+        """
         demand_trend = sum(self.demand_history) / len(self.demand_history) if self.demand_history else 0
-            
-        feature_names = ['inventory', 'backlog', 'demand_trend']
-        current_state_df = pd.DataFrame([[self.inventory, self.backlog, demand_trend]], columns=feature_names)
-        
-        predicted_order = self.model.predict(current_state_df)[0]
-        self.placed_order_amount = max(0, int(predicted_order))
+        return [self.inventory, self.backlog, demand_trend]
+
+    def apply_order(self, order_amount: int):
+        """
+        Places an order that was predicted for this agent by a batched inference stage.
+        """
+        self.placed_order_amount = int(order_amount)
 
         if self.upstream_agent:
             self.upstream_agent.backlog += self.placed_order_amount
-        
-        self.shipped_this_week = 0
\ No newline at end of file
+
+        self.shipped_this_week = 0
+
+    def place_upstream_order(self):
+        if not self.uses_model:
+            super().place_upstream_order()
+            return
+
+        predicted_order = predict_orders(self.model, np.array([self.features()], dtype=np.float64))[0]
+        self.apply_order(predicted_order)
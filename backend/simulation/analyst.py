@@ -1,70 +1,177 @@
 import os
-from groq import Groq
+import asyncio
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from .instrumentation import INSTRUMENTS
 
 load_dotenv()
 
 _ACTIVE_MODEL = None
+# groq (and httpx under it) is only imported when the first client is created
+_CLIENT = None
+_ASYNC_CLIENT = None
 
-def _find_and_cache_active_model():
+# The discovered model is remembered on disk so restarts skip the models.list() call
+MODEL_CACHE_PATH = os.environ.get("GROQ_MODEL_CACHE_PATH", os.path.join(tempfile.gettempdir(), "chainreact_groq_model.json"))
+MODEL_CACHE_TTL = float(os.environ.get("GROQ_MODEL_CACHE_TTL_SECONDS", "86400"))
+DISCOVERY_TIMEOUT = float(os.environ.get("GROQ_DISCOVERY_TIMEOUT_SECONDS", "5"))
+
+COMMENTARY_SYSTEM_PROMPT = "You are a concise supply chain analyst providing a one-sentence summary for a live dashboard. Be insightful but brief."
+SUMMARY_SYSTEM_PROMPT = "You are an AI analyst summarizing a completed supply chain simulation for an executive dashboard. Provide a 2-3 sentence insightful summary of the results."
+
+def _get_client():
     """
-    Asks the Groq API for its list of models and finds the first suitable,
-    active chat model. Caches the result for the application's lifetime.
+    Returns the shared synchronous Groq client, creating it on first use.
     """
+    global _CLIENT
+    if _CLIENT is None:
+        from groq import Groq
+        _CLIENT = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+    return _CLIENT
+
+def _get_async_client():
+    """
+    Returns the shared asyncio Groq client, creating it on first use.
+    """
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None:
+        from groq import AsyncGroq
+        _ASYNC_CLIENT = AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"))
+    return _ASYNC_CLIENT
+
+def _pick_model(models) -> str:
+    found_model = None
+    # Find the first available model that is NOT for audio (whisper or tts)
+    for model in models:
+        model_id_lower = model.id.lower()
+        if model.active and "whisper" not in model_id_lower and "tts" not in model_id_lower:
+            found_model = model.id
+            if "llama3" in model_id_lower: # Prefer Llama3 if available
+                break
+    if not found_model:
+        raise ValueError("No suitable active chat model found at Groq.")
+    return found_model
+
+def _read_cached_model(path: Optional[str] = MODEL_CACHE_PATH, ttl: float = MODEL_CACHE_TTL) -> Optional[str]:
+    """
+    Returns the model found by an earlier process, if it is recent enough.
+    """
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, TypeError, ValueError):
+        return None
+    if time.time() - cached.get("discovered_at", 0) >= ttl:
+        return None
+    return cached.get("model")
+
+def _write_cached_model(model_id: str, path: Optional[str] = MODEL_CACHE_PATH):
+    if not path:
+        return
+    try:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": model_id, "discovered_at": time.time()}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"WARNING: Could not cache the Groq model in '{path}': {e}")
+
+def _use_model(model_id: str, source: str) -> str:
     global _ACTIVE_MODEL
+    _ACTIVE_MODEL = model_id
+    print(f"Success! Using active model: {model_id} ({source})")
+    return model_id
+
+def _find_and_cache_active_model():
+    """
+    Blocking model discovery for the blocking helpers below: the disk cache
+    if it is fresh, else the Groq model list. Never runs at import time.
+    """
     if _ACTIVE_MODEL:
         return _ACTIVE_MODEL
-    
+    cached = _read_cached_model()
+    if cached:
+        return _use_model(cached, "cached")
+
     try:
         print("Finding an active Groq chat model...")
-        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-        models = client.models.list().data
-        
-        found_model = None
-        # Find the first available model that is NOT for audio (whisper or tts)
-        for model in models:
-            model_id_lower = model.id.lower()
-            if model.active and "whisper" not in model_id_lower and "tts" not in model_id_lower:
-                found_model = model.id
-                if "llama3" in model_id_lower: # Prefer Llama3 if available
-                    break
-        
-        if found_model:
-            print(f"Success! Using active model: {found_model}")
-            _ACTIVE_MODEL = found_model
-            return _ACTIVE_MODEL
-        else:
-            raise ValueError("No suitable active chat model found at Groq.")
-            
+        model_id = _pick_model(_get_client().models.list().data)
     except Exception as e:
         print(f"CRITICAL: Could not retrieve model list from Groq API. Analyst will be offline. Error: {e}")
         return None
+    _write_cached_model(model_id)
+    return _use_model(model_id, "discovered")
+
+async def discover_active_model(refresh: bool = False, timeout: float = DISCOVERY_TIMEOUT) -> Optional[str]:
+    """
+    Async model discovery: the disk cache if it is fresh (unless refresh),
+    else the Groq model list through the async client, bounded by timeout
+    so a missing network only leaves the analyst offline.
+    """
+    if _ACTIVE_MODEL and not refresh:
+        return _ACTIVE_MODEL
+    cached = None if refresh else _read_cached_model()
+    if cached:
+        return _use_model(cached, "cached")
+
+    try:
+        print("Finding an active Groq chat model...")
+        models = await asyncio.wait_for(_get_async_client().models.list(), timeout)
+        model_id = _pick_model(models.data)
+    except Exception as e:
+        reason = f"no answer within {timeout:g}s" if isinstance(e, asyncio.TimeoutError) else e
+        print(f"CRITICAL: Could not retrieve model list from Groq API. Analyst will be offline. Error: {reason}")
+        return None
+    await asyncio.to_thread(_write_cached_model, model_id)
+    return _use_model(model_id, "discovered")
 
-# Find the model once when the server starts
-_find_and_cache_active_model()
+def _commentary_prompt(event_type: str, data: dict) -> Optional[str]:
+    if event_type == "BULLWHIP":
+        return f"A bullwhip effect is suspected at week {data['week']}. The {data['tier']}'s order variance is {data['amplification']}x that of the {data['downstream']}: it ordered {data['order']} while the {data['downstream']} ordered {data['downstream_order']}. Explain this variance."
+    elif event_type == "DEMAND_SHIFT":
+        before, after = data.get('before', 20), data.get('after', 25)
+        change = "increased" if after >= before else "decreased"
+        return f"At week {data['week']}, the base customer demand permanently {change} from {before} to {after}. Briefly state the long-term impact of this market shift."
+    elif event_type == "DISRUPTION":
+        kind = data.get('type', "DEMAND_SPIKE")
+        span = f"for {data['duration']} weeks" if data.get('duration') is not None else "until further notice"
+        if kind == "CAPACITY":
+            effect = f"The {data['tier']} can ship at most {data['value']} units a week {span}."
+        elif kind == "LEAD_TIME":
+            effect = f"Shipments to the {data['tier']} take {data['value']} extra weeks to arrive {span}."
+        elif kind == "DEMAND_SHIFT":
+            effect = f"Customer demand shifted by {data['value']} units a week {span}."
+        else:
+            effect = f"Demand was artificially spiked to {data['value']} {span}."
+        return f"A major disruption was injected at week {data['week']}. {effect} Describe the immediate impact."
+    return None
+
+def _summary_prompt(summary_data: dict) -> str:
+    return f"The simulation is complete. Here is the final data: {str(summary_data)}. Analyze these results, focusing on the total costs and the performance of different agent types (AI vs RULE)."
 
 def get_dynamic_commentary(event_type: str, data: dict) -> str:
     """
     Generates dynamic commentary for a live simulation event using an LLM.
+    Blocking; the server uses AnalystPipeline instead.
     """
-    if not _ACTIVE_MODEL:
+    if not _find_and_cache_active_model():
         return "Analyst is offline (could not find an active model)."
 
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-    system_prompt = "You are a concise supply chain analyst providing a one-sentence summary for a live dashboard. Be insightful but brief."
-    prompt = ""
-    if event_type == "BULLWHIP":
-        prompt = f"A bullwhip effect is suspected at week {data['week']}. Retailer order is {data['retailer_order']} while Distributor order has spiked to {data['distributor_order']}. Explain this variance."
-    elif event_type == "DEMAND_SHIFT":
-        prompt = f"At week {data['week']}, the base customer demand permanently increased from 20 to 25. Briefly state the long-term impact of this market shift."
-    elif event_type == "DISRUPTION":
-         prompt = f"A major disruption was injected at week {data['week']}. Demand was artificially spiked to {data['value']} for {data['duration']} weeks. Describe the immediate impact."
-    else:
+    prompt = _commentary_prompt(event_type, data)
+    if prompt is None:
         return "An unknown event occurred."
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+        chat_completion = _get_client().chat.completions.create(
+            messages=[{"role": "system", "content": COMMENTARY_SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
             model=_ACTIVE_MODEL,
             temperature=0.5,
         )
@@ -77,21 +184,366 @@ def get_dynamic_commentary(event_type: str, data: dict) -> str:
 def get_final_summary(summary_data: dict) -> str:
     """
     Generates a final executive summary of the entire simulation run.
+    Blocking; the server uses AnalystPipeline instead.
     """
-    if not _ACTIVE_MODEL:
+    if not _find_and_cache_active_model():
         return "Could not generate final summary (could not find an active model)."
 
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-    system_prompt = "You are an AI analyst summarizing a completed supply chain simulation for an executive dashboard. Provide a 2-3 sentence insightful summary of the results."
-    prompt = f"The simulation is complete. Here is the final data: {str(summary_data)}. Analyze these results, focusing on the total costs and the performance of different agent types (AI vs RULE)."
-
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+        chat_completion = _get_client().chat.completions.create(
+            messages=[{"role": "system", "content": SUMMARY_SYSTEM_PROMPT}, {"role": "user", "content": _summary_prompt(summary_data)}],
             model=_ACTIVE_MODEL,
             temperature=0.7,
         )
         return chat_completion.choices[0].message.content
     except Exception as e:
         print(f"Groq API Error during summary: {e}")
-        return "Could not generate final summary due to an API error."
\ No newline at end of file
+        return "Could not generate final summary due to an API error."
+
+
+class GroqLLM:
+    """
+    Async chat completions through the shared AsyncGroq client. The model
+    to use is found by warm_up(), which the server starts in the background
+    and the first request waits on; a failed discovery is retried on a
+    later request after retry_interval seconds.
+    """
+    def __init__(self, retry_interval: float = 60.0):
+        self.retry_interval = retry_interval
+        self._discovery: Optional[asyncio.Future] = None
+        self._failed_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return _ACTIVE_MODEL is not None
+
+    @property
+    def status(self) -> str:
+        if _ACTIVE_MODEL is not None:
+            return "ready"
+        if self._discovery is None or not self._discovery.done():
+            return "pending"
+        return "offline"
+
+    async def warm_up(self) -> bool:
+        if _ACTIVE_MODEL is not None:
+            return True
+        if self._discovery is None or (self._discovery.done() and time.monotonic() - self._failed_at >= self.retry_interval):
+            self._discovery = asyncio.ensure_future(discover_active_model())
+            self._discovery.add_done_callback(self._discovered)
+        # Shared by every caller; one cancelled request must not cancel the discovery
+        return await asyncio.shield(self._discovery) is not None
+
+    def _discovered(self, discovery: asyncio.Future):
+        if discovery.cancelled():
+            self._failed_at = 0.0
+        elif discovery.result() is None:
+            self._failed_at = time.monotonic()
+
+    async def complete(self, system_prompt: str, prompt: str, temperature: float) -> str:
+        chat_completion = await _get_async_client().chat.completions.create(
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+            model=_ACTIVE_MODEL,
+            temperature=temperature,
+        )
+        return chat_completion.choices[0].message.content
+
+
+class FakeLLM:
+    """
+    Local stand-in for load tests: answers after a simulated network latency
+    without touching the network. Select it with ANALYST_BACKEND=fake.
+    """
+    available = True
+    status = "ready"
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def complete(self, system_prompt: str, prompt: str, temperature: float) -> str:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)))
+        return f"[fake analyst] {prompt.split('.')[0]}."
+
+    async def warm_up(self) -> bool:
+        return True
+
+
+def create_llm():
+    if os.environ.get("ANALYST_BACKEND", "groq").lower() == "fake":
+        return FakeLLM(latency=float(os.environ.get("FAKE_LLM_LATENCY", "0.5")))
+    return GroqLLM()
+
+
+class CommentaryCache:
+    """
+    LRU + TTL cache of analyst sentences keyed on a normalized event
+    signature: the event type plus its numeric fields rounded into buckets,
+    so the same kind of event with similar numbers reuses one LLM answer.
+    With disk_path set, entries are also kept in a small SQLite file so the
+    cache survives restarts. All SQLite work happens on one background
+    thread: lookups are awaited there, writes are queued and committed
+    together, and expired rows are deleted every PRUNE_INTERVAL seconds.
+    """
+    # Bucket width per data field; other numeric fields use DEFAULT_BUCKET
+    BUCKETS = {"week": 10, "amplification": 5, "order": 25, "downstream_order": 10, "value": 10, "duration": 2}
+    DEFAULT_BUCKET = 10
+    PRUNE_INTERVAL = 600.0
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pruned = 0
+        self._disk = None
+        self._disk_thread: Optional[ThreadPoolExecutor] = None
+        # Rows waiting for the disk thread; while non-empty a flush is scheduled
+        self._unwritten: List[Tuple[str, str, float]] = []
+        self._unwritten_lock = threading.Lock()
+        self._last_prune = 0.0
+        if disk_path:
+            self._disk_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="commentary-cache")
+            self._disk_thread.submit(self._open, disk_path).result()
+
+    def _open(self, disk_path: str):
+        self._disk = sqlite3.connect(disk_path)
+        self._disk.execute("CREATE TABLE IF NOT EXISTS commentary (key TEXT PRIMARY KEY, text TEXT, created REAL)")
+        self._disk.execute("CREATE INDEX IF NOT EXISTS commentary_created ON commentary (created)")
+        self._prune()
+
+    def _prune(self):
+        deleted = self._disk.execute("DELETE FROM commentary WHERE created < ?", (time.time() - self.ttl,)).rowcount
+        self._disk.commit()
+        self.pruned += max(0, deleted)
+        self._last_prune = time.monotonic()
+
+    @classmethod
+    def signature(cls, event_type: str, data: dict) -> str:
+        parts = [event_type]
+        for field in sorted(data):
+            value = data[field]
+            if isinstance(value, (int, float)):
+                value = int(value // cls.BUCKETS.get(field, cls.DEFAULT_BUCKET))
+            parts.append(f"{field}={value}")
+        return "|".join(parts)
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+
+        if self._disk_thread is not None:
+            row = await asyncio.get_running_loop().run_in_executor(self._disk_thread, self._read, key)
+            if row is not None and now - row[1] < self.ttl:
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def _read(self, key: str) -> Optional[Tuple[str, float]]:
+        return self._disk.execute("SELECT text, created FROM commentary WHERE key = ?", (key,)).fetchone()
+
+    def put(self, key: str, text: str):
+        created = time.time()
+        self._remember(key, text, created)
+        if self._disk_thread is not None:
+            with self._unwritten_lock:
+                self._unwritten.append((key, text, created))
+                if len(self._unwritten) > 1:
+                    return
+            self._disk_thread.submit(self._flush)
+
+    def _flush(self):
+        # Runs on the disk thread: everything put since the last flush goes in one commit
+        with self._unwritten_lock:
+            rows, self._unwritten = self._unwritten, []
+        try:
+            if rows:
+                self._disk.executemany("INSERT OR REPLACE INTO commentary VALUES (?, ?, ?)", rows)
+                self._disk.commit()
+            if time.monotonic() - self._last_prune >= self.PRUNE_INTERVAL:
+                self._prune()
+        except sqlite3.Error as e:
+            print(f"WARNING: Could not write commentary cache: {e}")
+
+    def close(self):
+        """
+        Writes out queued entries and closes the SQLite file; blocks until done.
+        """
+        if self._disk_thread is None:
+            return
+        disk_thread, self._disk_thread = self._disk_thread, None
+        disk_thread.submit(self._flush)
+        disk_thread.submit(self._disk.close)
+        disk_thread.shutdown(wait=True)
+
+    def _remember(self, key: str, text: str, created: float):
+        self._entries[key] = (created, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(self._entries), "pruned": self.pruned}
+
+
+class AnalystPipeline:
+    """
+    Runs analyst requests as background tasks so the simulation loop never
+    waits on the LLM. At most max_concurrency requests are in flight, each
+    one (including its wait for a slot) gets timeout seconds, and finished
+    commentary is collected per simulation to ride along on a later frame.
+    With a CommentaryCache, similar events are answered from the cache and
+    concurrent identical requests share a single LLM call.
+    """
+    def __init__(self, llm=None, max_concurrency: int = 4, timeout: float = 8.0,
+                 cache: Optional[CommentaryCache] = None):
+        self.llm = llm if llm is not None else create_llm()
+        self.timeout = timeout
+        self.cache = cache
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Cache misses answered by sharing another request's in-flight LLM call
+        self.coalesced = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._ready: Dict[str, List[Dict]] = {}
+        self._pending: Dict[str, set] = {}
+
+    async def _complete(self, system_prompt: str, prompt: str, temperature: float) -> str:
+        async with self._semaphore:
+            return await self.llm.complete(system_prompt, prompt, temperature)
+
+    async def _ask(self, system_prompt: str, prompt: str, temperature: float) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns (text, None) on success or (None, reason) on a timeout or API error.
+        """
+        start = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(self._complete(system_prompt, prompt, temperature), self.timeout)
+            result = text, None
+        except asyncio.TimeoutError:
+            result = None, "timeout"
+        except Exception as e:
+            print(f"LLM API Error: {e}")
+            result = None, "error"
+        if INSTRUMENTS.enabled:
+            outcome = result[1] or "ok"
+            INSTRUMENTS.observe("chainreact_llm_request_seconds", time.perf_counter() - start, outcome=outcome)
+            INSTRUMENTS.inc("chainreact_llm_requests_total", outcome=outcome)
+        return result
+
+    async def warm_up(self) -> bool:
+        """
+        Gets the LLM ready (finds its model); True if the analyst can answer.
+        """
+        return await self.llm.warm_up()
+
+    async def commentary(self, event_type: str, data: dict) -> str:
+        if not self.llm.available and not await self.llm.warm_up():
+            return "Analyst is offline (could not find an active model)."
+        prompt = _commentary_prompt(event_type, data)
+        if prompt is None:
+            return "An unknown event occurred."
+        if self.cache is None:
+            return await self._fresh_commentary(prompt)
+
+        key = CommentaryCache.signature(event_type, data)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+            # The request we were sharing was cancelled with its simulation; ask on our own
+            return await self._fresh_commentary(prompt, cache_key=key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            text = await self._fresh_commentary(prompt, cache_key=key)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+        future.set_result(text)
+        return text
+
+    async def _fresh_commentary(self, prompt: str, cache_key: Optional[str] = None) -> str:
+        text, reason = await self._ask(COMMENTARY_SYSTEM_PROMPT, prompt, 0.5)
+        if reason == "timeout":
+            return "Analyst could not respond in time for this event."
+        if text is None:
+            return "Analyst is currently offline due to API error."
+        # Only real answers are cached, never the fallback messages
+        if cache_key is not None:
+            self.cache.put(cache_key, text)
+        return text
+
+    async def final_summary(self, summary_data: dict) -> str:
+        if not self.llm.available and not await self.llm.warm_up():
+            return "Could not generate final summary (could not find an active model)."
+        text, reason = await self._ask(SUMMARY_SYSTEM_PROMPT, _summary_prompt(summary_data), 0.7)
+        if reason == "timeout":
+            return "Could not generate final summary in time."
+        return text if text is not None else "Could not generate final summary due to an API error."
+
+    def submit(self, simulation_id: str, request: Dict):
+        """
+        Starts commentary for an engine analyst request in the background.
+        """
+        async def run():
+            text = await self.commentary(request["event"], request["data"])
+            self._ready.setdefault(simulation_id, []).append(
+                {"week": request["week"], "type": request["type"], "text": text})
+
+        task = asyncio.create_task(run())
+        pending = self._pending.setdefault(simulation_id, set())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    def collect(self, simulation_id: str) -> List[Dict]:
+        """
+        Returns and clears the commentary that has arrived for a simulation.
+        """
+        return self._ready.pop(simulation_id, [])
+
+    async def drain(self, simulation_id: str) -> List[Dict]:
+        """
+        Waits (within the time budget) for a simulation's outstanding commentary.
+        """
+        pending = list(self._pending.get(simulation_id, ()))
+        if pending:
+            await asyncio.wait(pending, timeout=self.timeout)
+        return self.collect(simulation_id)
+
+    def pending(self) -> int:
+        """
+        Commentary requests still waiting on the LLM, across all simulations.
+        """
+        return sum(len(tasks) for tasks in self._pending.values())
+
+    def discard(self, simulation_id: str):
+        for task in self._pending.pop(simulation_id, ()):
+            task.cancel()
+        self._ready.pop(simulation_id, None)
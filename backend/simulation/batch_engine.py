@@ -0,0 +1,230 @@
+from typing import Dict, Optional
+import numpy as np
+from .ai_agent import predict_orders
+from .config import agent_spec
+from .metrics import RunningMetrics
+from .detector import BatchBullwhipDetector
+from .model_registry import MODEL_REGISTRY, resolve_model_path
+from .scenario import TIER_NAMES, Timeline, stack_timelines
+FACTORY, DISTRIBUTOR, WHOLESALER, RETAILER = range(len(TIER_NAMES))
+
+
+def _per_tier(value, num_chains: int) -> np.ndarray:
+    """
+    Broadcasts a scalar, a per-tier vector or a full (N, tiers) matrix to a
+    writable (N, tiers) array.
+    """
+    array = np.asarray(value)
+    dtype = np.int64 if np.issubdtype(array.dtype, np.integer) else np.float64
+    return np.array(np.broadcast_to(array, (num_chains, len(TIER_NAMES))), dtype=dtype)
+
+
+class BatchSimulationEngine:
+    """
+    Steps N independent copies of the four-tier chain at once. Every piece of
+    agent state lives in an (N, tiers) array whose columns follow TIER_NAMES,
+    so one week of every chain is a handful of array operations. The RULE
+    ordering logic is the same as Agent's and the AI tiers reproduce AIAgent,
+    with every AI order of every chain predicted in a single model call.
+
+    agent_config takes the same form as SimulationEngine's; ai_mask can
+    instead give an (N, tiers) boolean matrix to mix configs across chains.
+    target_inventory defaults to each tier's target in agent_config.
+    The bullwhip detector counts episodes per chain and tier unless
+    detect_bullwhip is False.
+    """
+    def __init__(self, num_chains: int, target_inventory=None, holding_cost=1, stockout_cost=5,
+                 record_history: bool = False, num_weeks: int = 0,
+                 agent_config: Optional[Dict[str, str]] = None, ai_mask=None, model=None,
+                 detect_bullwhip: bool = True, detector_config: Optional[Dict] = None):
+        self.num_chains = num_chains
+        specs = [agent_spec(agent_config, name) for name in TIER_NAMES]
+        if target_inventory is None:
+            target_inventory = [spec["target_inventory"] for spec in specs]
+        self.target_inventory = _per_tier(target_inventory, num_chains)
+        self.holding_cost = _per_tier(holding_cost, num_chains)
+        self.stockout_cost = _per_tier(stockout_cost, num_chains)
+
+        shape = (num_chains, len(TIER_NAMES))
+        self.inventory = self.target_inventory.astype(np.int64)
+        self.backlog = np.zeros(shape, dtype=np.int64)
+        self.incoming_shipment = np.zeros(shape, dtype=np.int64)
+        self.placed_order_amount = np.zeros(shape, dtype=np.int64)
+        self.cost = np.zeros(shape, dtype=np.result_type(self.holding_cost, self.stockout_cost))
+        self.total_cost = np.zeros_like(self.cost)
+        self.week = 0
+        # Shipments held back by lead-time shocks: arrival step -> (N, tiers) units
+        self.in_transit: Dict[int, np.ndarray] = {}
+        self.metrics = RunningMetrics(shape, cost_dtype=self.cost.dtype)
+        self.detector = BatchBullwhipDetector(shape, detector_config) if detect_bullwhip else None
+
+        # AI tiers may use different models; tiers sharing a model are predicted together
+        if ai_mask is None:
+            ai_mask = [spec["type"] == 'AI' for spec in specs]
+        self.ai_mask = _per_tier(ai_mask, num_chains).astype(bool)
+        # Like AIAgent, the factory always produces by rule
+        self.ai_mask[:, FACTORY] = False
+        self.model_paths = [resolve_model_path(spec["model_path"], spec["model_version"]) for spec in specs]
+        self._model = model
+        # Rolling window of the last 4 weeks of demand seen by each tier (AIAgent.demand_history)
+        self._demand_window = np.zeros(shape + (4,), dtype=np.int64)
+
+        self.record_history = record_history
+        self.history: Optional[Dict[str, np.ndarray]] = None
+        if record_history:
+            self._allocate_history(num_weeks + 1)
+
+    def _allocate_history(self, capacity: int):
+        shape = (max(capacity, 1), self.num_chains, len(TIER_NAMES))
+        self.history = {
+            "inventory": np.zeros(shape, dtype=np.int64),
+            "placed_order_amount": np.zeros(shape, dtype=np.int64),
+            "cost": np.zeros(shape, dtype=self.cost.dtype),
+        }
+        self.history["inventory"][0] = self.inventory
+
+    def _grow_history(self):
+        old = self.history
+        self._allocate_history(2 * len(old["inventory"]))
+        for key, values in old.items():
+            self.history[key][:len(values)] = values
+
+    def run_step(self, customer_demand, capacity=None, delay=None):
+        """
+        Advances every chain by one week. customer_demand is a scalar or an
+        (N,) array of retailer demand for this week; capacity and delay are
+        this week's row of a Timeline's arrays, per tier or (N, tiers).
+        """
+        inventory, backlog = self.inventory, self.backlog
+
+        # 1. Receive last week's shipments, and any held back until this week
+        inventory += self.incoming_shipment
+        arrivals = self.in_transit.pop(self.week, None)
+        if arrivals is not None:
+            inventory += arrivals
+
+        # 2. Fulfill downstream orders; only the retailer sees customer demand
+        total_demand = backlog.copy()
+        total_demand[:, RETAILER] += customer_demand
+        self._demand_window[:, :, self.week % 4] = total_demand
+        shipped = np.minimum(inventory, total_demand)
+        if capacity is not None:
+            np.minimum(shipped, capacity, out=shipped)
+        self.incoming_shipment[:, 0] = 0
+        self.incoming_shipment[:, 1:] = shipped[:, :-1]
+        if delay is not None:
+            self._hold_shipments(np.broadcast_to(delay, shipped.shape))
+        inventory -= shipped
+        np.subtract(total_demand, shipped, out=backlog)
+        # New demand per tier: last week's downstream order, or the customer's at the retailer
+        demand_in = np.empty_like(backlog)
+        demand_in[:, :-1] = self.placed_order_amount[:, 1:]
+        demand_in[:, RETAILER] = customer_demand
+        unfilled = backlog.copy()
+
+        # 3. Place upstream orders (order-up-to rule, factory produces what it shipped)
+        order = self._rule_orders(shipped)
+        if self.ai_mask.any():
+            self._apply_ai_orders(order)
+        order[:, FACTORY] = shipped[:, FACTORY]
+        inventory[:, FACTORY] += shipped[:, FACTORY]
+        backlog[:, :-1] += order[:, 1:]
+        self.placed_order_amount = order
+
+        # 4. Record state
+        holding = inventory * self.holding_cost
+        stockout = backlog * self.stockout_cost
+        self.cost = holding + stockout
+        self.total_cost += self.cost
+        self.metrics.update(demand_in[:, RETAILER], demand_in, unfilled, order, holding, stockout, backlog)
+        if self.detector is not None:
+            self.detector.update(order, demand_in[:, RETAILER])
+        self.week += 1
+        if self.record_history:
+            if self.week >= len(self.history["inventory"]):
+                self._grow_history()
+            self.history["inventory"][self.week] = inventory
+            self.history["placed_order_amount"][self.week] = order
+            self.history["cost"][self.week] = self.cost
+
+    def _hold_shipments(self, delay: np.ndarray):
+        # Shipments sent to a tier under a lead-time shock arrive delay steps later than usual
+        for extra in np.unique(delay[delay > 0]).tolist():
+            held = np.where(delay == extra, self.incoming_shipment, 0)
+            self.incoming_shipment -= held
+            arrival = self.week + 1 + extra
+            if arrival in self.in_transit:
+                self.in_transit[arrival] += held
+            else:
+                self.in_transit[arrival] = held
+
+    def _rule_orders(self, shipped: np.ndarray) -> np.ndarray:
+        return np.maximum(0, shipped + self.target_inventory - self.inventory)
+
+    def models_by_tier(self) -> Dict[int, object]:
+        """
+        The model each AI tier uses, from the shared registry unless one was passed in.
+        """
+        tiers = np.flatnonzero(self.ai_mask.any(axis=0)).tolist()
+        if self._model is not None:
+            return {tier: self._model for tier in tiers}
+        return {tier: MODEL_REGISTRY.get(self.model_paths[tier]) for tier in tiers}
+
+    def _apply_ai_orders(self, order: np.ndarray):
+        filled = min(self.week + 1, 4)
+        demand_trend = self._demand_window[:, :, :filled].sum(axis=2) / filled
+        groups: Dict[int, list] = {}
+        models = {}
+        for tier, model in self.models_by_tier().items():
+            # Tiers without a model fall back to the rule, like AIAgent
+            if model is not None:
+                groups.setdefault(id(model), []).append(tier)
+                models[id(model)] = model
+        for key, tiers in groups.items():
+            mask = np.zeros_like(self.ai_mask)
+            mask[:, tiers] = self.ai_mask[:, tiers]
+            features = np.column_stack((self.inventory[mask], self.backlog[mask], demand_trend[mask]))
+            order[mask] = predict_orders(models[key], features.astype(np.float64))
+
+    def run(self, demand_matrix, capacity=None, delay=None) -> "BatchSimulationEngine":
+        """
+        Runs one week per column of an (N, weeks) customer demand matrix.
+        capacity and delay, when given, are (weeks, tiers) arrays shared by
+        every chain or (N, weeks, tiers) ones, as stack_timelines builds.
+        """
+        demand_matrix = np.asarray(demand_matrix)
+        if demand_matrix.ndim != 2 or demand_matrix.shape[0] != self.num_chains:
+            raise ValueError(f"Expected a demand matrix of shape ({self.num_chains}, weeks), got {demand_matrix.shape}")
+        for t, week_demand in enumerate(demand_matrix.T):
+            self.run_step(week_demand, self._week_row(capacity, t), self._week_row(delay, t))
+        return self
+
+    @staticmethod
+    def _week_row(values, t: int):
+        if values is None:
+            return None
+        return values[t] if values.ndim == 2 else values[:, t]
+
+    def run_timeline(self, timeline, num_weeks: Optional[int] = None) -> "BatchSimulationEngine":
+        """
+        Runs num_weeks (default: the timeline's length) of one Timeline
+        shared by every chain, or of a list with one Timeline per chain.
+        """
+        if not isinstance(timeline, Timeline):
+            timelines = list(timeline)
+            if num_weeks is None:
+                num_weeks = min(len(t) for t in timelines)
+            return self.run(*stack_timelines(timelines, num_weeks))
+        if num_weeks is None:
+            num_weeks = len(timeline)
+        timeline.extend(num_weeks)
+        demand = np.broadcast_to(timeline.demand[:num_weeks], (self.num_chains, num_weeks))
+        capacity = timeline.capacity[:num_weeks] if timeline.capacity is not None else None
+        delay = timeline.delay[:num_weeks] if timeline.delay is not None else None
+        return self.run(demand, capacity, delay)
+
+    def total_costs(self) -> Dict[str, np.ndarray]:
+        """
+        Returns each tier's accumulated cost as an (N,) array, keyed by agent name.
+        """
+        return {name: self.total_cost[:, i] for i, name in enumerate(TIER_NAMES)}
@@ -0,0 +1,116 @@
+import asyncio
+import glob
+import json
+import os
+from typing import Callable, Dict, Optional
+
+# Called with (simulation_id, event); returns True if this worker owns the run
+DisruptionHandler = Callable[[str, Dict], bool]
+
+
+class InProcessBroker:
+    """
+    Routes disruptions to runs in this process only. Enough for a single
+    uvicorn worker, and the default.
+    """
+    def __init__(self):
+        self.handler: Optional[DisruptionHandler] = None
+
+    async def start(self, handler: DisruptionHandler):
+        self.handler = handler
+
+    async def disrupt(self, simulation_id: str, event: Dict) -> bool:
+        return self.handler is not None and self.handler(simulation_id, event)
+
+    async def close(self):
+        self.handler = None
+
+    def describe(self) -> Dict:
+        return {"type": "inprocess"}
+
+
+class LocalSocketBroker(InProcessBroker):
+    """
+    Lets several workers on one host share disruptions. Every worker listens
+    on its own Unix socket in directory; a disruption for a run this worker
+    does not own is offered to each peer in turn (one JSON line each way)
+    until one accepts it. Sockets left behind by dead workers are removed.
+    """
+    def __init__(self, directory: str, timeout: float = 1.0):
+        super().__init__()
+        self.directory = directory
+        self.timeout = timeout
+        self.path = os.path.join(directory, f"worker-{os.getpid()}.sock")
+        self._server = None
+
+    async def start(self, handler: DisruptionHandler):
+        await super().start(handler)
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            message = json.loads(await reader.readline())
+            accepted = self.handler is not None and self.handler(message["simulation_id"], message["event"])
+            writer.write((json.dumps({"accepted": accepted}) + "\n").encode())
+            await writer.drain()
+        except (ValueError, KeyError, ConnectionError) as e:
+            print(f"Broker: bad request from a peer: {e}")
+        finally:
+            writer.close()
+
+    async def _offer(self, path: str, simulation_id: str, event: Dict) -> bool:
+        reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(path), self.timeout)
+        try:
+            writer.write((json.dumps({"simulation_id": simulation_id, "event": event}) + "\n").encode())
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readline(), self.timeout)
+            return bool(json.loads(reply).get("accepted"))
+        finally:
+            writer.close()
+
+    async def disrupt(self, simulation_id: str, event: Dict) -> bool:
+        if await super().disrupt(simulation_id, event):
+            return True
+        for path in glob.glob(os.path.join(self.directory, "worker-*.sock")):
+            if path == self.path:
+                continue
+            try:
+                if await self._offer(path, simulation_id, event):
+                    return True
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker that owned this socket is gone
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except (OSError, ValueError, asyncio.TimeoutError) as e:
+                print(f"Broker: peer {path} did not answer: {e}")
+        return False
+
+    async def close(self):
+        await super().close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def describe(self) -> Dict:
+        peers = [path for path in glob.glob(os.path.join(self.directory, "worker-*.sock")) if path != self.path]
+        return {"type": "unix", "directory": self.directory, "peers": len(peers)}
+
+
+def create_broker(url: Optional[str] = None) -> InProcessBroker:
+    """
+    Picks a broker from a URL: unset or "inprocess" for a single worker,
+    "unix:///some/dir" for workers sharing one host.
+    """
+    if not url or url == "inprocess":
+        return InProcessBroker()
+    if url.startswith("unix://"):
+        return LocalSocketBroker(url[len("unix://"):])
+    raise ValueError(f"Unknown broker URL '{url}'")
@@ -0,0 +1,247 @@
+import hashlib
+from typing import List
+import numpy as np
+
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+_POPCOUNT_TABLE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def _popcount_bytes(masks: np.ndarray) -> np.ndarray:
+    # NumPy < 2.0 has no bitwise_count: sum a byte lookup table over each mask
+    masks = np.ascontiguousarray(masks)
+    return _POPCOUNT_TABLE[masks.view(np.uint8).reshape(*masks.shape, masks.itemsize)].sum(axis=-1, dtype=np.uint8)
+
+
+_popcount = getattr(np, "bitwise_count", _popcount_bytes)
+
+
+class CompiledTreeEnsemble:
+    """
+    A gradient-boosted regressor (GradientBoostingRegressor or
+    HistGradientBoostingRegressor) flattened into plain arrays so it can be
+    evaluated with NumPy alone. All trees share one node table (feature,
+    threshold, left, right, value) with absolute node indices; leaves point
+    back to themselves.
+
+    Prediction walks every tree at once in the QuickScorer style: each
+    internal node stores a bitmask that removes the leaves of its left
+    subtree, and for every feature the nodes sorted by threshold give prefix
+    ANDs of those masks. A row then only needs one searchsorted per feature
+    and one table lookup to find its exit leaf in all trees, so a single row
+    and a large batch both cost a handful of array operations.
+    """
+    MAX_LEAVES = 64
+    # Rows evaluated together; keeps the (rows, trees) working set in cache
+    BLOCK_ROWS = 256
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, base_prediction: float, max_depth: int,
+                 feature_names: List[str], source_digest: str = ""):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.base_prediction = float(base_prediction)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names)
+        # sha256 of the model file this was exported from, used to detect stale exports
+        self.source_digest = source_digest
+        self._build_lookup()
+
+    def __repr__(self):
+        return f"CompiledTreeEnsemble(trees={len(self.roots)}, nodes={len(self.feature)}, max_depth={self.max_depth})"
+
+    def _build_lookup(self):
+        num_nodes, num_trees = len(self.feature), len(self.roots)
+        is_leaf = self.left == np.arange(num_nodes)
+        tree_of_node = np.repeat(np.arange(num_trees), np.diff(np.append(self.roots, num_nodes)))
+
+        node_masks = np.zeros(num_nodes, dtype=object)
+        tree_leaves = []
+        for tree, root in enumerate(self.roots.tolist()):
+            leaves = []
+
+            def visit(node: int) -> int:
+                # Numbers leaves left to right and returns the bitmask of the subtree's leaves
+                if is_leaf[node]:
+                    leaves.append(node)
+                    return 1 << (len(leaves) - 1)
+                left_leaves = visit(int(self.left[node]))
+                node_masks[node] = left_leaves
+                return left_leaves | visit(int(self.right[node]))
+
+            visit(root)
+            if len(leaves) > self.MAX_LEAVES:
+                raise ValueError(f"Tree {tree} has {len(leaves)} leaves; at most {self.MAX_LEAVES} are supported")
+            tree_leaves.append(leaves)
+
+        # 32-bit masks halve the memory traffic whenever every tree fits
+        self._leaf_bits = 32 if max(len(leaves) for leaves in tree_leaves) <= 32 else 64
+        self._mask_dtype = np.uint32 if self._leaf_bits == 32 else np.uint64
+        full = (1 << self._leaf_bits) - 1
+        self._leaf_values = np.zeros((num_trees, self._leaf_bits), dtype=np.float64)
+        for tree, leaves in enumerate(tree_leaves):
+            self._leaf_values[tree, :len(leaves)] = self.value[leaves]
+        self._leaf_values = self._leaf_values.ravel()
+        self._leaf_offsets = np.arange(num_trees, dtype=np.intp) * self._leaf_bits
+
+        # Per feature: thresholds in ascending order and the prefix ANDs of their node masks
+        self._feature_tables = []
+        for f in np.unique(self.feature[~is_leaf]).tolist():
+            nodes = np.flatnonzero(~is_leaf & (self.feature == f))
+            nodes = nodes[np.argsort(self.threshold[nodes], kind="stable")]
+            table = np.full((len(nodes) + 1, num_trees), full, dtype=self._mask_dtype)
+            removes = [~mask & full for mask in node_masks[nodes]]
+            table[np.arange(1, len(nodes) + 1), tree_of_node[nodes]] = np.array(removes, dtype=self._mask_dtype)
+            self._feature_tables.append((f, self.threshold[nodes], np.bitwise_and.accumulate(table, axis=0)))
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predicts one value per row of X (a single row or an (n, features) batch).
+        """
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32)).astype(np.float64)
+        # Nodes with threshold < x send the row right, which removes their left-subtree leaves
+        ranks = [(np.searchsorted(thresholds, X[:, f], side="left"), table)
+                 for f, thresholds, table in self._feature_tables]
+        predictions = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.BLOCK_ROWS):
+            rows = slice(start, start + self.BLOCK_ROWS)
+            predictions[rows] = self._predict_block(ranks, rows)
+        return predictions
+
+    def _predict_block(self, ranks, rows: slice) -> np.ndarray:
+        (first_rank, first_table), *rest = ranks
+        masks = first_table[first_rank[rows]]
+        for rank, table in rest:
+            masks &= table[rank[rows]]
+
+        # The exit leaf is the lowest surviving bit: popcount(~m & (m - 1))
+        below = masks - self._mask_dtype(1)
+        np.invert(masks, out=masks)
+        masks &= below
+        exit_leaf = np.add(_popcount(masks), self._leaf_offsets, dtype=np.intp)
+
+        # Accumulate tree by tree, in the same order as sklearn, so results match bit for bit
+        contributions = np.empty((len(exit_leaf), len(self.roots) + 1), dtype=np.float64)
+        contributions[:, 0] = self.base_prediction
+        np.take(self._leaf_values, exit_leaf, out=contributions[:, 1:])
+        np.cumsum(contributions, axis=1, out=contributions)
+        return contributions[:, -1]
+
+    def save(self, path: str):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                 value=self.value, roots=self.roots, base_prediction=self.base_prediction,
+                 max_depth=self.max_depth, feature_names=np.array(self.feature_names),
+                 source_digest=self.source_digest)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledTreeEnsemble":
+        with np.load(path) as data:
+            return cls(data["feature"], data["threshold"], data["left"], data["right"], data["value"],
+                       data["roots"], data["base_prediction"], data["max_depth"], data["feature_names"].tolist(),
+                       str(data["source_digest"]))
+
+
+def compile_gradient_boosting(model, source_digest: str = "") -> CompiledTreeEnsemble:
+    """
+    Flattens a fitted single-output GradientBoostingRegressor. Only reads the
+    fitted tree arrays, so sklearn itself is not imported here.
+    """
+    if isinstance(model.init_, str) and model.init_ == "zero":
+        base_prediction = 0.0
+    elif hasattr(model.init_, "constant_"):
+        base_prediction = float(np.ravel(model.init_.constant_)[0])
+    else:
+        raise ValueError(f"Cannot compile a model with init estimator {model.init_!r}")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(model.learning_rate * tree.value[:, 0, 0])
+        roots.append(offset)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    feature_names = getattr(model, "feature_names_in_", [f"x{i}" for i in range(model.n_features_in_)])
+    return CompiledTreeEnsemble(
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.intp),
+        right=np.concatenate(rights).astype(np.intp),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.array(roots, dtype=np.intp),
+        base_prediction=base_prediction,
+        max_depth=max_depth,
+        feature_names=list(feature_names),
+        source_digest=source_digest,
+    )
+
+
+def compile_hist_gradient_boosting(model, source_digest: str = "") -> CompiledTreeEnsemble:
+    """
+    Flattens a fitted single-output HistGradientBoostingRegressor with
+    numerical splits only. Its leaf values already include the learning rate
+    and a row goes left when x <= num_threshold, as in the node table above.
+    NaN inputs are not supported (they always go right here).
+    """
+    if model.n_trees_per_iteration_ != 1:
+        raise ValueError("Only single-output HistGradientBoostingRegressor models can be compiled")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("Cannot compile a model with categorical splits")
+        node_ids = np.arange(len(nodes))
+        is_leaf = nodes["is_leaf"].astype(bool)
+
+        features.append(np.where(is_leaf, 0, nodes["feature_idx"]))
+        thresholds.append(np.where(is_leaf, np.inf, nodes["num_threshold"]))
+        lefts.append(np.where(is_leaf, node_ids, nodes["left"]) + offset)
+        rights.append(np.where(is_leaf, node_ids, nodes["right"]) + offset)
+        values.append(nodes["value"])
+        roots.append(offset)
+
+        offset += len(nodes)
+        max_depth = max(max_depth, int(nodes["depth"].max()))
+
+    feature_names = getattr(model, "feature_names_in_", [f"x{i}" for i in range(model.n_features_in_)])
+    return CompiledTreeEnsemble(
+        feature=np.concatenate(features).astype(np.intp),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.intp),
+        right=np.concatenate(rights).astype(np.intp),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.array(roots, dtype=np.intp),
+        base_prediction=float(np.ravel(model._baseline_prediction)[0]),
+        max_depth=max_depth,
+        feature_names=list(feature_names),
+        source_digest=source_digest,
+    )
+
+
+def compile_model(model, source_digest: str = "") -> CompiledTreeEnsemble:
+    """
+    Compiles either kind of fitted gradient-boosting regressor.
+    """
+    if type(model).__name__ == "HistGradientBoostingRegressor":
+        return compile_hist_gradient_boosting(model, source_digest)
+    return compile_gradient_boosting(model, source_digest)
@@ -0,0 +1,58 @@
+from typing import Dict, Optional, Union
+from .scenario import TIER_NAMES
+
+AgentConfigValue = Union[str, Dict]
+
+DEFAULT_TARGET_INVENTORY = 100
+# Agent history is int32; this leaves room for a target plus a run's shipments
+MAX_TARGET_INVENTORY = 1_000_000
+
+
+def agent_spec(agent_config: Optional[Dict[str, AgentConfigValue]], name: str) -> Dict:
+    """
+    Normalizes one agent_config entry. An entry is either the plain agent
+    type ('AI' or 'RULE') or a dict such as
+    {"type": "AI", "model_path": "models/retailer.joblib"} or
+    {"type": "AI", "model_version": "v3"}. A dict may also set the tier's
+    order-up-to "target_inventory" (default 100, at most
+    MAX_TARGET_INVENTORY). Raises ValueError for anything else.
+    """
+    agent_config = agent_config or {}
+    if not isinstance(agent_config, dict):
+        raise ValueError("config must be an object mapping tiers to agent types")
+    value = agent_config.get(name, 'RULE')
+    if isinstance(value, str):
+        value = {"type": value}
+    if not isinstance(value, dict):
+        raise ValueError(f"The {name} entry must be an agent type or an object, not {value!r}")
+    for key in ("type", "model_path", "model_version"):
+        if value.get(key) is not None and not isinstance(value[key], str):
+            raise ValueError(f"The {name} {key} must be a string")
+    target = value.get("target_inventory", DEFAULT_TARGET_INVENTORY)
+    if isinstance(target, bool) or not isinstance(target, (int, float)) \
+            or not 0 <= target <= MAX_TARGET_INVENTORY or target != int(target):
+        raise ValueError(f"The {name} target_inventory must be an integer between 0 and {MAX_TARGET_INVENTORY}")
+    return {
+        "type": value.get("type") or 'RULE',
+        "model_path": value.get("model_path"),
+        "model_version": value.get("model_version"),
+        "target_inventory": int(target),
+    }
+
+
+def config_key(agent_config: Optional[Dict[str, AgentConfigValue]]) -> str:
+    """
+    A canonical, indexable form of an agent_config: each tier's type in chain
+    order, with the model when one is pinned and the target inventory when
+    it is not the default, e.g. "RULE:120-AI-AI-AI@v3". Equivalent configs
+    ({} and {"Factory": "RULE"}) get the same key.
+    """
+    parts = []
+    for name in TIER_NAMES:
+        spec = agent_spec(agent_config, name)
+        model = spec["model_version"] or spec["model_path"]
+        part = f"{spec['type']}@{model}" if model else spec["type"]
+        if spec["target_inventory"] != DEFAULT_TARGET_INVENTORY:
+            part += f":{spec['target_inventory']}"
+        parts.append(part)
+    return "-".join(parts)
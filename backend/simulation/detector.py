@@ -0,0 +1,183 @@
+import inspect
+from typing import Dict, List
+import numpy as np
+
+
+class DetectorConfig:
+    """
+    Bullwhip detector settings. alpha is the EWMA weight of the newest week
+    (about a 2/alpha-week memory). A tier's episode starts once, after
+    warmup_weeks, when the EWMA variance of its orders reaches trigger_ratio
+    times that of the orders it receives (customer demand for the retailer),
+    and ends when the ratio falls back to clear_ratio. The gap between the
+    two is the hysteresis that keeps a noisy ratio from firing every week.
+    Variances below min_variance are floored so near-constant demand does
+    not blow the ratio up.
+    """
+    def __init__(self, alpha: float = 0.1, warmup_weeks: int = 10, trigger_ratio: float = 4.0,
+                 clear_ratio: float = 2.0, min_variance: float = 1.0):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        if clear_ratio > trigger_ratio:
+            raise ValueError("clear_ratio must not exceed trigger_ratio")
+        self.alpha = alpha
+        self.warmup_weeks = warmup_weeks
+        self.trigger_ratio = trigger_ratio
+        self.clear_ratio = clear_ratio
+        self.min_variance = min_variance
+
+    @classmethod
+    def from_dict(cls, config) -> "DetectorConfig":
+        """
+        Builds the settings from a client's "detector" object; raises
+        ValueError for unknown keys or values of the wrong type.
+        """
+        if isinstance(config, cls):
+            return config
+        config = config or {}
+        if not isinstance(config, dict):
+            raise ValueError("detector must be an object")
+        parameters = inspect.signature(cls).parameters
+        unknown = sorted(set(config) - set(parameters))
+        if unknown:
+            raise ValueError(f"Unknown detector setting(s): {', '.join(unknown)}; expected {', '.join(parameters)}")
+        values = {}
+        for key, value in config.items():
+            # Each setting takes the type of its default
+            kind = type(parameters[key].default)
+            try:
+                values[key] = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Detector setting '{key}' must be {'an integer' if kind is int else 'a number'}")
+        return cls(**values)
+
+
+class BullwhipDetector:
+    """
+    Streaming bullwhip detector for one chain. Each week it folds every
+    tier's order and the customer demand into an EWMA mean/variance and a
+    Welford run variance (constant work, no history) and compares each
+    tier's recent order variance with the tier downstream of it. update()
+    returns the tiers whose episode started that week.
+    Tiers are ordered upstream first, like SimulationEngine.agents.
+    """
+    __slots__ = ("config", "weeks", "active", "episodes", "amplification",
+                 "_ew_mean", "_ew_var", "_mean", "_m2")
+
+    def __init__(self, num_tiers: int, config=None):
+        self.config = DetectorConfig.from_dict(config)
+        self.weeks = 0
+        self.active = [False] * num_tiers
+        self.episodes = [0] * num_tiers
+        self.amplification = [0.0] * num_tiers
+        # One series per tier plus customer demand last
+        self._ew_mean = [0.0] * (num_tiers + 1)
+        self._ew_var = [0.0] * (num_tiers + 1)
+        self._mean = [0.0] * (num_tiers + 1)
+        self._m2 = [0.0] * (num_tiers + 1)
+
+    def update(self, orders: List[int], customer_demand: int) -> List[int]:
+        config = self.config
+        alpha, keep = config.alpha, 1 - config.alpha
+        self.weeks = weeks = self.weeks + 1
+        ew_mean, ew_var, mean, m2 = self._ew_mean, self._ew_var, self._mean, self._m2
+        series = orders + [customer_demand]
+        for i, x in enumerate(series):
+            if weeks == 1:
+                ew_mean[i] = x
+            else:
+                delta = x - ew_mean[i]
+                ew_mean[i] += alpha * delta
+                ew_var[i] = keep * (ew_var[i] + alpha * delta * delta)
+            delta = x - mean[i]
+            mean[i] += delta / weeks
+            m2[i] += delta * (x - mean[i])
+
+        started = []
+        floor, active, amplification = config.min_variance, self.active, self.amplification
+        downstream_var = ew_var[-1] if ew_var[-1] > floor else floor
+        # Walk downstream to upstream so each tier's floored variance is computed once
+        for i in range(len(orders) - 1, -1, -1):
+            variance = ew_var[i] if ew_var[i] > floor else floor
+            ratio = amplification[i] = variance / downstream_var
+            downstream_var = variance
+            if active[i]:
+                if ratio <= config.clear_ratio:
+                    active[i] = False
+            elif ratio >= config.trigger_ratio and weeks > config.warmup_weeks:
+                active[i] = True
+                self.episodes[i] += 1
+                started.append(i)
+        return started
+
+    def run_amplification(self, tier: int) -> float:
+        """
+        Whole-run Var(tier orders) / Var(orders received), from the Welford sums.
+        """
+        floor = self.config.min_variance * self.weeks
+        return max(self._m2[tier], floor) / max(self._m2[tier + 1], floor)
+
+
+class BatchBullwhipDetector:
+    """
+    BullwhipDetector over (N, tiers) arrays for BatchSimulationEngine. It
+    counts episodes and active weeks per chain and tier instead of emitting
+    events.
+    """
+    def __init__(self, shape, config=None):
+        self.config = DetectorConfig.from_dict(config)
+        num_chains, num_tiers = shape
+        self.weeks = 0
+        self.active = np.zeros(shape, dtype=bool)
+        self.episodes = np.zeros(shape, dtype=np.int32)
+        self.active_weeks = np.zeros(shape, dtype=np.int32)
+        self.first_onset = np.zeros(shape, dtype=np.int32)
+        self._ew_mean = np.zeros((num_chains, num_tiers + 1), dtype=np.float64)
+        self._ew_var = np.zeros_like(self._ew_mean)
+        # Scratch buffers so a step allocates nothing
+        self._series = np.zeros_like(self._ew_mean)
+        self._delta = np.zeros_like(self._ew_mean)
+        self._ratio = np.zeros(shape, dtype=np.float64)
+        self._started = np.zeros(shape, dtype=bool)
+        self._cleared = np.zeros(shape, dtype=bool)
+
+    def update(self, orders: np.ndarray, customer_demand) -> np.ndarray:
+        """
+        Folds in one week and returns the (N, tiers) mask of episodes that
+        started (a scratch buffer: copy it to keep it past the next week).
+        """
+        config = self.config
+        self.weeks += 1
+        series, delta = self._series, self._delta
+        series[:, :-1] = orders
+        series[:, -1] = customer_demand
+        if self.weeks == 1:
+            self._ew_mean[:] = series
+        else:
+            np.subtract(series, self._ew_mean, out=series)
+            np.multiply(series, config.alpha, out=delta)
+            self._ew_mean += delta
+            delta *= series
+            self._ew_var += delta
+            self._ew_var *= 1 - config.alpha
+
+        floored = np.maximum(self._ew_var, config.min_variance, out=delta)
+        ratio = np.divide(floored[:, :-1], floored[:, 1:], out=self._ratio)
+        started, cleared = self._started, self._cleared
+        np.less_equal(ratio, config.clear_ratio, out=cleared)
+        cleared &= self.active
+        if self.weeks > config.warmup_weeks:
+            np.greater_equal(ratio, config.trigger_ratio, out=started)
+            started &= ~self.active
+        else:
+            started[:] = False
+        self.active ^= cleared
+        self.active |= started
+        self.episodes += started
+        self.active_weeks += self.active
+        self.first_onset[started & (self.first_onset == 0)] = self.weeks
+        return started
+
+    def summary(self, tier_names: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        return {name: {"episodes": self.episodes[:, i], "active_weeks": self.active_weeks[:, i],
+                       "first_onset_week": self.first_onset[:, i]} for i, name in enumerate(tier_names)}
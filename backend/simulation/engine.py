@@ -1,32 +1,56 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import numpy as np
 from .agent import Agent
-from .ai_agent import AIAgent
-from .analyst import get_dynamic_commentary
+from .ai_agent import AIAgent, predict_orders
+from .config import AgentConfigValue, agent_spec
+from .metrics import ChainMetrics
+from .detector import BullwhipDetector
+from .instrumentation import INSTRUMENTS, RunProfile
+from .scenario import Timeline, compile_scenario
 
 class SimulationEngine:
     # ADD enable_analyst PARAMETER
-    def __init__(self, agent_config: Dict[str, str], enable_analyst: bool = True):
+    def __init__(self, agent_config: Dict[str, AgentConfigValue], enable_analyst: bool = True, batch_inference: bool = True,
+                 num_weeks: int = 0, detector_config: Optional[Dict] = None, scenario=None):
         print(f"Initializing simulation with config: {agent_config}")
         self.enable_analyst = enable_analyst # STORE THE SWITCH
+        self.batch_inference = batch_inference
         
         agent_classes = {'RULE': Agent, 'AI': AIAgent}
         agent_names = ["Factory", "Distributor", "Wholesaler", "Retailer"]
+        # Preallocate each agent's history for the whole run when its length is known
+        history_capacity = num_weeks + 1 if num_weeks else 64
         
         self.agents: List[Agent] = []
         for name in agent_names:
-            agent_type = agent_config.get(name, 'RULE')
-            agent_class = agent_classes.get(agent_type, Agent)
-            self.agents.append(agent_class(name=name))
+            spec = agent_spec(agent_config, name)
+            agent_class = agent_classes.get(spec["type"], Agent)
+            if agent_class is AIAgent:
+                self.agents.append(AIAgent(name=name, target_inventory=spec["target_inventory"], model_path=spec["model_path"],
+                                           model_version=spec["model_version"], history_capacity=history_capacity))
+            else:
+                self.agents.append(agent_class(name=name, target_inventory=spec["target_inventory"],
+                                               history_capacity=history_capacity))
             
         self.factory, self.distributor, self.wholesaler, self.retailer = self.agents[0], self.agents[1], self.agents[2], self.agents[3]
 
         self._link_agents()
         self.agent_config = agent_config
-        self.events_this_step: List[Dict] = []
+        # Running cost, variance, fill-rate and backlog aggregates, one entry per agent
+        self.metrics = ChainMetrics(len(self.agents))
+        # Runs whether or not the analyst is on; only commentary requests depend on the switch
+        self.detector = BullwhipDetector(len(self.agents), detector_config)
+        # Events that need analyst commentary; the caller hands them to an AnalystPipeline
+        self.analyst_requests: List[Dict] = []
 
-        self.disruption_active = False
-        self.disruption_value = 0
-        self.disruption_duration = 0
+        # Demand, capacity and lead-time shocks for every week; run_step indexes it by week
+        self.timeline: Timeline = compile_scenario(scenario, num_weeks) if scenario is not None else Timeline.constant(num_weeks=num_weeks)
+        # Shipments held back by lead-time shocks: arrival week -> units per agent
+        self.in_transit: Dict[int, List[int]] = {}
+        # Last week run; snapshots record it so forks know where to pick up
+        self.week = 0
+        # Per-phase step timings, filled only while instrumentation is on
+        self.profile = RunProfile()
 
     def _link_agents(self):
         self.retailer.upstream_agent = self.wholesaler
@@ -36,59 +60,134 @@ class SimulationEngine:
         self.distributor.upstream_agent = self.factory
         self.factory.downstream_agent = self.distributor
 
+    def _place_orders(self):
+        """
+        Places every agent's upstream order. AI agents that share a model are
+        predicted together with one call; their features only depend on
+        post-fulfillment state, so the orders match stepping them one by one.
+        """
+        predicted: Dict[int, int] = {}
+        if self.batch_inference:
+            by_model: Dict[int, List[AIAgent]] = {}
+            for agent in self.agents:
+                if isinstance(agent, AIAgent) and agent.uses_model:
+                    by_model.setdefault(id(agent.model), []).append(agent)
+            for group in by_model.values():
+                features = np.array([agent.features() for agent in group], dtype=np.float64)
+                for agent, order in zip(group, predict_orders(group[0].model, features)):
+                    predicted[id(agent)] = order
+
+        for agent in self.agents:
+            if id(agent) in predicted:
+                agent.apply_order(predicted[id(agent)])
+            else:
+                agent.place_upstream_order()
+
     def inject_disruption(self, event: Dict):
+        """
+        Adds an event to the timeline from next week on, on top of any
+        already in force; its analyst commentary comes when it starts.
+        """
         print(f"--- DISRUPTION INJECTED: {event} ---")
-        self.disruption_active = True
-        self.disruption_type = event.get("type")
-        self.disruption_value = event.get("value", 0)
-        self.disruption_duration = event.get("duration", 0)
-        
+        self.timeline.add(event, week=self.week + 1)
+
+    def _request_commentary(self, week: int, level: str, event_type: str, data: Dict):
         # CHECK THE SWITCH
         if self.enable_analyst:
-            commentary = get_dynamic_commentary("DISRUPTION", {"value": self.disruption_value, "duration": self.disruption_duration, "week": -1})
-            self.events_this_step.append({ "week": -1, "type": "CRITICAL", "text": commentary })
+            self.analyst_requests.append({"week": week, "type": level, "event": event_type, "data": data})
 
-    def run_step(self, week: int, customer_demand: int):
-        self.events_this_step = []
-        
-        for event in self.events_this_step:
-            if event["week"] == -1:
-                event["text"] = event["text"].replace("at week -1", f"at week {week}")
-
-        original_demand = customer_demand
-        if week == 10 and customer_demand == 20:
-            customer_demand = 25
-            # CHECK THE SWITCH
-            if self.enable_analyst:
-                commentary = get_dynamic_commentary("DEMAND_SHIFT", {"week": week})
-                self.events_this_step.append({"week": week, "type": "INFO", "text": commentary})
-
-        if self.disruption_active and self.disruption_duration > 0:
-            if self.disruption_type == "DEMAND_SPIKE":
-                customer_demand = self.disruption_value
-            self.disruption_duration -= 1
-        else:
-            self.disruption_active = False
+    def run_step(self, week: int, customer_demand: Optional[int] = None):
+        """
+        Runs one week. customer_demand defaults to the timeline's; an explicit
+        value replaces the base demand but the timeline's spikes still apply.
+        """
+        profile = self.profile if INSTRUMENTS.enabled else None
+        if profile is not None:
+            profile.start()
+        self.analyst_requests = []
+        timeline = self.timeline
+        customer_demand = timeline.demand_at(week, customer_demand)
 
+        for level, event_type, data in timeline.notes.get(week, ()):
+            self._request_commentary(week, level, event_type, {**data, "week": week})
+        if profile is not None:
+            profile.lap("analyst")
+
+        arrivals = self.in_transit.pop(week, None)
+        if arrivals is not None:
+            for agent, units in zip(self.agents, arrivals):
+                agent.incoming_shipment += units
         for agent in reversed(self.agents):
             agent.receive_shipment()
+        if profile is not None:
+            profile.lap("receive")
 
+        capacity = timeline.capacity
+        if capacity is not None:
+            for agent, limit in zip(self.agents, capacity[week - 1].tolist()):
+                agent.capacity = limit
         self.retailer.fulfill_downstream_orders(customer_demand)
         for agent in self.agents:
             if agent != self.retailer:
                 agent.fulfill_downstream_orders()
+        if timeline.delay is not None:
+            self._hold_shipments(week, timeline.delay[week - 1].tolist())
 
-        for agent in self.agents:
-            agent.place_upstream_order()
+        # New demand per agent: last week's downstream order, or the customer's for the retailer
+        demand_in = [agent.downstream_agent.placed_order_amount for agent in self.agents[:-1]] + [customer_demand]
+        unfilled = [agent.backlog for agent in self.agents]
+        if profile is not None:
+            profile.lap("fulfill")
+
+        self._place_orders()
+        if profile is not None:
+            profile.lap("order")
 
         for agent in self.agents:
             agent.record_state()
-        
-        retailer_order = self.retailer.history['placed_order_amount'][-1]
-        distributor_order = self.distributor.history['placed_order_amount'][-1]
-        if week > 15 and distributor_order > original_demand * 3 and distributor_order > 50:
-             if not any(e['type'] == 'WARNING' for e in self.events_this_step):
-                # CHECK THE SWITCH
-                if self.enable_analyst:
-                    commentary = get_dynamic_commentary("BULLWHIP", {"week": week, "retailer_order": retailer_order, "distributor_order": distributor_order})
-                    self.events_this_step.append({"week": week, "type": "WARNING", "text": commentary})
\ No newline at end of file
+        self.metrics.update(customer_demand, self.agents, demand_in, unfilled)
+        if profile is not None:
+            profile.lap("record")
+
+        # Once per episode per tier, when its order variance outgrows the orders it receives
+        orders = [agent.placed_order_amount for agent in self.agents]
+        for tier in self.detector.update(orders, customer_demand):
+            self._report_bullwhip(week, tier, customer_demand)
+        self.week = week
+        if profile is not None:
+            profile.lap("detection")
+
+    def _hold_shipments(self, week: int, delays: List[int]):
+        # Shipments sent to an agent under a lead-time shock arrive delay weeks later than usual
+        for i, (agent, delay) in enumerate(zip(self.agents, delays)):
+            if delay > 0 and agent.incoming_shipment:
+                arrivals = self.in_transit.setdefault(week + 1 + delay, [0] * len(self.agents))
+                arrivals[i] += agent.incoming_shipment
+                agent.incoming_shipment = 0
+
+    def snapshot(self, rng=None) -> "EngineSnapshot":
+        """
+        Captures the engine's state (and, optionally, the Generator drawing
+        its demand) so runs can be forked from here instead of replayed.
+        """
+        from .snapshot import EngineSnapshot
+        return EngineSnapshot.capture(self, rng)
+
+    def fork(self, branches: int = 1) -> List["SimulationEngine"]:
+        """
+        Independent copies of this engine as it stands, one per branch.
+        """
+        snapshot = self.snapshot()
+        return [snapshot.restore() for _ in range(branches)]
+
+    def _report_bullwhip(self, week: int, tier: int, customer_demand: int):
+        agent = self.agents[tier]
+        downstream = agent.downstream_agent
+        self._request_commentary(week, "WARNING", "BULLWHIP", {
+            "week": week,
+            "tier": agent.name,
+            "downstream": downstream.name if downstream else "Customer",
+            "amplification": round(self.detector.amplification[tier], 1),
+            "order": agent.placed_order_amount,
+            "downstream_order": downstream.placed_order_amount if downstream else customer_demand,
+        })
\ No newline at end of file
@@ -0,0 +1,192 @@
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Seconds; wide enough for a 1us engine phase and a 10s LLM call
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+STEP_PHASES = ("analyst", "receive", "fulfill", "order", "record", "detection")
+STEP_PHASE_METRIC = "chainreact_step_phase_seconds"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense, plus the max seen.
+    """
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Instrumentation:
+    """
+    Process-wide timings, counters and gauges, rendered as Prometheus text.
+    Hot paths check enabled before reading the clock, so switched off the
+    cost is one attribute lookup per probe; gauges are computed only when
+    /metrics is scraped and work either way.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[Labels, float]]]] = []
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """
+        The histogram for name and labels, created on first use. Hot paths
+        keep the handle and call observe() on it directly.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], object]):
+        """
+        Registers a gauge read at scrape time; read() returns a number or a
+        dict of {label value: number} for a gauge with one label, e.g.
+        {("status", "running"): 3}.
+        """
+        self.describe(name, "gauge", help_text)
+        self._gauges.append((name, help_text, read))
+
+    def reset(self):
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram.__init__(histogram.buckets)
+            self._counters.clear()
+
+    def render(self) -> str:
+        lines = []
+        seen = set()
+
+        def header(name: str, default_kind: str):
+            if name not in seen:
+                seen.add(name)
+                kind, help_text = self._help.get(name, (default_kind, name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = 'le="%g"' % bound
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_format_labels(labels, le)} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.9g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for name, _, read in self._gauges:
+            header(name, "gauge")
+            value = read()
+            if isinstance(value, dict):
+                for label, number in sorted(value.items()):
+                    lines.append(f"{name}{_format_labels((label,))} {number:g}")
+            else:
+                lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class RunProfile:
+    """
+    Per-run timing totals (count, total, max per phase) for a profile dump.
+    lap() times engine step phases and also feeds the process-wide histogram.
+    """
+    __slots__ = ("phases", "_last", "_histograms")
+
+    def __init__(self):
+        self.phases: Dict[str, List[float]] = {}
+        self._last = 0.0
+        self._histograms: Dict[str, Histogram] = {}
+
+    def add(self, phase: str, seconds: float):
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        histogram = self._histograms.get(phase)
+        if histogram is None:
+            self.phases[phase] = [0, 0.0, 0.0]
+            histogram = self._histograms[phase] = INSTRUMENTS.histogram(STEP_PHASE_METRIC, phase=phase)
+        stats = self.phases[phase]
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+        histogram.observe(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            phase: {"count": count, "total_seconds": round(total, 6),
+                    "mean_us": round(total / count * 1e6, 3) if count else 0.0, "max_us": round(peak * 1e6, 3)}
+            for phase, (count, total, peak) in self.phases.items()
+        }
+
+
+INSTRUMENTS = Instrumentation(enabled=os.environ.get("CHAINREACT_INSTRUMENTATION", "").lower() in ("1", "true", "on"))
+INSTRUMENTS.describe(STEP_PHASE_METRIC, "histogram", "Time spent in each phase of SimulationEngine.run_step.")
+INSTRUMENTS.describe("chainreact_model_predict_seconds", "histogram", "Latency of one batched agent model predict call.")
+INSTRUMENTS.describe("chainreact_model_predict_rows_total", "counter", "Feature rows sent to agent models.")
+INSTRUMENTS.describe("chainreact_llm_request_seconds", "histogram", "Latency of analyst LLM calls by outcome.")
+INSTRUMENTS.describe("chainreact_llm_requests_total", "counter", "Analyst LLM calls by outcome (ok, timeout, error).")
+INSTRUMENTS.describe("chainreact_frame_send_seconds", "histogram", "Time to send one stream frame by stream mode.")
+
@@ -0,0 +1,291 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+from .engine import SimulationEngine
+from .queries import run_fields
+from .scenario import DEFAULT_SCENARIO
+from .instrumentation import INSTRUMENTS
+from .streaming import AckWindow, StreamOptions, capture_week, make_encoder
+
+
+# History arrays and the timeline are allocated for the whole run when it is submitted
+MAX_WEEKS = 520
+
+
+class SchedulerBusy(RuntimeError):
+    pass
+
+
+class SimulationJob:
+    """
+    One simulation run, independent of any WebSocket. Everything it produces
+    (a record per week, then late analyst events and the final summary) is
+    appended to records, so any number of subscribers can follow it and a
+    late joiner simply starts reading from the beginning.
+    """
+    def __init__(self, job_id: str, start_data: Dict, max_weeks: int = MAX_WEEKS):
+        self.id = job_id
+        self.agent_config = start_data.get("config", {})
+        try:
+            self.num_weeks = int(start_data.get("weeks", 50))
+        except (TypeError, ValueError):
+            raise ValueError("weeks must be an integer")
+        if not 1 <= self.num_weeks <= max_weeks:
+            raise ValueError(f"weeks must be between 1 and {max_weeks}")
+        # The creator's stream options set the pace; each subscriber picks its own encoding
+        self.pace = StreamOptions.from_message(start_data)
+        # Demand, disruptions and supply shocks for the whole run, compiled up front
+        self.engine = SimulationEngine(agent_config=self.agent_config, enable_analyst=True, num_weeks=self.num_weeks,
+                                       detector_config=start_data.get("detector"),
+                                       scenario=start_data.get("scenario") or DEFAULT_SCENARIO)
+        self.agent_names = [agent.name for agent in self.engine.agents]
+        self.status = "queued"
+        self.week = 0
+        self.created = time.time()
+        self.records: List[Dict] = []
+        self.finished = False
+        self._new_record = asyncio.Event()
+
+    def _publish(self, record: Dict):
+        self.records.append(record)
+        self._new_record.set()
+        self._new_record = asyncio.Event()
+
+    async def wait_for(self, cursor: int):
+        """
+        Returns once there are records past cursor or the job has finished.
+        """
+        while cursor >= len(self.records) and not self.finished:
+            await self._new_record.wait()
+
+    def cancel_queued(self):
+        """
+        Marks a job cancelled before run() started and wakes its subscribers.
+        """
+        self.status = "cancelled"
+        self.finished = True
+        self._new_record.set()
+
+    def inject_disruption(self, event: Dict):
+        self.engine.inject_disruption(event)
+
+    async def run(self, analyst, run_store):
+        self.status = "running"
+        engine = self.engine
+        try:
+            for week in range(1, self.num_weeks + 1):
+                engine.run_step(week)
+                self.week = week
+
+                for request in engine.analyst_requests:
+                    analyst.submit(self.id, request)
+                self._publish({"kind": "week", "week": week, "state": capture_week(engine, self.agent_names),
+                               "events": analyst.collect(self.id)})
+                if week % self.pace.weeks_per_frame == 0:
+                    # A tick of 0 still yields so other simulations keep running
+                    await asyncio.sleep(self.pace.tick)
+
+            metrics = engine.metrics.summary(self.agent_names)
+            total_costs = {name: tier["total_cost"] for name, tier in metrics.items()}
+
+            summary_input = {
+                "agent_config": engine.agent_config,
+                "total_costs": total_costs
+            }
+            late_events = await analyst.drain(self.id)
+            if late_events:
+                self._publish({"kind": "message", "message": {"type": "events", "events": late_events}})
+            summary_text = await analyst.final_summary(summary_input)
+
+            # The frontend plots retailer inventory stability from the weekly frames it already has
+            final_summary_payload = {
+                "type": "final_summary",
+                "title": "Simulation Complete: AI-Generated Performance Dashboard",
+                "summary_text": summary_text,
+                "total_cost_data": [{"name": name, "cost": cost} for name, cost in total_costs.items()],
+                "cost_breakdown_data": [
+                    {"name": "Holding Cost", "value": metrics["Retailer"]["holding_cost"]},
+                    {"name": "Stockout Cost", "value": metrics["Retailer"]["stockout_cost"]}
+                ],
+                "metrics": metrics
+            }
+            self._publish({"kind": "message", "message": final_summary_payload})
+
+            db_payload = {
+                "simulation_id": self.id,
+                "agent_config": engine.agent_config,
+                "weeks": self.num_weeks,
+                "summary": final_summary_payload,
+                # Indexed fields the /runs queries filter, sort and group on
+                **run_fields(engine.agent_config, total_costs),
+            }
+            # History is stored as per-week bucket documents by the write-behind store
+            await run_store.save(db_payload, engine.agents)
+            print(f"Simulation {self.id} results queued for MongoDB.")
+            self.status = "done"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception as e:
+            print(f"Error in simulation {self.id}: {e}")
+            self.status = "failed"
+            self._publish({"kind": "message", "message": {"type": "error", "detail": str(e)}})
+        finally:
+            analyst.discard(self.id)
+            self.finished = True
+            self._new_record.set()
+
+    def profile(self) -> Dict:
+        """
+        The run's step phase and frame send timings (empty unless instrumentation was on).
+        """
+        return {"simulation_id": self.id, "status": self.status, "weeks": self.week,
+                "phases": self.engine.profile.summary()}
+
+    def dump_profile(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{self.id}.json"), "w") as f:
+            json.dump(self.profile(), f, indent=2)
+
+    def describe(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "week": self.week,
+            "weeks": self.num_weeks,
+            "agent_config": self.agent_config,
+            "created": self.created,
+        }
+
+
+async def stream_job(job: SimulationJob, websocket, options: StreamOptions):
+    """
+    Sends a job's records to one WebSocket in the subscriber's stream mode,
+    from the first week, at the subscriber's own pace: week frames go out at
+    least options.tick seconds apart, so a late joiner replays at its own
+    tick and a live one never runs ahead of the run. A slow reader only
+    falls behind and never holds up the run or other subscribers.
+    """
+    encoder = make_encoder(options, job.agent_names)
+    acks = AckWindow(options.max_unacked)
+    loop = asyncio.get_running_loop()
+    next_frame = loop.time()
+
+    async def send(messages):
+        for kind, message in messages:
+            start = time.perf_counter() if INSTRUMENTS.enabled else None
+            if kind == "bytes":
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_json(message)
+            if start is not None:
+                seconds = time.perf_counter() - start
+                INSTRUMENTS.observe("chainreact_frame_send_seconds", seconds, mode=options.mode)
+                job.engine.profile.add("frame_send", seconds)
+
+    cursor = 0
+    while True:
+        await job.wait_for(cursor)
+        records = job.records[cursor:]
+        cursor += len(records)
+        for record in records:
+            if record["kind"] != "week":
+                await send(encoder.flush())
+                await websocket.send_json(record["message"])
+                continue
+            encoder.add_week(record["week"], record["state"], record["events"])
+            if len(encoder) >= options.weeks_per_frame or record["week"] == job.num_weeks:
+                # Only waits out what is left of the tick, so a subscriber that keeps up adds no delay
+                delay = next_frame - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await send(encoder.flush())
+                next_frame = loop.time() + options.tick
+                await acks.wait(websocket, record["week"])
+        if job.finished and cursor == len(job.records):
+            await send(encoder.flush())
+            return
+
+
+class JobScheduler:
+    """
+    Runs simulations as background tasks, at most max_concurrent at a time
+    (the rest wait as "queued") and at most max_jobs held in total. Finished
+    jobs stay available for late joiners for retention seconds. With
+    profile_dir set, runs that finish while instrumentation is on write
+    their timing profile there as <id>.json. Runs are at most max_weeks long.
+    """
+    def __init__(self, analyst, run_store, max_concurrent: int = 32, max_jobs: int = 256, retention: float = 300.0,
+                 profile_dir: Optional[str] = None, max_weeks: int = MAX_WEEKS):
+        self.analyst = analyst
+        self.run_store = run_store
+        self.profile_dir = profile_dir
+        self.max_concurrent = max_concurrent
+        self.max_jobs = max_jobs
+        self.retention = retention
+        self.max_weeks = max_weeks
+        self._jobs: Dict[str, SimulationJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, start_data: Dict) -> SimulationJob:
+        """
+        Starts a job; raises SchedulerBusy when full and ValueError for a bad start message.
+        """
+        if len(self._jobs) >= self.max_jobs:
+            raise SchedulerBusy(f"Too many simulations ({self.max_jobs}); try again later.")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        job = SimulationJob(str(uuid.uuid4()), start_data, self.max_weeks)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        task.add_done_callback(lambda _: self._done(job))
+        self._tasks[job.id] = task
+        return job
+
+    async def _run(self, job: SimulationJob):
+        async with self._slots:
+            await job.run(self.analyst, self.run_store)
+        if self.profile_dir and INSTRUMENTS.enabled:
+            await asyncio.to_thread(job.dump_profile, self.profile_dir)
+
+    def _done(self, job: SimulationJob):
+        # A job cancelled while queued never reaches run()'s finally, and may not even have started _run
+        if not job.finished:
+            job.cancel_queued()
+        self._tasks.pop(job.id, None)
+        asyncio.get_running_loop().call_later(self.retention, self._jobs.pop, job.id, None)
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        return self._jobs.get(job_id)
+
+    def disrupt(self, job_id: str, event: Dict) -> bool:
+        """
+        Injects a disruption if the run lives in this process and is still going.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.inject_disruption(event)
+        return True
+
+    def list(self) -> List[Dict]:
+        return [job.describe() for job in self._jobs.values()]
+
+    def stats(self) -> Dict:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {"jobs": len(self._jobs), "max_jobs": self.max_jobs, "max_concurrent": self.max_concurrent, **statuses}
+
+    async def close(self):
+        """
+        Cancels runs still going at shutdown.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,165 @@
+import math
+from typing import Dict, List
+import numpy as np
+
+
+def _summary(tier_names: List[str], columns: Dict[str, list]) -> Dict[str, Dict]:
+    return {name: {key: values[i] for key, values in columns.items()} for i, name in enumerate(tier_names)}
+
+
+class ChainMetrics:
+    """
+    Running per-agent aggregates for one SimulationEngine chain, updated once
+    a week in plain Python (NumPy calls on four values would cost more than
+    the step itself). RunningMetrics keeps the same figures for batches.
+
+    Order and customer-demand variances use Welford's update. The order
+    variance ratio is Var(agent orders) / Var(customer demand), the usual
+    bullwhip measure. Fill rate is the share of each week's new demand shipped
+    the same week (backlog is filled oldest first).
+    """
+    __slots__ = ("weeks", "holding_cost", "stockout_cost", "peak_backlog", "demand", "filled",
+                 "_order_mean", "_order_m2", "_demand_mean", "_demand_m2")
+
+    def __init__(self, num_agents: int):
+        self.weeks = 0
+        self.holding_cost = [0] * num_agents
+        self.stockout_cost = [0] * num_agents
+        self.peak_backlog = [0] * num_agents
+        self.demand = [0] * num_agents
+        self.filled = [0] * num_agents
+        self._order_mean = [0.0] * num_agents
+        self._order_m2 = [0.0] * num_agents
+        self._demand_mean = 0.0
+        self._demand_m2 = 0.0
+
+    def update(self, customer_demand: int, agents, demand_in: List[int], unfilled: List[int]):
+        """
+        Folds in one recorded week. demand_in is the new demand each agent
+        received this week and unfilled its backlog right after fulfillment.
+        """
+        self.weeks = weeks = self.weeks + 1
+        delta = customer_demand - self._demand_mean
+        self._demand_mean += delta / weeks
+        self._demand_m2 += delta * (customer_demand - self._demand_mean)
+
+        holding_cost, stockout_cost, peak_backlog = self.holding_cost, self.stockout_cost, self.peak_backlog
+        demand, filled, order_mean, order_m2 = self.demand, self.filled, self._order_mean, self._order_m2
+        for i, agent in enumerate(agents):
+            backlog, order, new_demand = agent.backlog, agent.placed_order_amount, demand_in[i]
+            holding_cost[i] += agent.inventory * agent.holding_cost
+            stockout_cost[i] += backlog * agent.stockout_cost
+            if backlog > peak_backlog[i]:
+                peak_backlog[i] = backlog
+            demand[i] += new_demand
+            if unfilled[i] < new_demand:
+                filled[i] += new_demand - unfilled[i]
+            delta = order - order_mean[i]
+            order_mean[i] += delta / weeks
+            order_m2[i] += delta * (order - order_mean[i])
+
+    @property
+    def total_cost(self) -> List[int]:
+        return [holding + stockout for holding, stockout in zip(self.holding_cost, self.stockout_cost)]
+
+    @property
+    def order_variance_ratio(self) -> List[float]:
+        """
+        NaN while customer demand has not varied yet.
+        """
+        if self._demand_m2 <= 0:
+            return [math.nan] * len(self._order_m2)
+        return [m2 / self._demand_m2 for m2 in self._order_m2]
+
+    @property
+    def fill_rate(self) -> List[float]:
+        return [filled / demand if demand else 1.0 for filled, demand in zip(self.filled, self.demand)]
+
+    def summary(self, tier_names: List[str]) -> Dict[str, Dict]:
+        """
+        JSON-ready metrics per agent.
+        """
+        return _summary(tier_names, {
+            "total_cost": self.total_cost,
+            "holding_cost": list(self.holding_cost),
+            "stockout_cost": list(self.stockout_cost),
+            "peak_backlog": list(self.peak_backlog),
+            "fill_rate": [round(rate, 4) for rate in self.fill_rate],
+            "order_variance_ratio": [None if math.isnan(r) else round(r, 3) for r in self.order_variance_ratio],
+        })
+
+
+class RunningMetrics:
+    """
+    ChainMetrics for BatchSimulationEngine: the same running aggregates held
+    in (N, tiers) arrays, so a week of every chain is a few array operations.
+    """
+    def __init__(self, shape, cost_dtype=np.int64):
+        self.weeks = 0
+        self.holding_cost = np.zeros(shape, dtype=cost_dtype)
+        self.stockout_cost = np.zeros(shape, dtype=cost_dtype)
+        self.peak_backlog = np.zeros(shape, dtype=np.int64)
+        self.demand = np.zeros(shape, dtype=np.int64)
+        self.filled = np.zeros(shape, dtype=np.int64)
+        self._order_mean = np.zeros(shape, dtype=np.float64)
+        self._order_m2 = np.zeros(shape, dtype=np.float64)
+        self._demand_mean = np.zeros(shape[0], dtype=np.float64)
+        self._demand_m2 = np.zeros(shape[0], dtype=np.float64)
+
+    def update(self, customer_demand, demand_in, unfilled, orders, holding, stockout, backlog):
+        """
+        Folds in one week: customer_demand is (N,), the rest (N, tiers), with
+        holding and stockout this week's costs and backlog the end-of-week backlog.
+        """
+        self.weeks += 1
+        self.holding_cost += holding
+        self.stockout_cost += stockout
+        np.maximum(self.peak_backlog, backlog, out=self.peak_backlog)
+        self.demand += demand_in
+        self.filled += demand_in - np.minimum(unfilled, demand_in)
+
+        delta = orders - self._order_mean
+        self._order_mean += delta / self.weeks
+        self._order_m2 += delta * (orders - self._order_mean)
+        delta = customer_demand - self._demand_mean
+        self._demand_mean += delta / self.weeks
+        self._demand_m2 += delta * (customer_demand - self._demand_mean)
+
+    @property
+    def total_cost(self) -> np.ndarray:
+        return self.holding_cost + self.stockout_cost
+
+    @property
+    def order_variance(self) -> np.ndarray:
+        return self._order_m2 / max(self.weeks, 1)
+
+    @property
+    def demand_variance(self) -> np.ndarray:
+        return self._demand_m2 / max(self.weeks, 1)
+
+    @property
+    def order_variance_ratio(self) -> np.ndarray:
+        """
+        NaN while customer demand has not varied yet.
+        """
+        demand_variance = self.demand_variance[..., None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(demand_variance > 0, self.order_variance / demand_variance, np.nan)
+
+    @property
+    def fill_rate(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.demand > 0, self.filled / self.demand, 1.0)
+
+    def summary(self, tier_names: List[str], chain: int = 0) -> Dict[str, Dict]:
+        """
+        JSON-ready metrics per tier of one chain.
+        """
+        return _summary(tier_names, {
+            "total_cost": self.total_cost[chain].tolist(),
+            "holding_cost": self.holding_cost[chain].tolist(),
+            "stockout_cost": self.stockout_cost[chain].tolist(),
+            "peak_backlog": self.peak_backlog[chain].tolist(),
+            "fill_rate": np.round(self.fill_rate[chain], 4).tolist(),
+            "order_variance_ratio": [None if math.isnan(r) else round(r, 3) for r in self.order_variance_ratio[chain].tolist()],
+        })
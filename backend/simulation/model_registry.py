@@ -0,0 +1,152 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from .compiled_model import CompiledTreeEnsemble, file_digest
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(MODEL_DIR, 'agent_model.joblib')
+# Model files are unpickled, so client-supplied names must not reach outside MODEL_DIR
+_VERSION_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def compiled_model_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.npz'
+
+
+def model_metadata_path(path: str) -> str:
+    # Training time, accuracy and parameters written by train_model.py
+    return os.path.splitext(path)[0] + '.json'
+
+
+def load_agent_model(path: str = DEFAULT_MODEL_PATH):
+    """
+    Loads the agent model, preferring the compiled NumPy export written by
+    train_model.py as long as it was exported from the current joblib file.
+    sklearn is only imported when the joblib model has to be used.
+    """
+    compiled_path = path if path.endswith('.npz') else compiled_model_path(path)
+    if os.path.exists(compiled_path):
+        compiled = CompiledTreeEnsemble.load(compiled_path)
+        if compiled_path == path or not os.path.exists(path) or compiled.source_digest == file_digest(path):
+            return compiled
+        print(f"WARNING: '{compiled_path}' is stale, falling back to '{path}'.")
+    try:
+        import joblib
+        return joblib.load(path)
+    except FileNotFoundError:
+        print(f"ERROR: Could not find '{path}'. Please train the model first.")
+        return None
+
+
+def resolve_model_path(model_path: Optional[str] = None, model_version: Optional[str] = None) -> str:
+    """
+    Turns an agent_config model reference into an absolute path. Relative
+    paths are taken from the backend folder rather than the working directory;
+    a version 'v3' refers to agent_model_v3.joblib there. Raises ValueError
+    for a malformed version or a path that resolves outside the backend
+    folder, symlinks included.
+    """
+    if model_path:
+        path = model_path
+    elif model_version:
+        if not _VERSION_PATTERN.match(str(model_version)):
+            raise ValueError(f"Invalid model_version '{model_version}'")
+        path = f'agent_model_{model_version}.joblib'
+    else:
+        path = DEFAULT_MODEL_PATH
+    path = os.path.abspath(os.path.join(MODEL_DIR, path))
+    root = os.path.realpath(MODEL_DIR)
+    if os.path.commonpath([root, os.path.realpath(path)]) != root:
+        raise ValueError(f"Model '{model_path or model_version}' is outside the model folder")
+    return path
+
+
+def _file_key(path: str) -> Tuple[Optional[int], Optional[int]]:
+    # The compiled export counts too, since load_agent_model prefers it
+    key = []
+    for candidate in (path, compiled_model_path(path)):
+        try:
+            key.append(os.stat(candidate).st_mtime_ns)
+        except FileNotFoundError:
+            key.append(None)
+    return tuple(key)
+
+
+class _Entry:
+    __slots__ = ('model', 'key', 'checked_at', 'loads', 'hits', 'load_seconds', 'last_load_seconds')
+
+    def __init__(self):
+        self.model = None
+        self.key = None
+        self.checked_at = 0.0
+        self.loads = 0
+        self.hits = 0
+        self.load_seconds = 0.0
+        self.last_load_seconds = 0.0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of agent models. Each file is deserialized once and
+    shared by every AIAgent and engine that asks for it; the cache is keyed by
+    path and modification time, so a retrained model that replaces the file
+    is picked up on the next lookup after check_interval seconds.
+    """
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str = DEFAULT_MODEL_PATH):
+        entry = self._entries.get(path)
+        now = time.monotonic()
+        if entry is not None and entry.key is not None and now - entry.checked_at < self.check_interval:
+            entry.hits += 1
+            return entry.model
+
+        with self._lock:
+            entry = self._entries.setdefault(path, _Entry())
+            key = _file_key(path)
+            if key != entry.key:
+                start = time.perf_counter()
+                entry.model = load_agent_model(path)
+                entry.last_load_seconds = time.perf_counter() - start
+                entry.load_seconds += entry.last_load_seconds
+                entry.loads += 1
+                entry.key = key
+                if entry.loads > 1:
+                    print(f"Model '{path}' changed on disk and was reloaded in {entry.last_load_seconds:.3f}s.")
+            else:
+                entry.hits += 1
+            entry.checked_at = now
+            return entry.model
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Load counts and times per model path, plus totals.
+        """
+        per_path = {
+            path: {
+                "loads": entry.loads,
+                "hits": entry.hits,
+                "load_seconds": round(entry.load_seconds, 6),
+                "last_load_seconds": round(entry.last_load_seconds, 6),
+                "loaded": entry.model is not None,
+            }
+            for path, entry in self._entries.items()
+        }
+        return {
+            "total_loads": sum(s["loads"] for s in per_path.values()),
+            "total_hits": sum(s["hits"] for s in per_path.values()),
+            "total_load_seconds": round(sum(s["load_seconds"] for s in per_path.values()), 6),
+            "models": per_path,
+        }
+
+
+MODEL_REGISTRY = ModelRegistry()
@@ -0,0 +1,380 @@
+from typing import Dict, List, Optional, Union
+import numpy as np
+from .ai_agent import predict_orders
+from .batch_engine import TIER_NAMES
+from .config import agent_spec
+from .metrics import RunningMetrics
+from .model_registry import MODEL_REGISTRY, resolve_model_path
+
+NodeSpec = Union[str, Dict]
+NODE_DEFAULTS = {"target_inventory": 100, "holding_cost": 1, "stockout_cost": 5}
+
+
+def _segment_sum(values: np.ndarray, ptr: np.ndarray) -> np.ndarray:
+    """
+    Sums values over the contiguous segments values[ptr[i]:ptr[i + 1]]; empty segments give 0.
+    """
+    totals = np.zeros(len(values) + 1, dtype=values.dtype)
+    np.cumsum(values, out=totals[1:])
+    return totals[ptr[1:]] - totals[ptr[:-1]]
+
+
+class Topology:
+    """
+    A supply network as a DAG. Nodes are names or dicts such as
+    {"name": "DC-East", "target_inventory": 200, "holding_cost": 2}; edges
+    are {"from": upstream, "to": downstream, "lead_time": weeks, "share": w}.
+    Goods flow along an edge after lead_time weeks (1 is the next week, 0 the
+    same week) and a node's orders are split over its suppliers in
+    proportion to share. Nodes without suppliers produce what they ship,
+    like the factory; nodes without customers downstream face customer demand.
+
+    Nodes are renumbered in topological order (upstream first) and edges are
+    kept in CSR form: edges sorted by source with out_ptr marking each
+    node's slice, and in_perm/in_ptr giving the same view by destination.
+    """
+    def __init__(self, nodes: List[NodeSpec], edges: List[Dict]):
+        specs = [{"name": node} if isinstance(node, str) else dict(node) for node in nodes]
+        index = {}
+        for i, spec in enumerate(specs):
+            if spec.get("name") in index:
+                raise ValueError(f"Duplicate node '{spec.get('name')}'")
+            index[spec.get("name")] = i
+        src, dst, lead, share = [], [], [], []
+        for edge in edges:
+            for end in ("from", "to"):
+                if edge.get(end) not in index:
+                    raise ValueError(f"Edge refers to unknown node '{edge.get(end)}'")
+            if edge["from"] == edge["to"]:
+                raise ValueError(f"Node '{edge['from']}' cannot supply itself")
+            if int(edge.get("lead_time", 1)) < 0 or float(edge.get("share", 1.0)) <= 0:
+                raise ValueError(f"Edge {edge['from']} -> {edge['to']} needs lead_time >= 0 and share > 0")
+            src.append(index[edge["from"]])
+            dst.append(index[edge["to"]])
+            lead.append(int(edge.get("lead_time", 1)))
+            share.append(float(edge.get("share", 1.0)))
+
+        order = self._topological_order(len(specs), src, dst)
+        rank = np.empty(len(specs), dtype=np.int64)
+        rank[order] = np.arange(len(specs))
+        self.nodes = [specs[i] for i in order]
+        self.names = [spec["name"] for spec in self.nodes]
+        self.num_nodes = len(self.nodes)
+        for key, default in NODE_DEFAULTS.items():
+            setattr(self, key, np.array([spec.get(key, default) for spec in self.nodes]))
+
+        src, dst = rank[np.array(src, dtype=np.int64)], rank[np.array(dst, dtype=np.int64)]
+        by_source = np.lexsort((dst, src))
+        self.edge_src = src[by_source]
+        self.edge_dst = dst[by_source]
+        self.lead_time = np.array(lead, dtype=np.int64)[by_source]
+        self.share = np.array(share, dtype=np.float64)[by_source]
+        self.num_edges = len(self.edge_src)
+        self.out_ptr = np.searchsorted(self.edge_src, np.arange(self.num_nodes + 1))
+        self.in_perm = np.argsort(self.edge_dst, kind="stable")
+        self.in_ptr = np.searchsorted(self.edge_dst[self.in_perm], np.arange(self.num_nodes + 1))
+        self.is_source = np.diff(self.in_ptr) == 0
+        self.is_sink = np.diff(self.out_ptr) == 0
+        self.sinks = np.flatnonzero(self.is_sink)
+        self._split_bounds()
+        self.levels = self._levels()
+
+    @staticmethod
+    def _topological_order(num_nodes: int, src: List[int], dst: List[int]) -> List[int]:
+        # Kahn's algorithm, taking ready nodes in their original order
+        indegree = [0] * num_nodes
+        downstream: List[List[int]] = [[] for _ in range(num_nodes)]
+        for u, v in zip(src, dst):
+            indegree[v] += 1
+            downstream[u].append(v)
+        ready = [i for i in range(num_nodes) if indegree[i] == 0]
+        order = []
+        while ready:
+            ready.sort(reverse=True)
+            node = ready.pop()
+            order.append(node)
+            for v in downstream[node]:
+                indegree[v] -= 1
+                if indegree[v] == 0:
+                    ready.append(v)
+        if len(order) != num_nodes:
+            raise ValueError("Topology has a cycle")
+        return order
+
+    def _split_bounds(self):
+        """
+        Each edge's [lo, hi) slice of its destination's orders, from the
+        cumulative shares; floor(order * hi) - floor(order * lo) then splits
+        an order into integers that add up exactly.
+        """
+        shares = self.share[self.in_perm]
+        counts = np.diff(self.in_ptr)
+        running = np.zeros(self.num_edges + 1)
+        np.cumsum(shares, out=running[1:])
+        start = np.repeat(running[self.in_ptr[:-1]], counts)
+        total = np.repeat(running[self.in_ptr[1:]], counts) - start
+        lo = (running[:-1] - start) / total
+        hi = (running[1:] - start) / total
+        # Exactly 1 at each node's last supplier, so the parts always add up to the order
+        hi[self.in_ptr[1:][counts > 0] - 1] = 1.0
+        self.split_lo = np.empty(self.num_edges)
+        self.split_hi = np.empty(self.num_edges)
+        self.split_lo[self.in_perm] = lo
+        self.split_hi[self.in_perm] = hi
+
+    def _levels(self) -> List[Dict[str, np.ndarray]]:
+        """
+        Groups nodes that can fulfill in the same pass. Only same-week
+        (lead_time 0) edges make a node wait for its supplier, so without
+        them the whole network is one level. Each level keeps its nodes, their
+        outgoing edges, the edges' slice pointers and each edge's source
+        position within the level.
+        """
+        depth = np.zeros(self.num_nodes, dtype=np.int64)
+        same_week = np.flatnonzero(self.lead_time == 0)
+        # Sources come first in topological order, so one pass in that order settles every depth
+        for e in same_week[np.argsort(self.edge_src[same_week], kind="stable")]:
+            depth[self.edge_dst[e]] = max(depth[self.edge_dst[e]], depth[self.edge_src[e]] + 1)
+        levels = []
+        for level in range(int(depth.max(initial=0)) + 1):
+            nodes = np.flatnonzero(depth == level)
+            counts = self.out_ptr[nodes + 1] - self.out_ptr[nodes]
+            ptr = np.concatenate(([0], np.cumsum(counts)))
+            edges = np.repeat(self.out_ptr[nodes] - ptr[:-1], counts) + np.arange(ptr[-1])
+            levels.append({"nodes": nodes, "edges": edges, "ptr": ptr,
+                           "source": np.repeat(np.arange(len(nodes)), counts)})
+        return levels
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> "Topology":
+        if isinstance(spec, cls):
+            return spec
+        return cls(spec.get("nodes", []), spec.get("edges", []))
+
+    def to_dict(self) -> Dict:
+        return {
+            "nodes": self.nodes,
+            "edges": [{"from": self.names[u], "to": self.names[v], "lead_time": int(lead), "share": float(share)}
+                      for u, v, lead, share in zip(self.edge_src, self.edge_dst, self.lead_time, self.share)],
+        }
+
+    @classmethod
+    def chain(cls, names: Optional[List[str]] = None, lead_time: int = 1, **node_params) -> "Topology":
+        """
+        A serial chain, upstream first. The default is the four-tier beer game
+        SimulationEngine runs, which NetworkEngine reproduces week for week.
+        """
+        names = names or TIER_NAMES
+        nodes = [{"name": name, **node_params} for name in names]
+        edges = [{"from": upstream, "to": downstream, "lead_time": lead_time}
+                 for upstream, downstream in zip(names[:-1], names[1:])]
+        return cls(nodes, edges)
+
+
+class NetworkEngine:
+    """
+    Steps a whole Topology one week at a time with array operations over
+    nodes and edges. Each edge holds the backlog its supplier owes the
+    customer and a ring buffer of shipments in transit, so per-edge lead
+    times cost nothing extra per week. A node ships to its external
+    customers first and then to its downstream edges in order, and orders by
+    the same order-up-to rule as Agent, less any stock already in transit
+    beyond next week's delivery (with the default one-week lead times there
+    is none, and the chain preset matches SimulationEngine exactly). AI
+    nodes use their model like AIAgent; agent_config is keyed by node name.
+
+    customer_demand for run_step is a scalar applied at every sink or one
+    value per sink, in the order of demand_nodes.
+    """
+    def __init__(self, topology, agent_config: Optional[Dict] = None, record_history: bool = False,
+                 num_weeks: int = 0, model=None):
+        self.topology = topology = Topology.from_dict(topology)
+        n, num_edges = topology.num_nodes, topology.num_edges
+        self.names = topology.names
+        self.demand_nodes = [self.names[i] for i in topology.sinks]
+        self.target_inventory = topology.target_inventory.astype(np.int64)
+        self.holding_cost = topology.holding_cost
+        self.stockout_cost = topology.stockout_cost
+
+        self.inventory = self.target_inventory.copy()
+        self.external_backlog = np.zeros(n, dtype=np.int64)
+        self.placed_order_amount = np.zeros(n, dtype=np.int64)
+        self.cost = np.zeros(n, dtype=np.result_type(self.holding_cost, self.stockout_cost))
+        self.total_cost = np.zeros_like(self.cost)
+        self.owed = np.zeros(num_edges, dtype=np.int64)
+        self.edge_order = np.zeros(num_edges, dtype=np.int64)
+        self.in_transit = np.zeros(num_edges, dtype=np.int64)
+        # Slot (week + lead_time) % horizon holds what arrives that week, per edge
+        self._horizon = int(topology.lead_time.max(initial=0)) + 1
+        self.pipeline = np.zeros((self._horizon, num_edges), dtype=np.int64)
+        self._shipping = topology.lead_time > 0
+        self.week = 0
+        self.metrics = RunningMetrics((1, n), cost_dtype=self.cost.dtype)
+
+        specs = [agent_spec(agent_config, name) for name in self.names]
+        # Like AIAgent, nodes that produce (no suppliers) always order by rule
+        self.ai_mask = np.array([spec["type"] == 'AI' for spec in specs]) & ~topology.is_source
+        self.model_paths = [resolve_model_path(spec["model_path"], spec["model_version"]) for spec in specs]
+        self._model = model
+        self._demand_window = np.zeros((n, 4), dtype=np.int64)
+
+        self.record_history = record_history
+        self.history: Optional[Dict[str, np.ndarray]] = None
+        if record_history:
+            self._allocate_history(num_weeks + 1)
+
+    @classmethod
+    def chain(cls, agent_config: Optional[Dict] = None, lead_time: int = 1, **kwargs) -> "NetworkEngine":
+        return cls(Topology.chain(lead_time=lead_time), agent_config=agent_config, **kwargs)
+
+    def _allocate_history(self, capacity: int):
+        shape = (max(capacity, 1), self.topology.num_nodes)
+        self.history = {
+            "inventory": np.zeros(shape, dtype=np.int64),
+            "placed_order_amount": np.zeros(shape, dtype=np.int64),
+            "cost": np.zeros(shape, dtype=self.cost.dtype),
+        }
+        self.history["inventory"][0] = self.inventory
+
+    def _grow_history(self):
+        old = self.history
+        self._allocate_history(2 * len(old["inventory"]))
+        for key, values in old.items():
+            self.history[key][:len(values)] = values
+
+    def _out_sum(self, edge_values: np.ndarray) -> np.ndarray:
+        return _segment_sum(edge_values, self.topology.out_ptr)
+
+    def _in_sum(self, edge_values: np.ndarray) -> np.ndarray:
+        return _segment_sum(edge_values[self.topology.in_perm], self.topology.in_ptr)
+
+    def _fulfill(self, level: Dict[str, np.ndarray], external: np.ndarray, shipped: np.ndarray):
+        """
+        Ships what one level's nodes can: external customers first, then each
+        downstream edge in CSR order, each edge getting what is left after
+        the edges before it (a running sum over each node's edge slice).
+        """
+        nodes, edges, ptr = level["nodes"], level["edges"], level["ptr"]
+        owed = self.owed[edges]
+        customers = external[nodes] + self.external_backlog[nodes]
+        inventory = self.inventory[nodes]
+        node_shipped = np.minimum(inventory, customers + _segment_sum(owed, ptr))
+        to_customers = np.minimum(node_shipped, customers)
+        self.external_backlog[nodes] = customers - to_customers
+        self.inventory[nodes] = inventory - node_shipped
+        shipped[nodes] = node_shipped
+        if not len(edges):
+            return
+
+        running = np.zeros(len(owed) + 1, dtype=np.int64)
+        np.cumsum(owed, out=running[1:])
+        ahead = running[:-1] - running[ptr[level["source"]]]
+        sent = np.clip((node_shipped - to_customers)[level["source"]] - ahead, 0, owed)
+        self.owed[edges] = owed - sent
+
+        topology = self.topology
+        moving = self._shipping[edges]
+        if moving.all():
+            arrive = (self.week + topology.lead_time[edges]) % self._horizon
+            self.pipeline[arrive, edges] += sent
+            self.in_transit[edges] += sent
+            return
+        arrive = (self.week + topology.lead_time[edges[moving]]) % self._horizon
+        self.pipeline[arrive, edges[moving]] += sent[moving]
+        self.in_transit[edges[moving]] += sent[moving]
+        # Same-week edges feed a later level before it fulfills
+        np.add.at(self.inventory, topology.edge_dst[edges[~moving]], sent[~moving])
+
+    def run_step(self, customer_demand):
+        """
+        Advances the network one week.
+        """
+        topology = self.topology
+        n = topology.num_nodes
+
+        # 1. Receive what was due this week
+        slot = self.week % self._horizon
+        arrivals = self.pipeline[slot]
+        self.inventory += self._in_sum(arrivals)
+        self.in_transit -= arrivals
+        arrivals[:] = 0
+
+        # 2. Fulfill downstream orders, level by level
+        external = np.zeros(n, dtype=np.int64)
+        external[topology.sinks] = customer_demand
+        demand_in = self._out_sum(self.edge_order) + external
+        self._demand_window[:, self.week % 4] = self._out_sum(self.owed) + self.external_backlog + external
+        shipped = np.zeros(n, dtype=np.int64)
+        for level in topology.levels:
+            self._fulfill(level, external, shipped)
+        unfilled = self._out_sum(self.owed) + self.external_backlog
+
+        # 3. Place upstream orders, split over suppliers by share
+        late = self._in_sum(self.in_transit - self.pipeline[(self.week + 1) % self._horizon])
+        order = np.maximum(0, shipped + self.target_inventory - self.inventory - late)
+        if self.ai_mask.any():
+            self._apply_ai_orders(order, unfilled)
+        sources = topology.is_source
+        order[sources] = shipped[sources]
+        self.inventory[sources] += shipped[sources]
+        node_order = order[topology.edge_dst]
+        self.edge_order = (np.floor(node_order * topology.split_hi) - np.floor(node_order * topology.split_lo)).astype(np.int64)
+        self.owed += self.edge_order
+        self.placed_order_amount = order
+
+        # 4. Record state
+        backlog = self._out_sum(self.owed) + self.external_backlog
+        holding = self.inventory * self.holding_cost
+        stockout = backlog * self.stockout_cost
+        self.cost = holding + stockout
+        self.total_cost += self.cost
+        self.metrics.update(external[topology.sinks].sum(keepdims=True), demand_in[None], unfilled[None],
+                            order[None], holding[None], stockout[None], backlog[None])
+        self.week += 1
+        if self.record_history:
+            if self.week >= len(self.history["inventory"]):
+                self._grow_history()
+            self.history["inventory"][self.week] = self.inventory
+            self.history["placed_order_amount"][self.week] = order
+            self.history["cost"][self.week] = self.cost
+
+    @property
+    def backlog(self) -> np.ndarray:
+        return self._out_sum(self.owed) + self.external_backlog
+
+    def models_by_node(self) -> Dict[int, object]:
+        nodes = np.flatnonzero(self.ai_mask).tolist()
+        if self._model is not None:
+            return {node: self._model for node in nodes}
+        return {node: MODEL_REGISTRY.get(self.model_paths[node]) for node in nodes}
+
+    def _apply_ai_orders(self, order: np.ndarray, backlog: np.ndarray):
+        filled = min(self.week + 1, 4)
+        demand_trend = self._demand_window[:, :filled].sum(axis=1) / filled
+        groups: Dict[int, list] = {}
+        models = {}
+        for node, model in self.models_by_node().items():
+            # Nodes without a model fall back to the rule, like AIAgent
+            if model is not None:
+                groups.setdefault(id(model), []).append(node)
+                models[id(model)] = model
+        for key, nodes in groups.items():
+            features = np.column_stack((self.inventory[nodes], backlog[nodes], demand_trend[nodes]))
+            order[nodes] = predict_orders(models[key], features.astype(np.float64))
+
+    def run(self, demand) -> "NetworkEngine":
+        """
+        Runs one week per column of a (sinks, weeks) demand matrix, or per
+        entry of a (weeks,) vector applied at every sink.
+        """
+        demand = np.asarray(demand)
+        if demand.ndim == 1:
+            demand = np.broadcast_to(demand, (len(self.demand_nodes), len(demand)))
+        if demand.ndim != 2 or demand.shape[0] != len(self.demand_nodes):
+            raise ValueError(f"Expected demand of shape ({len(self.demand_nodes)}, weeks), got {demand.shape}")
+        for week_demand in demand.T:
+            self.run_step(week_demand)
+        return self
+
+    def total_costs(self) -> Dict[str, int]:
+        return dict(zip(self.names, self.total_cost.tolist()))
@@ -0,0 +1,264 @@
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .batch_engine import BatchSimulationEngine
+from .config import agent_spec
+from .scenario import TIER_NAMES, UNLIMITED, compile_scenario, stack_timelines
+
+DEFAULT_PROBLEM = {
+    # The data_generator.py demand process: mostly 15-35 with occasional spikes
+    "scenario": {"demand": {"process": "spiky", "low": 15, "high": 35, "spike_prob": 0.05,
+                            "spike_low": 50, "spike_high": 80}},
+    "weeks": 100,
+    "agent_config": {},
+    "holding_cost": 1,
+    "stockout_cost": 5,
+    "seed": 0,
+}
+DEFAULT_BOUNDS = (0, 300)
+
+
+class PolicyProblem:
+    """
+    Expected total chain cost of per-tier target inventories under a
+    stochastic scenario. Replicate r always draws the same demand and shocks
+    (a Generator seeded with [seed, r]), whatever policy is evaluated, so
+    candidates are compared on common random numbers and their differences
+    carry far less noise than their costs.
+    """
+    def __init__(self, spec: Optional[Dict] = None):
+        self.spec = {**DEFAULT_PROBLEM, **(spec or {})}
+        self.num_weeks = int(self.spec["weeks"])
+        self.agent_config = self.spec["agent_config"] or {}
+        self._replicates: Dict[int, Tuple] = {}
+
+    def default_targets(self) -> np.ndarray:
+        return np.array([agent_spec(self.agent_config, name)["target_inventory"] for name in TIER_NAMES], dtype=np.int64)
+
+    def replicate(self, index: int) -> Tuple:
+        # Compiled once per process and reused for every candidate
+        if index not in self._replicates:
+            rng = np.random.default_rng([self.spec["seed"], index])
+            timeline = compile_scenario(self.spec["scenario"], self.num_weeks, rng)
+            self._replicates[index] = stack_timelines([timeline], self.num_weeks)
+        return self._replicates[index]
+
+    def evaluate(self, targets: np.ndarray, replicates: Sequence[int]) -> np.ndarray:
+        """
+        Total chain cost of each row of targets ((candidates, tiers)) on each
+        replicate, as a (candidates, replicates) array. Every pair is one
+        chain of a single BatchSimulationEngine.
+        """
+        targets = np.asarray(targets, dtype=np.int64)
+        num_candidates, num_replicates = len(targets), len(replicates)
+        compiled = [self.replicate(r) for r in replicates]
+        demand = np.tile(np.concatenate([c[0] for c in compiled]), (num_candidates, 1))
+
+        def tiled(position: int, fill: int) -> Optional[np.ndarray]:
+            if all(c[position] is None for c in compiled):
+                return None
+            rows = [c[position] if c[position] is not None
+                    else np.full((1, self.num_weeks, len(TIER_NAMES)), fill, dtype=np.int64) for c in compiled]
+            return np.tile(np.concatenate(rows), (num_candidates, 1, 1))
+
+        engine = BatchSimulationEngine(num_candidates * num_replicates, target_inventory=np.repeat(targets, num_replicates, axis=0),
+                                       holding_cost=self.spec["holding_cost"], stockout_cost=self.spec["stockout_cost"],
+                                       agent_config=self.agent_config, detect_bullwhip=False)
+        engine.run(demand, tiled(1, UNLIMITED), tiled(2, 0))
+        return engine.total_cost.sum(axis=1).reshape(num_candidates, num_replicates)
+
+    def agent_config_for(self, targets: Sequence[int]) -> Dict:
+        """
+        The base agent_config with each tier's target inventory set.
+        """
+        config = {}
+        for name, target in zip(TIER_NAMES, targets):
+            spec = agent_spec(self.agent_config, name)
+            entry = {"type": spec["type"]}
+            for key in ("model_path", "model_version"):
+                if spec[key]:
+                    entry[key] = spec[key]
+            entry["target_inventory"] = int(target)
+            config[name] = entry
+        return config
+
+
+_WORKER_PROBLEM: Optional[PolicyProblem] = None
+
+
+def _init_worker(spec: Dict):
+    global _WORKER_PROBLEM
+    _WORKER_PROBLEM = PolicyProblem(spec)
+
+
+def _evaluate_in_worker(task: Tuple[np.ndarray, List[int]]) -> np.ndarray:
+    return _WORKER_PROBLEM.evaluate(*task)
+
+
+class PolicyOptimizer:
+    """
+    Searches per-tier target inventories for the lowest expected total cost.
+    Each generation samples candidates (uniformly at first, then ever closer
+    around the best so far, which always competes again) and runs
+    successive halving: every survivor is scored on the same replicates,
+    the best 1/eta go on to eta times as many, until one is left at
+    max_replicates. Scores are cached per candidate and replicate, so
+    survivors only simulate their new replicates. Evaluation chunks fan out
+    over a process pool unless processes is 1; results depend only on the
+    seed, not on the process count or chunk size.
+    """
+    def __init__(self, problem: PolicyProblem, tiers: Optional[Sequence[str]] = None, bounds=DEFAULT_BOUNDS,
+                 candidates: int = 64, generations: int = 3, min_replicates: int = 4, max_replicates: int = 64,
+                 eta: int = 2, processes: Optional[int] = None, chunk_size: int = 16, seed: int = 0):
+        self.problem = problem
+        # By default every tier ordering by rule; AI tiers' targets only set their opening stock
+        self.tiers = list(tiers) if tiers else [name for name in TIER_NAMES
+                                                 if agent_spec(problem.agent_config, name)["type"] != 'AI']
+        for name in self.tiers:
+            if name not in TIER_NAMES:
+                raise ValueError(f"Unknown tier '{name}'")
+        self.bounds = (int(bounds[0]), int(bounds[1]))
+        if self.bounds[0] < 0 or self.bounds[1] < self.bounds[0]:
+            raise ValueError("bounds must satisfy 0 <= low <= high")
+        if eta < 2 or min_replicates < 1 or max_replicates < min_replicates:
+            raise ValueError("Need eta >= 2 and 1 <= min_replicates <= max_replicates")
+        self.num_candidates = max(1, candidates)
+        self.generations = max(1, generations)
+        self.min_replicates = min_replicates
+        self.max_replicates = max_replicates
+        self.eta = eta
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.rng = np.random.default_rng(seed)
+        self.costs: Dict[Tuple[int, ...], np.ndarray] = {}
+        self.chain_weeks = 0
+        self._pool = None
+
+    def _sample(self, generation: int, incumbent: Optional[np.ndarray]) -> np.ndarray:
+        low, high = self.bounds
+        base = self.problem.default_targets()
+        columns = [TIER_NAMES.index(name) for name in self.tiers]
+        candidates = np.tile(base, (self.num_candidates, 1))
+        if incumbent is None:
+            candidates[:, columns] = self.rng.integers(low, high + 1, size=(self.num_candidates, len(columns)))
+            candidates[0] = base
+        else:
+            # Halve the search radius every generation
+            radius = max(1.0, (high - low) / 2 ** (generation + 1))
+            jitter = self.rng.normal(0.0, radius, size=(self.num_candidates, len(columns)))
+            candidates[:, columns] = np.clip(np.rint(incumbent[columns] + jitter), low, high)
+            candidates[0] = incumbent
+        return np.unique(candidates, axis=0)
+
+    def _evaluate(self, candidates: np.ndarray, replicates: int):
+        """
+        Makes sure every candidate has costs for replicates 0..replicates-1.
+        """
+        tasks = []
+        for candidate in candidates:
+            have = len(self.costs.get(tuple(candidate.tolist()), ()))
+            if have < replicates:
+                tasks.append((candidate, have))
+        # Candidates missing the same replicates share engines
+        by_start: Dict[int, List[np.ndarray]] = {}
+        for candidate, have in tasks:
+            by_start.setdefault(have, []).append(candidate)
+        chunks = []
+        for have, group in by_start.items():
+            for i in range(0, len(group), self.chunk_size):
+                chunks.append((np.array(group[i:i + self.chunk_size]), list(range(have, replicates))))
+        if not chunks:
+            return
+        if self._pool is None:
+            results = map(lambda task: self.problem.evaluate(*task), chunks)
+        else:
+            results = self._pool.imap(_evaluate_in_worker, chunks)
+        for (group, replicate_ids), costs in zip(chunks, results):
+            self.chain_weeks += costs.size * self.problem.num_weeks
+            for candidate, row in zip(group, costs):
+                key = tuple(candidate.tolist())
+                self.costs[key] = np.concatenate([self.costs.get(key, np.empty(0)), row])
+
+    def _mean_cost(self, candidate: np.ndarray, replicates: int) -> float:
+        return float(self.costs[tuple(candidate.tolist())][:replicates].mean())
+
+    def _successive_halving(self, candidates: np.ndarray, generation: int, rounds: List[Dict]) -> np.ndarray:
+        alive = candidates
+        replicates = self.min_replicates
+        while True:
+            start = time.perf_counter()
+            chain_weeks = self.chain_weeks
+            self._evaluate(alive, replicates)
+            means = np.array([self._mean_cost(candidate, replicates) for candidate in alive])
+            order = np.argsort(means, kind="stable")
+            seconds = time.perf_counter() - start
+            simulated = self.chain_weeks - chain_weeks
+            rounds.append({
+                "generation": generation,
+                "candidates": len(alive),
+                "replicates": replicates,
+                "best_cost": float(means[order[0]]),
+                "median_cost": float(np.median(means)),
+                "chain_weeks": simulated,
+                "seconds": round(seconds, 6),
+                "chain_weeks_per_sec": simulated / seconds if seconds else 0.0,
+            })
+            if len(alive) == 1 and replicates >= self.max_replicates:
+                return alive[0]
+            alive = alive[order[:max(1, len(alive) // self.eta)]]
+            replicates = min(self.max_replicates, replicates * self.eta)
+
+    def run(self, progress: bool = False) -> Dict:
+        problem = self.problem
+        start = time.perf_counter()
+        if self.processes > 1:
+            self._pool = multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=(problem.spec,))
+        rounds: List[Dict] = []
+        convergence: List[Dict] = []
+        incumbent = None
+        try:
+            baseline = problem.default_targets()
+            for generation in range(self.generations):
+                candidates = self._sample(generation, incumbent)
+                best = self._successive_halving(candidates, generation, rounds)
+                if incumbent is None or self._mean_cost(best, self.max_replicates) <= self._mean_cost(incumbent, self.max_replicates):
+                    incumbent = best
+                convergence.append({"generation": generation, "candidates": len(candidates),
+                                    "best_cost": self._mean_cost(incumbent, self.max_replicates),
+                                    "targets": dict(zip(TIER_NAMES, incumbent.tolist())),
+                                    "seconds": round(time.perf_counter() - start, 6)})
+                if progress:
+                    print(f"  generation {generation}: best expected cost {convergence[-1]['best_cost']:,.1f} "
+                          f"with targets {convergence[-1]['targets']}")
+            self._evaluate(np.array([baseline]), self.max_replicates)
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+        elapsed = time.perf_counter() - start
+        best_costs = self.costs[tuple(incumbent.tolist())][:self.max_replicates]
+        baseline_costs = self.costs[tuple(baseline.tolist())][:self.max_replicates]
+        # Common random numbers: the paired difference is what tells the two policies apart
+        difference = baseline_costs - best_costs
+        n = len(best_costs)
+        return {
+            "agent_config": problem.agent_config_for(incumbent),
+            "expected_cost": float(best_costs.mean()),
+            "std_error": float(best_costs.std(ddof=1) / np.sqrt(n)) if n > 1 else 0.0,
+            "baseline_cost": float(baseline_costs.mean()),
+            "improvement": float(difference.mean()),
+            "improvement_std_error": float(difference.std(ddof=1) / np.sqrt(n)) if n > 1 else 0.0,
+            "replicates": n,
+            "tiers": self.tiers,
+            "convergence": convergence,
+            "rounds": rounds,
+            "candidates_evaluated": len(self.costs),
+            "chain_weeks": self.chain_weeks,
+            "seconds": elapsed,
+            "chain_weeks_per_sec": self.chain_weeks / elapsed if elapsed else 0.0,
+            "processes": self.processes,
+        }
@@ -0,0 +1,215 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+from .queries import backfill_run_fields, ensure_indexes
+
+HISTORY_BUCKET_WEEKS = 52
+
+
+def connect(uri: Optional[str]):
+    """
+    Opens a Mongo client. A "mongomock://" URI gives an in-memory mongomock
+    stand-in for local runs and testing without a mongod.
+    """
+    if uri and uri.startswith("mongomock://"):
+        try:
+            import mongomock
+        except ImportError:
+            raise RuntimeError("A mongomock:// URI needs the mongomock package (pip install mongomock)")
+        return mongomock.MongoClient()
+    from pymongo import MongoClient
+    return MongoClient(uri)
+
+
+def history_buckets(simulation_id: str, agents, bucket_weeks: int = HISTORY_BUCKET_WEEKS) -> List[Dict]:
+    """
+    Splits every agent's history into documents of bucket_weeks weeks each,
+    so no single document grows with the run length. Week 0 is the initial state.
+    """
+    num_weeks = min(len(agent.history["cost"]) for agent in agents)
+    buckets = []
+    for start in range(0, num_weeks, bucket_weeks):
+        stop = min(start + bucket_weeks, num_weeks)
+        buckets.append({
+            "simulation_id": simulation_id,
+            "start_week": start,
+            "end_week": stop - 1,
+            "agents": {
+                agent.name: {key: agent.history.column(key)[start:stop].tolist() for key in agent.history}
+                for agent in agents
+            },
+        })
+    return buckets
+
+
+def _only_duplicates(error: Exception) -> bool:
+    # A retried insert_many finds the runs that made it the first time
+    details = getattr(error, "details", None) or {}
+    write_errors = details.get("writeErrors") or []
+    return bool(write_errors) and all(e.get("code") == 11000 for e in write_errors) \
+        and not details.get("writeConcernErrors")
+
+
+class RunStore:
+    """
+    Write-behind persistence for finished runs. save() only puts the run on a
+    bounded queue (waiting if it is full); a background task groups queued
+    runs and writes them with insert_many from a worker thread, so the event
+    loop never waits on Mongo. Summaries go to the simulations collection and
+    history to per-week bucket documents in simulation_history. The client
+    is created on the first write; close() flushes whatever is still queued.
+    A failed write is retried up to max_retries times, retry_delay seconds
+    apart and doubling, before the batch is dropped.
+    """
+    def __init__(self, uri: Optional[str], database: str = "chainreact_db", max_queue: int = 256,
+                 batch_size: int = 32, flush_interval: float = 0.5, bucket_weeks: int = HISTORY_BUCKET_WEEKS,
+                 max_retries: int = 3, retry_delay: float = 0.5):
+        self.uri = uri
+        self.database = database
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.bucket_weeks = bucket_weeks
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._client = None
+        # The writer thread and /runs queries may both make the first connection
+        self._connect_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.saved = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+
+    @property
+    def db(self):
+        with self._connect_lock:
+            if self._client is None:
+                client = connect(self.uri)
+                db = client[self.database]
+                db.simulations.create_index("simulation_id", unique=True)
+                db.simulation_history.create_index([("simulation_id", 1), ("start_week", 1)])
+                ensure_indexes(db)
+                backfilled = backfill_run_fields(db)
+                if backfilled:
+                    print(f"Added query fields to {backfilled} stored simulation(s).")
+                self._client = client
+        return self._client[self.database]
+
+    def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.create_task(self._run())
+
+    async def save(self, summary: Dict, agents):
+        """
+        Queues a finished run: summary is its simulations document and agents
+        the engine's agents, whose history is bucketed in the writer thread.
+        """
+        self.start()
+        await self._queue.put((summary, list(agents)))
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            # Gather whatever else arrives within flush_interval, up to batch_size runs
+            while len(batch) < self.batch_size:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                # _write drops what it cannot save; this only guards the writer task itself
+                self.failed += len(batch)
+                print(f"Error saving {len(batch)} simulation(s) to MongoDB: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        summaries, buckets = [], []
+        for summary, agents in batch:
+            try:
+                run_buckets = history_buckets(summary["simulation_id"], agents, self.bucket_weeks)
+            except Exception as e:
+                # Nothing to retry: the same run would fail the same way, but the rest of the batch can go
+                self.failed += 1
+                print(f"Error preparing a simulation for MongoDB, dropping it: {e!r}")
+                continue
+            summaries.append(summary)
+            buckets.extend(run_buckets)
+        if not summaries:
+            return
+        summaries_written = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                db = self.db
+                if not summaries_written:
+                    try:
+                        db.simulations.insert_many(summaries, ordered=False)
+                    except Exception as e:
+                        if attempt == 0 or not _only_duplicates(e):
+                            raise
+                    summaries_written = True
+                if buckets:
+                    if attempt:
+                        # Buckets have no unique key; clear any a failed attempt left behind
+                        db.simulation_history.delete_many(
+                            {"simulation_id": {"$in": [summary["simulation_id"] for summary in summaries]}})
+                    db.simulation_history.insert_many(buckets, ordered=False)
+                self.saved += len(summaries)
+                self.batches += 1
+                print(f"Saved {len(summaries)} simulation(s) and {len(buckets)} history buckets to MongoDB.")
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += len(summaries)
+                    print(f"Error saving {len(summaries)} simulation(s) to MongoDB, dropping them: {e}")
+                    return
+                delay = self.retry_delay * 2 ** attempt
+                self.retries += 1
+                print(f"Error saving {len(summaries)} simulation(s) to MongoDB, retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    async def flush(self):
+        """
+        Waits until everything queued so far has been written.
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        if self._worker is not None:
+            await self._queue.put(None)
+            await self._worker
+            self._worker = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "saved": self.saved,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+        }
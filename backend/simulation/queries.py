@@ -0,0 +1,262 @@
+import base64
+import datetime
+import json
+from typing import Dict, List, Optional
+from .config import config_key
+from .scenario import TIER_NAMES
+
+# What a run listing returns: never the summary text, metrics or history
+RUN_FIELDS = {"_id": 0, "simulation_id": 1, "agent_config": 1, "config_key": 1, "weeks": 1,
+              "created_at": 1, "total_cost": 1, "total_costs": 1}
+SORT_FIELDS = ("created_at", "total_cost")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+GROUP_FIELDS = {"config": "$config_key", "weeks": "$weeks"}
+HISTORY_FIELDS = ("inventory", "placed_order_amount", "cost")
+
+# Every listing filters on config_key and/or a cost or date range, then pages by
+# its sort key with simulation_id breaking ties
+RUN_INDEXES = [
+    [("created_at", -1), ("simulation_id", -1)],
+    [("total_cost", 1), ("simulation_id", 1)],
+    [("config_key", 1), ("created_at", -1), ("simulation_id", -1)],
+    [("config_key", 1), ("total_cost", 1), ("simulation_id", 1)],
+]
+
+
+def utc_now() -> datetime.datetime:
+    # BSON dates are naive UTC with millisecond precision; store what reads give back
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def _parse_date(value) -> datetime.datetime:
+    if isinstance(value, datetime.datetime):
+        date = value
+    else:
+        try:
+            date = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Not an ISO date: '{value}'")
+    if date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return date
+
+
+def run_fields(agent_config: Optional[Dict], total_costs: Dict[str, float]) -> Dict:
+    """
+    The top-level fields a run document is filtered, sorted and grouped on.
+    """
+    return {
+        "config_key": config_key(agent_config),
+        "created_at": utc_now(),
+        "total_cost": sum(total_costs.values()),
+        "total_costs": dict(total_costs),
+    }
+
+
+def ensure_indexes(db):
+    for keys in RUN_INDEXES:
+        db.simulations.create_index(keys)
+
+
+def backfill_run_fields(db) -> int:
+    """
+    Adds run_fields to runs stored before they existed: config_key from the
+    agent_config, costs from the summary and created_at from the ObjectId.
+    Returns how many runs it updated.
+    """
+    updated = 0
+    legacy = db.simulations.find({"config_key": {"$exists": False}},
+                                 {"agent_config": 1, "summary.total_cost_data": 1})
+    for run in legacy:
+        costs = {row["name"]: row["cost"] for row in (run.get("summary") or {}).get("total_cost_data", [])}
+        fields = run_fields(run.get("agent_config"), costs)
+        fields["created_at"] = _parse_date(run["_id"].generation_time)
+        db.simulations.update_one({"_id": run["_id"]}, {"$set": fields})
+        updated += 1
+    return updated
+
+
+def run_filter(config: Optional[str] = None, min_cost: Optional[float] = None, max_cost: Optional[float] = None,
+               since=None, until=None, weeks: Optional[int] = None) -> Dict:
+    """
+    A Mongo filter over run documents. config is one config_key, several
+    separated by commas, or an agent_config as JSON; since and until are
+    ISO dates (until exclusive).
+    """
+    query: Dict = {}
+    if config:
+        if config.lstrip().startswith("{"):
+            try:
+                keys = [config_key(json.loads(config))]
+            except json.JSONDecodeError as e:
+                raise ValueError(f"config is not valid JSON: {e}")
+        else:
+            keys = [key.strip() for key in config.split(",") if key.strip()]
+        query["config_key"] = keys[0] if len(keys) == 1 else {"$in": keys}
+    cost = {}
+    if min_cost is not None:
+        cost["$gte"] = min_cost
+    if max_cost is not None:
+        cost["$lte"] = max_cost
+    if cost:
+        query["total_cost"] = cost
+    created = {}
+    if since is not None:
+        created["$gte"] = _parse_date(since)
+    if until is not None:
+        created["$lt"] = _parse_date(until)
+    if created:
+        query["created_at"] = created
+    if weeks is not None:
+        query["weeks"] = weeks
+    return query
+
+
+def _encode_cursor(run: Dict, field: str) -> str:
+    value = run.get(field)
+    if isinstance(value, datetime.datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps([value, run["simulation_id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        value, simulation_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if isinstance(value, dict) and "$date" in value:
+        value = _parse_date(value["$date"])
+    return value, simulation_id
+
+
+def _public(run: Dict) -> Dict:
+    if isinstance(run.get("created_at"), datetime.datetime):
+        run["created_at"] = run["created_at"].isoformat() + "Z"
+    return run
+
+
+class RunQueries:
+    """
+    The read side of RunStore: pages of runs, single runs, history by week
+    range and per-group cost statistics, each a single indexed query or
+    aggregation that leaves histories on the server unless asked for. db is
+    a callable returning the database, so nothing connects until the first
+    query. Methods block; call them from a worker thread.
+    """
+    def __init__(self, db):
+        self._db = db
+
+    @property
+    def db(self):
+        return self._db()
+
+    def list_runs(self, query: Dict, sort: str = "-created_at", limit: int = DEFAULT_PAGE_SIZE,
+                  cursor: Optional[str] = None) -> Dict:
+        """
+        One page of runs matching query, ordered by sort ("created_at" or
+        "total_cost", "-" for descending). next_cursor, when set, fetches
+        the following page; pages stay stable however deep they go because
+        they continue from the last key rather than skipping rows.
+        """
+        field = sort.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}, optionally prefixed with '-'")
+        direction = -1 if sort.startswith("-") else 1
+        limit = min(max(1, int(limit)), MAX_PAGE_SIZE)
+        query = {**query, field: {**query.get(field, {}), "$exists": True}}
+        if cursor:
+            value, simulation_id = _decode_cursor(cursor)
+            beyond = "$lt" if direction < 0 else "$gt"
+            query = {"$and": [query, {"$or": [{field: {beyond: value}},
+                                             {field: value, "simulation_id": {beyond: simulation_id}}]}]}
+        runs = list(self.db.simulations.find(query, RUN_FIELDS)
+                    .sort([(field, direction), ("simulation_id", direction)]).limit(limit + 1))
+        next_cursor = _encode_cursor(runs[limit - 1], field) if len(runs) > limit else None
+        return {"runs": [_public(run) for run in runs[:limit]], "next_cursor": next_cursor}
+
+    def get_run(self, simulation_id: str) -> Optional[Dict]:
+        run = self.db.simulations.find_one({"simulation_id": simulation_id}, {"_id": 0})
+        return _public(run) if run else None
+
+    def history(self, simulation_id: str, start_week: int = 0, end_week: Optional[int] = None,
+                agents: Optional[List[str]] = None, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Weeks start_week..end_week (inclusive; week 0 is the initial state)
+        of a run's history, reading only the buckets that overlap them and
+        only the agents and fields asked for. None if the run has no history.
+        """
+        fields = list(fields or HISTORY_FIELDS)
+        for field in fields:
+            if field not in HISTORY_FIELDS:
+                raise ValueError(f"Unknown history field '{field}', expected one of {', '.join(HISTORY_FIELDS)}")
+        query: Dict = {"simulation_id": simulation_id, "end_week": {"$gte": start_week}}
+        if end_week is not None:
+            query["start_week"] = {"$lte": end_week}
+        projection = {"_id": 0, "start_week": 1, "end_week": 1}
+        if agents:
+            projection.update({f"agents.{agent}.{field}": 1 for agent in agents for field in fields})
+        else:
+            projection.update({f"agents.{agent}.{field}": 1 for agent in TIER_NAMES for field in fields})
+        buckets = list(self.db.simulation_history.find(query, projection).sort("start_week", 1))
+        if not buckets:
+            if self.db.simulation_history.find_one({"simulation_id": simulation_id}, {"_id": 1}) is None:
+                return None
+            return {"simulation_id": simulation_id, "start_week": start_week, "end_week": end_week, "agents": {}}
+
+        series: Dict[str, Dict[str, List[int]]] = {}
+        for bucket in buckets:
+            lo = max(start_week, bucket["start_week"]) - bucket["start_week"]
+            hi = (bucket["end_week"] if end_week is None else min(end_week, bucket["end_week"])) - bucket["start_week"] + 1
+            for agent, columns in bucket.get("agents", {}).items():
+                target = series.setdefault(agent, {field: [] for field in fields})
+                for field in fields:
+                    target[field].extend(columns.get(field, [])[lo:hi])
+        last = buckets[-1]["end_week"] if end_week is None else min(end_week, buckets[-1]["end_week"])
+        return {"simulation_id": simulation_id, "start_week": max(start_week, buckets[0]["start_week"]),
+                "end_week": last, "agents": series}
+
+    def stats(self, query: Dict, group_by: str = "config") -> List[Dict]:
+        """
+        Cost and variance statistics per group of runs (by config or by run
+        length), computed by one aggregation on the server: run count, mean,
+        min, max and standard deviation of total cost, and each tier's mean
+        cost, order variance ratio and fill rate. Groups come cheapest first.
+        """
+        if group_by not in GROUP_FIELDS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_FIELDS)}")
+        group = {
+            "_id": GROUP_FIELDS[group_by],
+            "runs": {"$sum": 1},
+            "mean_cost": {"$avg": "$total_cost"},
+            "min_cost": {"$min": "$total_cost"},
+            "max_cost": {"$max": "$total_cost"},
+            # Variance from the sum of squares; $stdDevPop is not available on every server stand-in
+            "cost_sq": {"$sum": {"$multiply": ["$total_cost", "$total_cost"]}},
+        }
+        for tier in TIER_NAMES:
+            group[f"{tier}_cost"] = {"$avg": f"$total_costs.{tier}"}
+            group[f"{tier}_order_variance_ratio"] = {"$avg": f"$summary.metrics.{tier}.order_variance_ratio"}
+            group[f"{tier}_fill_rate"] = {"$avg": f"$summary.metrics.{tier}.fill_rate"}
+        pipeline = [
+            {"$match": {**query, "total_cost": {**query.get("total_cost", {}), "$exists": True}}},
+            {"$group": group},
+            {"$addFields": {"cost_variance": {"$subtract": [{"$divide": ["$cost_sq", "$runs"]},
+                                                            {"$multiply": ["$mean_cost", "$mean_cost"]}]}}},
+            {"$sort": {"mean_cost": 1}},
+        ]
+        results = []
+        for row in self.db.simulations.aggregate(pipeline):
+            variance = max(0.0, row["cost_variance"])
+            results.append({
+                group_by: row["_id"],
+                "runs": row["runs"],
+                "total_cost": {"mean": row["mean_cost"], "min": row["min_cost"], "max": row["max_cost"],
+                               "std": variance ** 0.5, "variance": variance},
+                "tiers": {tier: {"mean_cost": row[f"{tier}_cost"],
+                                 "order_variance_ratio": row[f"{tier}_order_variance_ratio"],
+                                 "fill_rate": row[f"{tier}_fill_rate"]} for tier in TIER_NAMES},
+            })
+        return results
@@ -0,0 +1,331 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+TIER_NAMES = ["Factory", "Distributor", "Wholesaler", "Retailer"]
+
+DEFAULT_DEMAND = 20
+# The classic run: stable demand of 20 that steps up to 25 at week 10
+DEFAULT_SCENARIO = {"demand": {"process": "step", "before": 20, "after": 25, "week": 10}}
+
+EVENT_TYPES = ("DEMAND_SPIKE", "DEMAND_SHIFT", "CAPACITY", "LEAD_TIME")
+# Shipping capacity of a tier with no capacity shock in force
+UNLIMITED = int(np.iinfo(np.int64).max)
+
+
+def generate_demand(process: Dict, num_weeks: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws one run's weekly customer demand from a demand process spec.
+    """
+    kind = process.get("process", "constant")
+    if kind == "constant":
+        return np.full(num_weeks, process.get("value", 20), dtype=np.int64)
+    if kind == "step":
+        demand = np.full(num_weeks, process.get("before", 20), dtype=np.int64)
+        demand[process.get("week", 10) - 1:] = process.get("after", 25)
+        return demand
+    if kind == "uniform":
+        return rng.integers(process.get("low", 15), process.get("high", 35) + 1, size=num_weeks)
+    if kind == "normal":
+        draws = rng.normal(process.get("mean", 20), process.get("std", 5), size=num_weeks)
+        return np.maximum(0, np.rint(draws)).astype(np.int64)
+    if kind == "spiky":
+        # The data_generator.py process: mostly uniform, with occasional large spikes
+        demand = rng.integers(process.get("low", 15), process.get("high", 35) + 1, size=num_weeks)
+        spikes = rng.random(num_weeks) < process.get("spike_prob", 0.05)
+        demand[spikes] = rng.integers(process.get("spike_low", 50), process.get("spike_high", 80) + 1, size=spikes.sum())
+        return demand
+    raise ValueError(f"Unknown demand process '{kind}'")
+
+
+def seasonal_factors(patterns: Sequence[Dict], num_weeks: int) -> np.ndarray:
+    """
+    Multiplicative weekly demand factors from seasonal patterns: either a
+    sinusoid {"period": 52, "amplitude": 0.2, "phase": 0} or a repeating
+    {"profile": [1.0, 1.2, 0.9, 0.9]}, one factor per week of the cycle.
+    """
+    weeks = np.arange(num_weeks)
+    factors = np.ones(num_weeks)
+    for pattern in patterns:
+        if "profile" in pattern:
+            profile = np.asarray(pattern["profile"], dtype=np.float64)
+            if not len(profile):
+                raise ValueError("A seasonal profile needs at least one factor")
+            factors *= profile[(weeks + int(pattern.get("phase", 0))) % len(profile)]
+        else:
+            period = float(pattern.get("period", 52))
+            factors *= 1 + float(pattern.get("amplitude", 0.0)) * np.sin(2 * np.pi * (weeks - pattern.get("phase", 0)) / period)
+    return factors
+
+
+def normalize_event(event: Dict, week: Optional[int] = None) -> Dict:
+    """
+    Validates a scenario event and fills in its defaults. week overrides the
+    event's own start week (interactive disruptions start next week);
+    a duration of None keeps the event in force to the end of the run.
+    """
+    kind = event.get("type", "DEMAND_SPIKE")
+    if kind not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type '{kind}', expected one of {', '.join(EVENT_TYPES)}")
+    start = int(week if week is not None else event.get("week", 1))
+    if start < 1:
+        raise ValueError("Events start at week 1 or later")
+    duration = event.get("duration", 0 if kind == "DEMAND_SPIKE" else None)
+    duration = None if duration is None else max(0, int(duration))
+    normalized = {"type": kind, "week": start, "duration": duration, "value": int(event.get("value", 0))}
+    if kind in ("CAPACITY", "LEAD_TIME"):
+        tier = event.get("tier")
+        if tier not in TIER_NAMES:
+            raise ValueError(f"A {kind} event needs a tier, one of {', '.join(TIER_NAMES)}")
+        if kind == "LEAD_TIME" and tier == TIER_NAMES[0]:
+            raise ValueError("The Factory receives no shipments to delay")
+        normalized["tier"] = tier
+    if kind != "DEMAND_SHIFT" and normalized["value"] < 0:
+        raise ValueError(f"A {kind} event needs a value of 0 or more")
+    return normalized
+
+
+class Timeline:
+    """
+    A scenario compiled to per-week arrays, indexed by week - 1, that every
+    engine reads instead of deciding week by week what is going on:
+    demand (customer demand), capacity ((weeks, tiers) units each tier can
+    ship, UNLIMITED outside capacity shocks) and delay ((weeks, tiers) extra
+    weeks in transit for shipments sent to each tier that week). notes maps
+    a week to the analyst events (level, event, data) that start then.
+
+    Events overlap freely: while several are in force the highest
+    DEMAND_SPIKE sets demand, DEMAND_SHIFT deltas add up, the tightest
+    CAPACITY and the longest LEAD_TIME win. capacity and delay are None
+    while no event of their kind exists, and demand is base itself while no
+    demand event does, so a plain run costs one array.
+
+    source is the scenario's demand, seasonality, noise and seed; a run
+    stepped past the end of base continues that demand process, while a
+    timeline without one repeats its last base demand.
+    """
+    def __init__(self, base, events: Sequence[Dict] = (), base_notes: Optional[Dict[int, List]] = None,
+                 source: Optional[Dict] = None):
+        self.base = np.asarray(base, dtype=np.int64)
+        self.events: List[Dict] = [normalize_event(event) for event in events]
+        self.base_notes = {int(week): list(notes) for week, notes in (base_notes or {}).items()}
+        self.source = source
+        self._compile()
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @classmethod
+    def constant(cls, value: int = DEFAULT_DEMAND, num_weeks: int = 0) -> "Timeline":
+        return cls(np.full(num_weeks, value, dtype=np.int64))
+
+    def _compile(self):
+        num_weeks = len(self.base)
+        override = shift = capacity = delay = None
+        notes = {week: list(week_notes) for week, week_notes in self.base_notes.items()}
+        for event in self.events:
+            kind = event["type"]
+            start = event["week"] - 1
+            stop = num_weeks if event["duration"] is None else min(num_weeks, start + event["duration"])
+            window = slice(start, max(start, stop))
+            if kind == "DEMAND_SPIKE":
+                if override is None:
+                    override = np.full(num_weeks, -1, dtype=np.int64)
+                np.maximum(override[window], event["value"], out=override[window])
+            elif kind == "DEMAND_SHIFT":
+                if shift is None:
+                    shift = np.zeros(num_weeks, dtype=np.int64)
+                shift[window] += event["value"]
+            elif kind == "CAPACITY":
+                if capacity is None:
+                    capacity = np.full((num_weeks, len(TIER_NAMES)), UNLIMITED, dtype=np.int64)
+                tier = TIER_NAMES.index(event["tier"])
+                np.minimum(capacity[window, tier], event["value"], out=capacity[window, tier])
+            else:
+                if delay is None:
+                    delay = np.zeros((num_weeks, len(TIER_NAMES)), dtype=np.int64)
+                tier = TIER_NAMES.index(event["tier"])
+                np.maximum(delay[window, tier], event["value"], out=delay[window, tier])
+            notes.setdefault(event["week"], []).append(("CRITICAL", "DISRUPTION", self._describe(event)))
+
+        self.override, self.shift = override, shift
+        self.capacity, self.delay = capacity, delay
+        demand = self.base
+        if shift is not None:
+            demand = np.maximum(0, demand + shift)
+        if override is not None:
+            demand = np.where(override >= 0, override, demand)
+        self.demand = demand
+        self.notes = notes
+
+    @staticmethod
+    def _describe(event: Dict) -> Dict:
+        # Spikes keep the data they were always reported with, so cached commentary still matches
+        if event["type"] == "DEMAND_SPIKE":
+            return {"value": event["value"], "duration": event["duration"]}
+        data = {"type": event["type"], "value": event["value"], "duration": event["duration"]}
+        if "tier" in event:
+            data["tier"] = event["tier"]
+        return data
+
+    def add(self, event: Dict, week: Optional[int] = None) -> Dict:
+        """
+        Adds an event on top of whatever is already scheduled and recompiles.
+        """
+        event = normalize_event(event, week)
+        self.events.append(event)
+        self._compile()
+        return event
+
+    def extend(self, num_weeks: int):
+        """
+        Grows the timeline to at least num_weeks, doubling so a run stepped
+        past its planned length stays cheap. New weeks continue the source
+        demand process, drawing from a Generator seeded with the source's
+        seed and the old length, or else repeat the last base demand.
+        """
+        start = len(self.base)
+        if num_weeks <= start:
+            return
+        stop = max(num_weeks, 2 * start)
+        if self.source is None:
+            padding = np.full(stop - start, self.base[-1] if start else DEFAULT_DEMAND, dtype=np.int64)
+        else:
+            rng = np.random.default_rng([int(self.source.get("seed", 0)), start])
+            padding, notes = base_demand(self.source, start, stop, rng)
+            for week, week_notes in notes.items():
+                self.base_notes.setdefault(week, []).extend(week_notes)
+        self.base = np.concatenate([self.base, padding])
+        self._compile()
+
+    def demand_at(self, week: int, customer_demand: Optional[int] = None) -> int:
+        """
+        Customer demand in week. An explicit customer_demand replaces the
+        base demand, but the spikes and shifts in force still apply.
+        """
+        t = week - 1
+        if t >= len(self.base):
+            self.extend(week)
+        if customer_demand is None:
+            return int(self.demand[t])
+        if self.shift is not None:
+            customer_demand = max(0, customer_demand + int(self.shift[t]))
+        if self.override is not None and self.override[t] >= 0:
+            customer_demand = int(self.override[t])
+        return customer_demand
+
+    def with_demand(self, week: int, demand, events: Sequence[Dict] = ()) -> "Timeline":
+        """
+        A copy that keeps weeks up to week and follows demand afterwards, with
+        every event carried over (an event still in force goes on in force)
+        and events added, compiled once.
+        """
+        base = np.concatenate([self.base[:week], np.full(max(0, week - len(self.base)), self.base[-1] if len(self.base)
+                                                         else DEFAULT_DEMAND, dtype=np.int64),
+                               np.asarray(demand, dtype=np.int64)])
+        notes = {w: n for w, n in self.base_notes.items() if w <= week}
+        return Timeline(base, [*self.events, *events], notes)
+
+    def to_dict(self) -> Dict:
+        return {"base": self.base.tolist(), "events": [dict(event) for event in self.events],
+                "base_notes": {str(week): [list(note) for note in notes] for week, notes in self.base_notes.items()},
+                "source": self.source}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Timeline":
+        notes = {int(week): [tuple(note) for note in week_notes] for week, week_notes in data["base_notes"].items()}
+        return cls(data["base"], data["events"], notes, data.get("source"))
+
+
+def base_demand(spec: Dict, start: int, num_weeks: int, rng: np.random.Generator) -> Tuple[np.ndarray, Dict[int, List]]:
+    """
+    Weeks start + 1 to num_weeks of the base demand a scenario describes
+    (its demand, seasonality and noise, before any events), and the analyst
+    notes that fall in them. Deterministic demand comes out the same however
+    the weeks are split up.
+    """
+    demand = spec.get("demand", DEFAULT_DEMAND)
+    notes: Dict[int, List] = {}
+    if isinstance(demand, dict):
+        base = generate_demand(demand, num_weeks, rng)[start:]
+        week = demand.get("week", 10)
+        if demand.get("process") == "step" and max(1, start) < week <= num_weeks:
+            notes[week] = [("INFO", "DEMAND_SHIFT", {"before": demand.get("before", 20),
+                                                     "after": demand.get("after", 25)})]
+    elif isinstance(demand, (list, tuple, np.ndarray)):
+        values = np.asarray(demand, dtype=np.int64)
+        base = values[start:num_weeks]
+        if len(base) < num_weeks - start:
+            fill = values[-1] if len(values) else DEFAULT_DEMAND
+            base = np.concatenate([base, np.full(num_weeks - start - len(base), fill, dtype=np.int64)])
+    else:
+        base = np.full(num_weeks - start, int(demand), dtype=np.int64)
+
+    seasonality = spec.get("seasonality")
+    noise = spec.get("noise")
+    if seasonality or noise:
+        values = base.astype(np.float64)
+        if seasonality:
+            values *= seasonal_factors(seasonality if isinstance(seasonality, list) else [seasonality], num_weeks)[start:]
+        if noise:
+            values += rng.normal(0.0, float(noise.get("std", 0.0)), size=num_weeks - start)
+        base = np.maximum(0, np.rint(values)).astype(np.int64)
+    return base, notes
+
+
+def compile_scenario(spec, num_weeks: int, rng: Optional[np.random.Generator] = None) -> Timeline:
+    """
+    Compiles a declarative scenario into a Timeline of num_weeks weeks:
+
+        {"demand": 20 | [per-week values] | {"process": "normal", "mean": 20, "std": 5},
+         "seasonality": [{"period": 52, "amplitude": 0.2}],
+         "noise": {"std": 2.0},
+         "events": [{"week": 15, "type": "DEMAND_SPIKE", "value": 80, "duration": 3},
+                    {"week": 20, "type": "CAPACITY", "tier": "Factory", "value": 10, "duration": 4},
+                    {"week": 22, "type": "LEAD_TIME", "tier": "Retailer", "value": 2, "duration": 5}],
+         "seed": 0}
+
+    A bare demand process spec (as in sweeps) or a Timeline is accepted too.
+    Random draws come from rng when given, else from a Generator seeded with
+    the scenario's seed, so the same spec always compiles the same way. A
+    num_weeks of 0 (run length unknown) compiles a per-week demand list in
+    full and leaves everything else to Timeline.extend as the run goes on.
+    """
+    if isinstance(spec, Timeline):
+        spec.extend(num_weeks)
+        return spec
+    if spec is None:
+        spec = {}
+    if "process" in spec:
+        spec = {"demand": spec}
+    if rng is None:
+        rng = np.random.default_rng(spec.get("seed", 0))
+
+    demand = spec.get("demand", DEFAULT_DEMAND)
+    if isinstance(demand, np.ndarray):
+        demand = demand.tolist()
+    if not num_weeks and isinstance(demand, (list, tuple)):
+        num_weeks = len(demand)
+    base, base_notes = base_demand(spec, 0, num_weeks, rng)
+    # Kept with the timeline (and its snapshots) so later weeks follow the same process
+    source = {"demand": demand, **{key: spec[key] for key in ("seasonality", "noise", "seed") if key in spec}}
+    return Timeline(base, spec.get("events", []), base_notes, source)
+
+
+def stack_timelines(timelines: Sequence[Timeline], num_weeks: int) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    The first num_weeks of N timelines as a (N, weeks) demand matrix and
+    (N, weeks, tiers) capacity and delay arrays for BatchSimulationEngine.run
+    (None when no timeline has such a shock).
+    """
+    for timeline in timelines:
+        timeline.extend(num_weeks)
+    demand = np.stack([timeline.demand[:num_weeks] for timeline in timelines])
+
+    def stacked(field: str, fill) -> Optional[np.ndarray]:
+        arrays = [getattr(timeline, field) for timeline in timelines]
+        if all(array is None for array in arrays):
+            return None
+        return np.stack([np.full((num_weeks, len(TIER_NAMES)), fill, dtype=np.int64) if array is None
+                         else array[:num_weeks] for array in arrays])
+
+    return demand, stacked("capacity", UNLIMITED), stacked("delay", 0)
@@ -0,0 +1,199 @@
+import json
+import multiprocessing
+import os
+import struct
+import zlib
+from typing import Dict, List, Optional
+import numpy as np
+from .agent import AgentHistory
+from .ai_agent import AIAgent
+from .engine import SimulationEngine
+from .scenario import Timeline, generate_demand
+
+AGENT_STATE = ("inventory", "target_inventory", "backlog", "incoming_shipment", "placed_order_amount",
+               "shipped_this_week", "holding_cost", "stockout_cost")
+
+# Disruptions per branch; each one is compiled into the branch's timeline
+MAX_DISRUPTIONS = 64
+
+# Snapshot payload: magic, version, flags, metadata length, agents, history weeks, then
+# the metadata JSON and an int32 (agents, history fields, weeks) block, zlib-compressed if flagged
+SNAPSHOT_MAGIC = b"CRSS"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<4sBBIHI")
+FLAG_COMPRESSED = 1
+
+
+def _slot_state(obj, skip=()) -> Dict:
+    """
+    Copies the slots of a ChainMetrics or BullwhipDetector (lists of numbers and scalars).
+    """
+    state = {}
+    for slot in type(obj).__slots__:
+        if slot not in skip:
+            value = getattr(obj, slot)
+            state[slot] = list(value) if isinstance(value, list) else value
+    return state
+
+
+def _load_slots(obj, state: Dict):
+    for slot, value in state.items():
+        setattr(obj, slot, list(value) if isinstance(value, list) else value)
+
+
+class EngineSnapshot:
+    """
+    A SimulationEngine's full state at the end of a week: every agent's
+    stock, backlog, in-flight shipment and (for AI agents) demand window,
+    the scenario timeline with every event in force and the shipments held
+    back by lead-time shocks, the running
+    metrics and bullwhip detector, the weekly history, and optionally the
+    state of the Generator drawing the run's demand. restore() builds a new
+    engine that carries on exactly as the original would; to_bytes() gives
+    a compact form for handing forks to worker processes.
+    """
+    def __init__(self, meta: Dict, history: np.ndarray):
+        self.meta = meta
+        self.history = history
+
+    @property
+    def week(self) -> int:
+        return self.meta["week"]
+
+    @classmethod
+    def capture(cls, engine: SimulationEngine, rng: Optional[np.random.Generator] = None) -> "EngineSnapshot":
+        agents = []
+        for agent in engine.agents:
+            state = {"name": agent.name, **{field: getattr(agent, field) for field in AGENT_STATE}}
+            if isinstance(agent, AIAgent):
+                state["demand_history"] = list(agent.demand_history)
+            agents.append(state)
+        meta = {
+            "week": engine.week,
+            "agent_config": engine.agent_config,
+            "enable_analyst": engine.enable_analyst,
+            "batch_inference": engine.batch_inference,
+            "timeline": engine.timeline.to_dict(),
+            "in_transit": {str(week): list(units) for week, units in engine.in_transit.items()},
+            "agents": agents,
+            "metrics": _slot_state(engine.metrics),
+            "detector_config": vars(engine.detector.config),
+            "detector": _slot_state(engine.detector, skip=("config",)),
+            "rng": rng.bit_generator.state if rng is not None else None,
+        }
+        history = np.stack([agent.history.to_array() for agent in engine.agents])
+        return cls(meta, history)
+
+    def restore(self, num_weeks: int = 0) -> SimulationEngine:
+        """
+        A new engine in the captured state, with history room for num_weeks in total.
+        """
+        meta = self.meta
+        engine = SimulationEngine(meta["agent_config"], enable_analyst=meta["enable_analyst"],
+                                  batch_inference=meta["batch_inference"], detector_config=meta["detector_config"])
+        capacity = max(num_weeks + 1, 2 * self.history.shape[2])
+        for agent, state, history in zip(engine.agents, meta["agents"], self.history):
+            for field in AGENT_STATE:
+                setattr(agent, field, state[field])
+            if "demand_history" in state:
+                agent.demand_history = list(state["demand_history"])
+            agent.history = AgentHistory.from_array(history, capacity)
+        engine.timeline = Timeline.from_dict(meta["timeline"])
+        engine.in_transit = {int(week): list(units) for week, units in meta["in_transit"].items()}
+        _load_slots(engine.metrics, meta["metrics"])
+        _load_slots(engine.detector, meta["detector"])
+        engine.week = meta["week"]
+        return engine
+
+    def rng(self) -> Optional[np.random.Generator]:
+        """
+        A Generator continuing the captured demand stream, or None if none was captured.
+        """
+        state = self.meta["rng"]
+        if state is None:
+            return None
+        bit_generator = getattr(np.random, state["bit_generator"])()
+        bit_generator.state = state
+        return np.random.Generator(bit_generator)
+
+    def to_bytes(self, compress: bool = True) -> bytes:
+        meta = json.dumps(self.meta, separators=(",", ":")).encode()
+        body = meta + self.history.astype("<i4").tobytes()
+        if compress:
+            body = zlib.compress(body, 6)
+        agents, _, weeks = self.history.shape
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, FLAG_COMPRESSED if compress else 0,
+                                      len(meta), agents, weeks)
+        return header + body
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "EngineSnapshot":
+        magic, version, flags, meta_length, agents, weeks = SNAPSHOT_HEADER.unpack_from(payload)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a ChainReact engine snapshot")
+        body = payload[SNAPSHOT_HEADER.size:]
+        if flags & FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+        meta = json.loads(body[:meta_length])
+        history = np.frombuffer(body, dtype="<i4", offset=meta_length).reshape(agents, -1, weeks)
+        return cls(meta, history)
+
+
+def run_branch(snapshot: EngineSnapshot, branch: Dict) -> Dict:
+    """
+    Runs one what-if branch from a snapshot. branch gives the extra "weeks",
+    the customer "demand" (a constant, a list with one value per week, or a
+    demand process spec as in sweeps, drawn from the snapshot's Generator so
+    every branch sees the same draws) and "disruptions", a list of scenario
+    events such as {"week": 30, "type": "DEMAND_SPIKE", "value": 80, "duration": 3}.
+    Events already in force at the snapshot carry on into every branch.
+    """
+    num_weeks = int(branch.get("weeks", 10))
+    engine = snapshot.restore(snapshot.week + num_weeks)
+    demand = branch.get("demand", 20)
+    if isinstance(demand, dict):
+        demand = generate_demand(demand, num_weeks, snapshot.rng() or np.random.default_rng(0))
+    elif not isinstance(demand, list):
+        demand = [demand] * num_weeks
+    disruptions = branch.get("disruptions", [])
+    if not isinstance(disruptions, list) or len(disruptions) > MAX_DISRUPTIONS:
+        raise ValueError(f"disruptions must be a list of at most {MAX_DISRUPTIONS} events")
+    engine.timeline = engine.timeline.with_demand(snapshot.week, [int(value) for value in demand[:num_weeks]],
+                                                  disruptions)
+
+    for week in range(snapshot.week + 1, snapshot.week + min(num_weeks, len(demand)) + 1):
+        engine.run_step(week)
+
+    names = [agent.name for agent in engine.agents]
+    return {
+        "name": branch.get("name"),
+        "week": engine.week,
+        "total_costs": dict(zip(names, engine.metrics.total_cost)),
+        "metrics": engine.metrics.summary(names),
+        "bullwhip_episodes": dict(zip(names, engine.detector.episodes)),
+    }
+
+
+_WORKER_SNAPSHOT: Optional[EngineSnapshot] = None
+
+
+def _init_worker(payload: bytes):
+    global _WORKER_SNAPSHOT
+    _WORKER_SNAPSHOT = EngineSnapshot.from_bytes(payload)
+
+
+def _run_branch_in_worker(branch: Dict) -> Dict:
+    return run_branch(_WORKER_SNAPSHOT, branch)
+
+
+def run_branches(snapshot: EngineSnapshot, branches: List[Dict], processes: Optional[int] = None) -> List[Dict]:
+    """
+    Runs what-if branches from one snapshot, in a process pool unless
+    processes is 1. Each worker decodes the snapshot once; results come
+    back in the order of branches.
+    """
+    processes = min(processes or os.cpu_count() or 1, len(branches))
+    if processes <= 1:
+        return [run_branch(snapshot, branch) for branch in branches]
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(snapshot.to_bytes(),)) as pool:
+        return pool.map(_run_branch_in_worker, branches)
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class WarmUp:
+    """
+    Start-up work that runs in the background once the server is accepting
+    connections, such as loading the agent model or finding the LLM's model.
+    Each step is a coroutine function returning a short description of what
+    it did. ready turns True once every step has finished, whether it
+    succeeded or not: a failed step leaves its feature degraded (e.g. the
+    analyst offline), not the server unready.
+    """
+    def __init__(self):
+        self._steps: Dict[str, Callable[[], Awaitable]] = {}
+        self._status: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._created = time.perf_counter()
+        self.seconds: Optional[float] = None
+
+    def add(self, name: str, step: Callable[[], Awaitable]):
+        self._steps[name] = step
+        self._status[name] = {"status": "pending"}
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_all())
+        return self._task
+
+    async def _run_all(self):
+        await asyncio.gather(*(self._run(name, step) for name, step in self._steps.items()))
+        self.seconds = time.perf_counter() - self._created
+
+    async def _run(self, name: str, step: Callable[[], Awaitable]):
+        start = time.perf_counter()
+        self._status[name] = {"status": "running"}
+        try:
+            detail = await step()
+            status = {"status": "done", "detail": detail}
+        except Exception as e:
+            print(f"WARNING: Start-up step '{name}' failed: {e}")
+            status = {"status": "failed", "detail": str(e)}
+        status["seconds"] = round(time.perf_counter() - start, 6)
+        self._status[name] = status
+
+    @property
+    def ready(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def describe(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "steps": dict(self._status),
+        }
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
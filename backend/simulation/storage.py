@@ -0,0 +1,173 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional; .npy shards need only NumPy
+    pyarrow = None
+    pq = None
+
+
+class ShardWriter:
+    """
+    Streams typed column batches to a directory of shards instead of keeping
+    every row in memory. Columns are cast to the declared schema dtypes
+    (int32/float32 for the training data); string columns listed in
+    categories are stored as int8 codes. Each shard is either one .npy file
+    per column (memory-mappable) or, with format='parquet' and pyarrow
+    installed, one Parquet file. A manifest.json describes the shards.
+    Without a schema, the dtypes of the first batch are used. With append,
+    new shards are added after the ones an earlier writer left in directory.
+    """
+    def __init__(self, directory: str, schema: Optional[Dict[str, str]] = None, shard_rows: int = 1 << 20,
+                 format: str = "npy", categories: Optional[Dict[str, List[str]]] = None, append: bool = False):
+        if format == "parquet" and pyarrow is None:
+            raise ImportError("Parquet output needs pyarrow; install it or use format='npy'.")
+        if format not in ("npy", "parquet"):
+            raise ValueError(f"Unknown shard format '{format}'")
+        self.directory = directory
+        self.schema = {name: np.dtype(dtype) for name, dtype in (schema or {}).items()}
+        self.shard_rows = shard_rows
+        self.format = format
+        self.categories = categories or {}
+        self._codes = {name: {value: i for i, value in enumerate(values)} for name, values in self.categories.items()}
+        self._buffers: Dict[str, List[np.ndarray]] = {}
+        self._buffered_rows = 0
+        self._shards: List[Dict] = []
+        if append and has_shards(directory):
+            manifest = read_manifest(directory)
+            if manifest["format"] != format:
+                raise ValueError(f"Cannot append {format} shards to {manifest['format']} shards in '{directory}'")
+            existing = {name: np.dtype(dtype) for name, dtype in manifest["columns"].items()}
+            if self.schema and self.schema != existing:
+                raise ValueError(f"Schema does not match the shards already in '{directory}'")
+            if self.categories and self.categories != manifest["categories"]:
+                raise ValueError(f"Categories do not match the shards already in '{directory}'")
+            self.schema = existing
+            self.categories = manifest["categories"]
+            self._codes = {name: {value: i for i, value in enumerate(values)} for name, values in self.categories.items()}
+            self._shards = manifest["shards"]
+        os.makedirs(directory, exist_ok=True)
+
+    def _encode(self, name: str, values) -> np.ndarray:
+        if name in self._codes:
+            codes = self._codes[name]
+            values = [codes[value] for value in values]
+        return np.asarray(values, dtype=self.schema[name])
+
+    def write(self, columns: Dict[str, object]):
+        """
+        Appends a batch; every schema column must be present with the same length.
+        """
+        if not self.schema:
+            self.schema = {name: np.dtype(np.int8) if name in self.categories else np.asarray(values).dtype
+                           for name, values in columns.items()}
+        lengths = {len(columns[name]) for name in self.schema}
+        if len(lengths) != 1:
+            raise ValueError(f"Column batch has mismatched lengths: {lengths}")
+        for name in self.schema:
+            self._buffers.setdefault(name, []).append(self._encode(name, columns[name]))
+        self._buffered_rows += lengths.pop()
+        if self._buffered_rows >= self.shard_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffered_rows:
+            return
+        columns = {name: np.concatenate(parts) for name, parts in self._buffers.items()}
+        shard_name = f"shard-{len(self._shards):05d}"
+        if self.format == "npy":
+            shard_dir = os.path.join(self.directory, shard_name)
+            os.makedirs(shard_dir, exist_ok=True)
+            for name, values in columns.items():
+                np.save(os.path.join(shard_dir, f"{name}.npy"), values)
+        else:
+            shard_name += ".parquet"
+            table = pyarrow.table(columns)
+            pq.write_table(table, os.path.join(self.directory, shard_name))
+        self._shards.append({"name": shard_name, "rows": self._buffered_rows})
+        self._buffers = {}
+        self._buffered_rows = 0
+        self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = {
+            "format": self.format,
+            "columns": {name: dtype.str for name, dtype in self.schema.items()},
+            "categories": self.categories,
+            "shards": self._shards,
+            "rows": sum(shard["rows"] for shard in self._shards),
+        }
+        with open(os.path.join(self.directory, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def close(self):
+        self.flush()
+        self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def has_shards(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, MANIFEST))
+
+
+def read_manifest(directory: str) -> Dict:
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+def iter_shards(directory: str, columns: Optional[List[str]] = None, mmap: bool = True,
+                start_shard: int = 0) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Yields one dict of column arrays per shard, from start_shard on. With
+    mmap, .npy shards are memory-mapped, so only the pages actually touched are read.
+    """
+    manifest = read_manifest(directory)
+    columns = columns or list(manifest["columns"])
+    for shard in manifest["shards"][start_shard:]:
+        path = os.path.join(directory, shard["name"])
+        if manifest["format"] == "npy":
+            yield {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in columns}
+        else:
+            if pq is None:
+                raise ImportError("Reading Parquet shards needs pyarrow.")
+            table = pq.read_table(path, columns=columns)
+            yield {name: table.column(name).to_numpy() for name in columns}
+
+
+def read_shards(directory: str, columns: Optional[List[str]] = None, max_rows: Optional[int] = None,
+                mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Loads columns across shards. max_rows stops after the shards needed for
+    that many rows, so a partial load never touches the rest of the data.
+    A single memory-mapped shard is returned without copying.
+    """
+    parts: Dict[str, List[np.ndarray]] = {}
+    rows = 0
+    for shard in iter_shards(directory, columns, mmap=mmap):
+        shard_rows = len(next(iter(shard.values())))
+        take = shard_rows if max_rows is None else min(shard_rows, max_rows - rows)
+        for name, values in shard.items():
+            parts.setdefault(name, []).append(values if take == shard_rows else values[:take])
+        rows += take
+        if max_rows is not None and rows >= max_rows:
+            break
+    return {name: values[0] if len(values) == 1 else np.concatenate(values) for name, values in parts.items()}
+
+
+def decode_categories(directory: str, name: str, codes: np.ndarray) -> np.ndarray:
+    """
+    Maps the int8 codes of a categorical column back to their labels.
+    """
+    labels = np.array(read_manifest(directory)["categories"][name])
+    return labels[codes]
@@ -0,0 +1,226 @@
+import struct
+from typing import Dict, List, Tuple
+import numpy as np
+
+STREAM_MODES = ("json", "delta", "binary")
+STATE_FIELDS = ["inventory", "placed_order_amount", "backlog", "cost"]
+METRIC_INT_FIELDS = ["total_cost", "holding_cost", "stockout_cost", "peak_backlog"]
+METRIC_FLOAT_FIELDS = ["fill_rate", "order_variance_ratio"]
+
+# Binary frame: magic, version, first week, weeks, agents, int32 fields, float32 fields,
+# then an int32 (weeks, agents, int fields) block and a float32 (weeks, agents, float fields) block
+BINARY_MAGIC = b"CR"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<2sBIHBBB")
+
+DEFAULT_TICK = 0.3
+MAX_TICK = 5.0
+MAX_WEEKS_PER_FRAME = 512
+
+
+class StreamOptions:
+    """
+    How a client wants its frames, from the "stream" object of the
+    start_simulation message. mode is json (one nested dict per week, the
+    default the frontend uses), delta (only fields that changed since the
+    last frame) or binary (struct-packed little-endian columns). tick is the
+    pause between frames in seconds, 0 for as fast as possible; max_unacked,
+    if set, makes the server wait for {"type": "ack", "week": n} messages so
+    it never runs more than that many weeks ahead of a slow reader.
+    """
+    def __init__(self, mode: str = "json", weeks_per_frame: int = 1, tick: float = DEFAULT_TICK, max_unacked: int = 0):
+        self.mode = mode if mode in STREAM_MODES else "json"
+        try:
+            self.weeks_per_frame = min(max(1, int(weeks_per_frame)), MAX_WEEKS_PER_FRAME)
+            self.tick = min(max(0.0, float(tick)), MAX_TICK)
+            self.max_unacked = max(0, int(max_unacked))
+        except (TypeError, ValueError):
+            raise ValueError("Stream options weeks_per_frame and max_unacked must be integers and tick a number")
+
+    @classmethod
+    def from_message(cls, start_data: Dict) -> "StreamOptions":
+        stream = start_data.get("stream") or {}
+        if not isinstance(stream, dict):
+            raise ValueError("stream must be an object")
+        return cls(
+            mode=stream.get("mode", "json"),
+            weeks_per_frame=stream.get("weeks_per_frame", 1),
+            tick=stream.get("tick", DEFAULT_TICK),
+            max_unacked=stream.get("max_unacked", 0),
+        )
+
+    def describe(self, agent_names: List[str]) -> Dict:
+        """
+        The stream_config message that tells the client what it will receive.
+        """
+        config = {
+            "type": "stream_config",
+            "mode": self.mode,
+            "weeks_per_frame": self.weeks_per_frame,
+            "tick": self.tick,
+            "max_unacked": self.max_unacked,
+            "agents": agent_names,
+        }
+        if self.mode == "binary":
+            config["layout"] = {
+                "header": "<2sBIHBBB: magic 'CR', version, first_week, weeks, agents, int_fields, float_fields",
+                "int32_fields": STATE_FIELDS + METRIC_INT_FIELDS,
+                "float32_fields": METRIC_FLOAT_FIELDS,
+            }
+        return config
+
+
+def capture_week(engine, agent_names: List[str]) -> Dict:
+    """
+    One week's agent state and running metrics, the payload every stream mode encodes.
+    """
+    agents = {
+        agent.name: {
+            "inventory": agent.inventory,
+            "placed_order_amount": agent.placed_order_amount,
+            "backlog": agent.backlog,
+            "cost": agent.history["cost"][-1],
+        }
+        for agent in engine.agents
+    }
+    return {"agents": agents, "metrics": engine.metrics.summary(agent_names)}
+
+
+class FrameEncoder:
+    """
+    Buffers captured weeks (see capture_week) and turns them into WebSocket
+    messages. flush() returns a list of ("json", dict) or ("bytes", bytes)
+    messages to send in order.
+    """
+    def __init__(self, agent_names: List[str]):
+        self.agent_names = agent_names
+        self._weeks: List[Tuple[int, object, List[Dict]]] = []
+
+    def __len__(self):
+        return len(self._weeks)
+
+    def add_week(self, week: int, state: Dict, events: List[Dict]):
+        self._weeks.append((week, state, events))
+
+    def flush(self) -> List[Tuple[str, object]]:
+        weeks, self._weeks = self._weeks, []
+        if not weeks:
+            return []
+        return self._encode(weeks)
+
+    def _encode(self, weeks) -> List[Tuple[str, object]]:
+        frames = []
+        for week, state, events in weeks:
+            frame = {"week": week, **state}
+            if events:
+                frame["events"] = events
+            frames.append(frame)
+        if len(frames) == 1:
+            return [("json", frames[0])]
+        return [("json", {"type": "weeks", "frames": frames})]
+
+
+def _changed(previous: Dict, current: Dict) -> Dict:
+    """
+    The parts of current that differ from previous, recursing into nested dicts.
+    """
+    delta = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = _changed(old, value)
+            if nested:
+                delta[key] = nested
+        elif value != old:
+            delta[key] = value
+    return delta
+
+
+class DeltaFrameEncoder(FrameEncoder):
+    """
+    Sends only the agent fields and metrics that changed since the previous
+    week; the first week is sent in full. Clients merge each entry into the
+    state they already hold.
+    """
+    def __init__(self, agent_names: List[str]):
+        super().__init__(agent_names)
+        self._last: Dict = {}
+
+    def _encode(self, weeks) -> List[Tuple[str, object]]:
+        entries = []
+        for week, state, events in weeks:
+            entry = {"week": week, **_changed(self._last, state)}
+            if events:
+                entry["events"] = events
+            entries.append(entry)
+            self._last = state
+        return [("json", {"type": "delta", "weeks": entries})]
+
+
+class BinaryFrameEncoder(FrameEncoder):
+    """
+    Packs a batch of weeks into one binary frame of int32 state and cost
+    columns plus float32 rate columns (NaN ratios stay NaN). Analyst events
+    cannot be packed, so they follow as a JSON "events" message.
+    """
+    def _columns(self, state: Dict):
+        ints, floats = [], []
+        for name in self.agent_names:
+            agent, metrics = state["agents"][name], state["metrics"][name]
+            ints.append([agent[field] for field in STATE_FIELDS] + [metrics[field] for field in METRIC_INT_FIELDS])
+            floats.append([np.nan if metrics[field] is None else metrics[field] for field in METRIC_FLOAT_FIELDS])
+        return ints, floats
+
+    def _encode(self, weeks) -> List[Tuple[str, object]]:
+        columns = [self._columns(state) for _, state, _ in weeks]
+        ints = np.array([week_ints for week_ints, _ in columns], dtype="<i4")
+        floats = np.array([week_floats for _, week_floats in columns], dtype="<f4")
+        header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, weeks[0][0], len(weeks), len(self.agent_names),
+                                    ints.shape[2], floats.shape[2])
+        messages = [("bytes", header + ints.tobytes() + floats.tobytes())]
+        events = [event for _, _, week_events in weeks for event in week_events]
+        if events:
+            messages.append(("json", {"type": "events", "events": events}))
+        return messages
+
+
+def decode_binary_frame(payload: bytes) -> Dict:
+    """
+    Unpacks a BinaryFrameEncoder frame into week numbers and column arrays.
+    """
+    magic, version, first_week, num_weeks, num_agents, num_ints, num_floats = BINARY_HEADER.unpack_from(payload)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a ChainReact binary frame")
+    offset = BINARY_HEADER.size
+    ints = np.frombuffer(payload, dtype="<i4", count=num_weeks * num_agents * num_ints, offset=offset)
+    offset += ints.nbytes
+    floats = np.frombuffer(payload, dtype="<f4", count=num_weeks * num_agents * num_floats, offset=offset)
+    return {
+        "weeks": np.arange(first_week, first_week + num_weeks),
+        "ints": ints.reshape(num_weeks, num_agents, num_ints),
+        "floats": floats.reshape(num_weeks, num_agents, num_floats),
+    }
+
+
+ENCODERS = {"json": FrameEncoder, "delta": DeltaFrameEncoder, "binary": BinaryFrameEncoder}
+
+
+def make_encoder(options: StreamOptions, agent_names: List[str]) -> FrameEncoder:
+    return ENCODERS[options.mode](agent_names)
+
+
+class AckWindow:
+    """
+    Application-level backpressure for fast-forward streams: after a frame,
+    wait() reads client acks until the client is fewer than max_unacked weeks
+    behind. Disabled when max_unacked is 0, leaving only transport flow control.
+    """
+    def __init__(self, max_unacked: int):
+        self.max_unacked = max_unacked
+        self.acked_week = 0
+
+    async def wait(self, websocket, sent_week: int):
+        while self.max_unacked and sent_week - self.acked_week >= self.max_unacked:
+            message = await websocket.receive_json()
+            if message.get("type") == "ack":
+                self.acked_week = max(self.acked_week, int(message.get("week", 0)))
@@ -0,0 +1,192 @@
+import csv
+import multiprocessing
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+from .batch_engine import BatchSimulationEngine, TIER_NAMES
+from .scenario import compile_scenario, stack_timelines
+
+DEFAULT_GRID = {
+    "agent_configs": [{}, {"Retailer": "AI", "Wholesaler": "AI", "Distributor": "AI"}],
+    "demand": [
+        {"process": "spiky", "low": 15, "high": 35, "spike_prob": 0.05, "spike_low": 50, "spike_high": 80},
+        {"process": "step", "before": 20, "after": 25, "week": 10},
+    ],
+    "target_inventory": [100],
+    "holding_cost": [1],
+    "stockout_cost": [5],
+    "seeds": 100,
+    "weeks": 100,
+}
+
+# Grid dimensions in decoding order; agent_configs is outermost so consecutive runs share a config
+GRID_AXES = ["agent_configs", "demand", "target_inventory", "holding_cost", "stockout_cost", "seeds"]
+
+
+class SweepGrid:
+    """
+    The cartesian product of a sweep spec, addressed by run index so workers
+    can rebuild any slice of it without the full list ever being built.
+    """
+    def __init__(self, spec: Dict, base_seed: int = 0):
+        self.spec = {**DEFAULT_GRID, **spec}
+        seeds = self.spec["seeds"]
+        self.axes = {axis: list(self.spec[axis]) for axis in GRID_AXES if axis != "seeds"}
+        self.axes["seeds"] = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+        for axis, values in self.axes.items():
+            if not values:
+                raise ValueError(f"Sweep axis '{axis}' is empty")
+        self.num_weeks = int(self.spec["weeks"])
+        self.base_seed = base_seed
+        self._sizes = [len(self.axes[axis]) for axis in GRID_AXES]
+        self.runs_per_config = int(np.prod(self._sizes[1:]))
+
+    def __len__(self) -> int:
+        return int(np.prod(self._sizes))
+
+    def indices(self, run_index: int) -> Dict[str, int]:
+        indices = {}
+        for axis, size in zip(reversed(GRID_AXES), reversed(self._sizes)):
+            run_index, indices[axis] = divmod(run_index, size)
+        return indices
+
+    def params(self, run_index: int) -> Dict:
+        indices = self.indices(run_index)
+        params = {axis: self.axes[axis][i] for axis, i in indices.items()}
+        params["run_index"] = run_index
+        params["seed"] = params.pop("seeds")
+        return params
+
+    def demand_rng(self, run_index: int) -> np.random.Generator:
+        # Keyed on the demand process and replicate only, so every config, target and cost
+        # sees the same demand for a given seed (common random numbers)
+        indices = self.indices(run_index)
+        return np.random.default_rng([self.base_seed, indices["demand"], self.axes["seeds"][indices["seeds"]]])
+
+    def chunks(self, chunk_size: int) -> Iterator[Tuple[int, int]]:
+        """
+        Yields (start, stop) run ranges that never cross an agent config boundary.
+        """
+        for config_start in range(0, len(self), self.runs_per_config):
+            config_stop = config_start + self.runs_per_config
+            for start in range(config_start, config_stop, chunk_size):
+                yield start, min(start + chunk_size, config_stop)
+
+
+def run_chunk(grid: SweepGrid, start: int, stop: int) -> Dict[str, np.ndarray]:
+    """
+    Runs grid[start:stop] as one BatchSimulationEngine and returns per-run result columns.
+    """
+    params = [grid.params(i) for i in range(start, stop)]
+    # Each demand entry is a demand process or a full scenario, compiled per run from its own draws
+    timelines = [compile_scenario(p["demand"], grid.num_weeks, grid.demand_rng(p["run_index"])) for p in params]
+    demand, capacity, delay = stack_timelines(timelines, grid.num_weeks)
+    engine = BatchSimulationEngine(
+        len(params),
+        target_inventory=np.array([p["target_inventory"] for p in params])[:, None],
+        holding_cost=np.array([p["holding_cost"] for p in params])[:, None],
+        stockout_cost=np.array([p["stockout_cost"] for p in params])[:, None],
+        agent_config=params[0]["agent_configs"],
+    )
+
+    engine.run(demand, capacity, delay)
+    metrics = engine.metrics
+
+    indices = [grid.indices(p["run_index"]) for p in params]
+    columns = {
+        "run_index": np.arange(start, stop, dtype=np.int64),
+        "config_index": np.array([i["agent_configs"] for i in indices], dtype=np.int32),
+        "demand_index": np.array([i["demand"] for i in indices], dtype=np.int32),
+        "seed": np.array([p["seed"] for p in params], dtype=np.int64),
+        "target_inventory": np.array([p["target_inventory"] for p in params]),
+        "holding_cost": np.array([p["holding_cost"] for p in params]),
+        "stockout_cost": np.array([p["stockout_cost"] for p in params]),
+        "total_cost": engine.total_cost.sum(axis=1),
+        "mean_demand": demand.mean(axis=1),
+    }
+    for i, name in enumerate(TIER_NAMES):
+        columns[f"{name}_cost"] = engine.total_cost[:, i]
+        columns[f"{name}_peak_backlog"] = metrics.peak_backlog[:, i]
+        columns[f"{name}_order_var"] = metrics.order_variance[:, i]
+        columns[f"{name}_order_var_ratio"] = metrics.order_variance_ratio[:, i]
+        columns[f"{name}_fill_rate"] = metrics.fill_rate[:, i]
+        columns[f"{name}_bullwhip_episodes"] = engine.detector.episodes[:, i]
+    return columns
+
+
+_WORKER_GRID: Optional[SweepGrid] = None
+
+
+def _init_worker(spec: Dict, base_seed: int):
+    global _WORKER_GRID
+    _WORKER_GRID = SweepGrid(spec, base_seed)
+
+
+def _run_chunk_in_worker(bounds: Tuple[int, int]) -> Dict[str, np.ndarray]:
+    return run_chunk(_WORKER_GRID, *bounds)
+
+
+class CsvResultWriter:
+    """
+    Appends result column batches to a CSV file as they arrive.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", newline="")
+        self._writer = None
+
+    def write(self, columns: Dict[str, np.ndarray]):
+        if self._writer is None:
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(columns.keys())
+        self._writer.writerows(zip(*(values.tolist() for values in columns.values())))
+
+    def close(self):
+        self._file.close()
+
+
+def run_sweep(spec: Dict, writer, processes: Optional[int] = None, chunk_size: int = 1024,
+              base_seed: int = 0, progress: bool = True) -> Dict:
+    """
+    Fans the sweep out over a process pool in chunks and streams each chunk's
+    results to writer as soon as it finishes, so memory stays flat however
+    large the grid is. Results are deterministic for a given base_seed,
+    independent of chunk size and process count.
+    """
+    grid = SweepGrid(spec, base_seed)
+    processes = processes or os.cpu_count() or 1
+    total_runs = len(grid)
+    done = 0
+    start = time.perf_counter()
+
+    if processes == 1:
+        results = (run_chunk(grid, *bounds) for bounds in grid.chunks(chunk_size))
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(grid.spec, base_seed))
+        results = pool.imap_unordered(_run_chunk_in_worker, grid.chunks(chunk_size))
+
+    try:
+        for columns in results:
+            writer.write(columns)
+            done += len(columns["run_index"])
+            if progress:
+                print(f"  ...completed {done}/{total_runs} runs.")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    chain_weeks = total_runs * grid.num_weeks
+    return {
+        "runs": total_runs,
+        "chain_weeks": chain_weeks,
+        "seconds": elapsed,
+        "chain_weeks_per_sec": chain_weeks / elapsed if elapsed else 0.0,
+        "processes": processes,
+        "agent_configs": grid.axes["agent_configs"],
+        "demand_processes": grid.axes["demand"],
+    }
+
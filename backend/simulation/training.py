@@ -0,0 +1,506 @@
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from .ai_agent import FEATURE_NAMES
+from .batch_engine import TIER_NAMES
+from .storage import has_shards, iter_shards, read_manifest
+
+TARGET = 'placed_order'
+TIER_COLUMN = 'agent_name'
+COST_COLUMN = 'weekly_cost'
+MAX_BINS = 255
+CACHE_META = "binned.json"
+# Threshold rewriting reads HistGradientBoostingRegressor internals; requirements.txt pins this range
+SKLEARN_VERSIONS = ">=1.3,<1.8"
+
+# Fixed for every candidate; early stopping picks the number of trees
+BASE_PARAMS = {"max_iter": 1000, "early_stopping": True, "n_iter_no_change": 10, "tol": 1e-7,
+               "scoring": "loss", "random_state": 42}
+DEFAULT_CANDIDATE = {"learning_rate": 0.1, "max_leaf_nodes": 31, "min_samples_leaf": 20, "l2_regularization": 0.0}
+SEARCH_SPACE = {
+    "learning_rate": [0.05, 0.1, 0.2],
+    "max_leaf_nodes": [15, 31, 63],
+    "min_samples_leaf": [20, 50],
+    "l2_regularization": [0.0, 1.0],
+}
+
+
+def cache_path(data_path: str) -> str:
+    return data_path.rstrip("/\\") + ".binned"
+
+
+def _source_info(data_path: str) -> Dict:
+    if has_shards(data_path):
+        return {"kind": "shards", "shards": [shard["name"] for shard in read_manifest(data_path)["shards"]]}
+    stat = os.stat(data_path + ".csv")
+    return {"kind": "csv", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _extends(cached: Dict, source: Dict) -> bool:
+    # Shards only ever get appended, so a cache of a prefix of them can be topped up
+    if cached["kind"] != source["kind"]:
+        return False
+    if cached["kind"] == "shards":
+        return source["shards"][:len(cached["shards"])] == cached["shards"]
+    return cached == source
+
+
+def read_source(data_path: str, start_shard: int = 0) -> Tuple[Dict[str, Optional[np.ndarray]], List[str]]:
+    """
+    Reads the feature, target, tier and cost columns of a shard directory
+    (from start_shard on) or of the legacy CSV. Tier and cost are None when
+    the data has no such column. Returns the columns and the tier labels.
+    """
+    wanted = FEATURE_NAMES + [TARGET, TIER_COLUMN, COST_COLUMN]
+    if has_shards(data_path):
+        manifest = read_manifest(data_path)
+        present = [name for name in wanted if name in manifest["columns"]]
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in present}
+        for shard in iter_shards(data_path, present, start_shard=start_shard):
+            for name, values in shard.items():
+                parts[name].append(np.asarray(values))
+        columns = {name: np.concatenate(values) if values else np.empty(0, dtype=manifest["columns"][name])
+                   for name, values in parts.items()}
+        tier_names = manifest["categories"].get(TIER_COLUMN, TIER_NAMES)
+    else:
+        import pandas as pd
+        df = pd.read_csv(data_path + ".csv")
+        columns = {name: df[name].to_numpy() for name in wanted if name in df.columns}
+        tier_names = TIER_NAMES
+        if TIER_COLUMN in columns:
+            codes = {name: i for i, name in enumerate(tier_names)}
+            columns[TIER_COLUMN] = np.array([codes[name] for name in columns[TIER_COLUMN]], dtype=np.int8)
+    missing = [name for name in FEATURE_NAMES + [TARGET] if name not in columns]
+    if missing:
+        raise ValueError(f"'{data_path}' has no {', '.join(missing)} column")
+    for name in (TIER_COLUMN, COST_COLUMN):
+        columns.setdefault(name, None)
+    return columns, list(tier_names)
+
+
+def raw_features(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    # The float32 rounding CompiledTreeEnsemble.predict applies, so bin edges agree with it
+    return np.column_stack([np.asarray(columns[name], dtype=np.float32) for name in FEATURE_NAMES]).astype(np.float64)
+
+
+def fit_bin_edges(values: np.ndarray, max_bins: int = MAX_BINS) -> np.ndarray:
+    """
+    Bin edges for one feature: midpoints between its distinct values, or
+    between roughly equal-count groups of them when there are more than
+    max_bins. Code k holds the values in (edges[k - 1], edges[k]].
+    """
+    distinct, counts = np.unique(values, return_counts=True)
+    if len(distinct) > max_bins:
+        # Start a new bin at every value whose preceding count crosses a multiple of n / max_bins
+        starts = np.cumsum(counts) - counts
+        group = np.floor(starts * (max_bins / len(values))).astype(np.int64)
+        last = np.flatnonzero(np.diff(group))
+        return (distinct[last] + distinct[last + 1]) * 0.5
+    return (distinct[:-1] + distinct[1:]) * 0.5
+
+
+def apply_bins(X: np.ndarray, edges: List[np.ndarray]) -> np.ndarray:
+    codes = np.empty(X.shape, dtype=np.uint8)
+    for f, feature_edges in enumerate(edges):
+        codes[:, f] = np.searchsorted(feature_edges, X[:, f], side="left")
+    return codes
+
+
+class Split(NamedTuple):
+    fit: np.ndarray
+    validation: np.ndarray
+    test: np.ndarray
+
+
+class BinnedDataset:
+    """
+    The training columns of a shard directory or CSV with every feature
+    pre-binned to uint8 codes once and cached next to the data
+    (<data>.binned). Later loads memory-map the cache, so search workers
+    share it instead of each re-reading and re-binning the source; shards
+    appended since the cache was built are binned with the cached edges and
+    added on load, so codes keep their meaning across incremental retrains.
+
+    A tree fitted on codes splits on "code <= k", which is the raw split
+    "x <= edges[k]"; to_raw_thresholds() rewrites a model that way.
+    """
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = directory
+        with open(os.path.join(directory, CACHE_META)) as f:
+            self.meta = json.load(f)
+        self.edges = [np.array(edges, dtype=np.float64) for edges in self.meta["edges"]]
+        mode = "r" if mmap else None
+        self.codes = np.load(os.path.join(directory, "codes.npy"), mmap_mode=mode)
+        self.target = np.load(os.path.join(directory, "target.npy"), mmap_mode=mode)
+        self.tier = self._optional("tier", mode)
+        self.cost = self._optional("cost", mode)
+        self.tier_names = self.meta["tier_names"]
+        self._splits: Dict[Tuple, Split] = {}
+
+    def __len__(self) -> int:
+        return len(self.target)
+
+    def __repr__(self):
+        return f"BinnedDataset(rows={len(self)}, bins={[len(edges) + 1 for edges in self.edges]})"
+
+    def _optional(self, name: str, mode: Optional[str]) -> Optional[np.ndarray]:
+        path = os.path.join(self.directory, f"{name}.npy")
+        return np.load(path, mmap_mode=mode) if os.path.exists(path) else None
+
+    @classmethod
+    def load(cls, data_path: str, max_bins: int = MAX_BINS, refresh: bool = False) -> "BinnedDataset":
+        """
+        Opens the cache for data_path, building it on first use (or with
+        refresh) and topping it up with any shards appended since.
+        """
+        directory = cache_path(data_path)
+        source = _source_info(data_path)
+        meta = None
+        if not refresh and os.path.exists(os.path.join(directory, CACHE_META)):
+            with open(os.path.join(directory, CACHE_META)) as f:
+                meta = json.load(f)
+        if meta is None or meta["max_bins"] != max_bins or not _extends(meta["source"], source):
+            cls._build(data_path, directory, source, max_bins)
+        elif meta["source"] != source:
+            cls._append(data_path, directory, meta, source)
+        return cls(directory)
+
+    @classmethod
+    def _build(cls, data_path: str, directory: str, source: Dict, max_bins: int):
+        start = time.perf_counter()
+        columns, tier_names = read_source(data_path)
+        X = raw_features(columns)
+        edges = [fit_bin_edges(X[:, f], max_bins) for f in range(X.shape[1])]
+        os.makedirs(directory, exist_ok=True)
+        cls._write(directory, apply_bins(X, edges), columns)
+        meta = {"source": source, "max_bins": max_bins, "features": FEATURE_NAMES, "tier_names": tier_names,
+                "edges": [feature_edges.tolist() for feature_edges in edges], "rows": len(X),
+                "binning_seconds": round(time.perf_counter() - start, 6)}
+        with open(os.path.join(directory, CACHE_META), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def _append(cls, data_path: str, directory: str, meta: Dict, source: Dict):
+        columns, _ = read_source(data_path, start_shard=len(meta["source"]["shards"]))
+        edges = [np.array(feature_edges) for feature_edges in meta["edges"]]
+        cached = cls(directory, mmap=False)
+        merged = {TARGET: np.concatenate([cached.target, columns[TARGET]])}
+        for name, old in ((TIER_COLUMN, cached.tier), (COST_COLUMN, cached.cost)):
+            merged[name] = None if old is None or columns[name] is None else np.concatenate([old, columns[name]])
+        cls._write(directory, np.concatenate([cached.codes, apply_bins(raw_features(columns), edges)]), merged)
+        meta.update(source=source, rows=len(merged[TARGET]))
+        with open(os.path.join(directory, CACHE_META), "w") as f:
+            json.dump(meta, f)
+
+    @staticmethod
+    def _write(directory: str, codes: np.ndarray, columns: Dict[str, Optional[np.ndarray]]):
+        np.save(os.path.join(directory, "codes.npy"), codes)
+        np.save(os.path.join(directory, "target.npy"), np.asarray(columns[TARGET], dtype=np.int32))
+        for name, column, dtype in (("tier", columns[TIER_COLUMN], np.int8), ("cost", columns[COST_COLUMN], np.int32)):
+            path = os.path.join(directory, f"{name}.npy")
+            if column is not None:
+                np.save(path, np.asarray(column, dtype=dtype))
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def groups(self, per_tier: bool = False) -> List[str]:
+        """
+        'all' (the pooled model), plus every tier that has rows when per_tier.
+        """
+        if not per_tier:
+            return ["all"]
+        if self.tier is None:
+            raise ValueError("The training data has no agent_name column, so per-tier models cannot be trained")
+        present = np.flatnonzero(np.bincount(self.tier, minlength=len(self.tier_names)))
+        return ["all"] + [self.tier_names[code] for code in present]
+
+    def split(self, group: str = "all", max_rows: Optional[int] = None, seed: int = 42) -> Split:
+        """
+        Row indices for fitting, early stopping and testing: 20% test as the
+        old train_model.py split, then 10% of the rest for validation.
+        """
+        key = (group, max_rows, seed)
+        if key not in self._splits:
+            from sklearn.model_selection import train_test_split
+            rows = np.arange(min(len(self), max_rows or len(self)))
+            if group != "all":
+                rows = rows[self.tier[rows] == self.tier_names.index(group)]
+            train, test = train_test_split(rows, test_size=0.2, random_state=seed)
+            fit, validation = train_test_split(train, test_size=0.1, random_state=seed)
+            self._splits[key] = Split(np.sort(fit), np.sort(validation), np.sort(test))
+        return self._splits[key]
+
+    def sample_weight(self, rows: np.ndarray, weighting: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        None, or with weighting='cost' weights that halve at the median
+        weekly_cost, so orders placed in expensive weeks count for less.
+        """
+        if weighting is None:
+            return None
+        if weighting != "cost":
+            raise ValueError(f"Unknown sample weighting '{weighting}'")
+        if self.cost is None:
+            raise ValueError("The training data has no weekly_cost column to weight by")
+        cost = np.asarray(self.cost[rows], dtype=np.float64)
+        return 1.0 / (1.0 + cost / max(np.median(cost), 1.0))
+
+    def fit_arrays(self, rows: np.ndarray, weighting: Optional[str] = None):
+        """
+        Codes, targets and weights to fit on. Codes missing from these rows
+        are added as zero-weight anchor rows, so the model's own binning maps
+        code k to bin k and a later warm start bins the same way.
+        """
+        X = np.asarray(self.codes[rows], dtype=np.float64)
+        y = np.asarray(self.target[rows], dtype=np.float64)
+        weight = self.sample_weight(rows, weighting)
+        missing = [np.flatnonzero(np.bincount(self.codes[rows, f], minlength=len(edges) + 1) == 0)
+                   for f, edges in enumerate(self.edges)]
+        num_anchors = max(len(codes) for codes in missing)
+        if num_anchors:
+            anchors = np.zeros((num_anchors, X.shape[1]))
+            for f, codes in enumerate(missing):
+                anchors[:, f] = X[0, f]
+                anchors[:len(codes), f] = codes
+            X = np.vstack([X, anchors])
+            y = np.concatenate([y, np.full(num_anchors, y.mean())])
+            weight = np.concatenate([np.ones(len(rows)) if weight is None else weight, np.zeros(num_anchors)])
+        return X, y, weight
+
+
+def _tree_internals(model):
+    """
+    The fitted bin thresholds and tree predictors of a
+    HistGradientBoostingRegressor. Both are private to sklearn, so a layout
+    other than the one SKLEARN_VERSIONS has fails here with a clear error
+    rather than with wrong thresholds.
+    """
+    problem = None
+    try:
+        bin_thresholds = model._bin_mapper.bin_thresholds_
+        predictors = model._predictors
+        missing = {"is_leaf", "feature_idx", "bin_threshold", "num_threshold"}.difference(predictors[0][0].nodes.dtype.names)
+        if missing:
+            problem = f"tree nodes have no {', '.join(sorted(missing))}"
+    except (AttributeError, IndexError, TypeError) as e:
+        problem = str(e)
+    if problem:
+        import sklearn
+        raise RuntimeError(f"scikit-learn {sklearn.__version__} does not expose the histogram tree internals "
+                           f"training relies on ({problem}); install scikit-learn{SKLEARN_VERSIONS}")
+    return bin_thresholds, predictors
+
+
+def binning_is_identity(model, edges: List[np.ndarray]) -> bool:
+    # True when the model's own bins are exactly the cached codes
+    bin_thresholds, _ = _tree_internals(model)
+    return all(np.array_equal(thresholds, np.arange(len(feature_edges)) + 0.5)
+               for thresholds, feature_edges in zip(bin_thresholds, edges))
+
+
+def _set_thresholds(model, edges: Optional[List[np.ndarray]] = None):
+    """
+    Rewrites every split's num_threshold from its bin_threshold: in code
+    space when edges is None, otherwise as the raw value edges[f][k] for the
+    split "code <= k". Both are derived from the bins, so either direction
+    can be applied any number of times.
+    """
+    bin_thresholds, all_predictors = _tree_internals(model)
+    for predictors in all_predictors:
+        for predictor in predictors:
+            nodes = predictor.nodes
+            splits = nodes["is_leaf"] == 0
+            for f in np.unique(nodes["feature_idx"][splits]).tolist():
+                at = splits & (nodes["feature_idx"] == f)
+                code = bin_thresholds[f][nodes["bin_threshold"][at]]
+                nodes["num_threshold"][at] = code if edges is None else edges[f][np.floor(code).astype(np.intp)]
+
+
+def to_raw_thresholds(model, edges: List[np.ndarray]):
+    """
+    Turns a model fitted on codes into one that predicts on raw feature
+    rows, as AIAgent and the compiled export expect.
+    """
+    _set_thresholds(model, edges)
+    model.feature_names_in_ = np.array(FEATURE_NAMES, dtype=object)
+
+
+def to_code_thresholds(model):
+    _set_thresholds(model)
+    if hasattr(model, "feature_names_in_"):
+        del model.feature_names_in_
+
+
+def evaluate(model, X: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    predictions = model.predict(X)
+    return {"mse": float(mean_squared_error(y, predictions)), "mae": float(mean_absolute_error(y, predictions)),
+            "r2": float(r2_score(y, predictions))}
+
+
+def fit_candidate(dataset: BinnedDataset, split: Split, params: Dict, weighting: Optional[str] = None,
+                  model=None) -> Dict:
+    """
+    Fits one HistGradientBoostingRegressor on the codes of split.fit with
+    early stopping on split.validation. Passing a fitted model continues
+    it (warm start) instead.
+    """
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    if model is None:
+        model = HistGradientBoostingRegressor(**{**BASE_PARAMS, **params})
+    X, y, weight = dataset.fit_arrays(split.fit, weighting)
+    X_val = np.asarray(dataset.codes[split.validation], dtype=np.float64)
+    y_val = np.asarray(dataset.target[split.validation], dtype=np.float64)
+    start = time.perf_counter()
+    model.fit(X, y, sample_weight=weight, X_val=X_val, y_val=y_val,
+              sample_weight_val=dataset.sample_weight(split.validation, weighting))
+    seconds = time.perf_counter() - start
+    return {
+        "params": params,
+        "validation_mse": float(np.mean((model.predict(X_val) - y_val) ** 2)),
+        "n_iter": int(model.n_iter_),
+        "fit_seconds": round(seconds, 6),
+        "model": model,
+    }
+
+
+def candidates(num_candidates: int, space: Optional[Dict] = None, seed: int = 0) -> List[Dict]:
+    """
+    The default parameters first, then a seeded random sample of the rest
+    of the grid (all of it when num_candidates covers it).
+    """
+    space = space or SEARCH_SPACE
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    first = {name: DEFAULT_CANDIDATE[name] for name in space if name in DEFAULT_CANDIDATE}
+    rest = [params for params in grid if params != first]
+    order = np.random.default_rng(seed).permutation(len(rest))
+    return ([first] + [rest[i] for i in order])[:max(1, num_candidates)]
+
+
+_WORKER_DATASET: Optional[BinnedDataset] = None
+_WORKER_OPTIONS: Dict = {}
+_WORKER_LIMITS = None
+
+
+def _init_worker(directory: str, options: Dict, threads: int):
+    global _WORKER_DATASET, _WORKER_OPTIONS, _WORKER_LIMITS
+    from threadpoolctl import threadpool_limits
+    _WORKER_DATASET = BinnedDataset(directory)
+    _WORKER_OPTIONS = options
+    # Kept referenced for the worker's lifetime; processes x threads stays within the cores
+    _WORKER_LIMITS = threadpool_limits(threads)
+
+
+def _fit_task(dataset: BinnedDataset, options: Dict, task: Tuple[str, int, Dict]):
+    group, index, params = task
+    split = dataset.split(group, options["max_rows"], options["seed"])
+    return group, index, fit_candidate(dataset, split, params, options["weighting"])
+
+
+def _fit_in_worker(task: Tuple[str, int, Dict]):
+    return _fit_task(_WORKER_DATASET, _WORKER_OPTIONS, task)
+
+
+def search(dataset: BinnedDataset, groups: List[str], params_list: List[Dict], processes: Optional[int] = None,
+           max_rows: Optional[int] = None, weighting: Optional[str] = None, seed: int = 42,
+           progress: bool = True) -> Dict[str, Dict]:
+    """
+    Fits every candidate for every group across a process pool. Each worker
+    memory-maps the binned cache and gets cores // processes threads for
+    the booster itself. Returns, per group, the best fitted model and the
+    scores of all candidates, best first.
+    """
+    tasks = [(group, i, params) for group in groups for i, params in enumerate(params_list)]
+    cores = os.cpu_count() or 1
+    processes = max(1, min(processes or cores, len(tasks)))
+    threads = max(1, cores // processes)
+    options = {"max_rows": max_rows, "weighting": weighting, "seed": seed}
+
+    if processes == 1:
+        results = (_fit_task(dataset, options, task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(dataset.directory, options, threads))
+        results = pool.imap_unordered(_fit_in_worker, tasks)
+
+    best: Dict[str, Dict] = {}
+    scores: Dict[str, List[Dict]] = {group: [] for group in groups}
+    try:
+        for done, (group, index, result) in enumerate(results, start=1):
+            model = result.pop("model")
+            scores[group].append({"candidate": index, **result})
+            if group not in best or result["validation_mse"] < best[group]["validation_mse"]:
+                best[group] = {**result, "model": model}
+            if progress:
+                print(f"  ...{done}/{len(tasks)} fits: {group} candidate {index} val MSE "
+                      f"{result['validation_mse']:.3f} after {result['n_iter']} trees in {result['fit_seconds']:.2f}s")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return {
+        group: {**best[group], "search": sorted(scores[group], key=lambda score: score["validation_mse"]),
+                "processes": processes, "threads_per_process": threads}
+        for group in groups
+    }
+
+
+def continue_training(dataset: BinnedDataset, group: str, model, metadata: Dict, extra_iter: int,
+                      max_rows: Optional[int] = None, weighting: Optional[str] = None, seed: int = 42) -> Optional[Dict]:
+    """
+    Warm-starts a saved model on the current data, adding up to extra_iter
+    trees (early stopping may add fewer). Returns None when the model cannot
+    be continued: it is not a histogram booster, the cache was re-binned
+    since, or the model's bins no longer line up with the cached codes.
+    """
+    if type(model).__name__ != "HistGradientBoostingRegressor":
+        return None
+    if metadata.get("binning", {}).get("edges") != dataset.meta["edges"] or not binning_is_identity(model, dataset.edges):
+        return None
+    previous_iter = int(model.n_iter_)
+    to_code_thresholds(model)
+    model.set_params(warm_start=True, max_iter=previous_iter + extra_iter)
+    result = fit_candidate(dataset, dataset.split(group, max_rows, seed), metadata.get("params", {}), weighting, model)
+    model.set_params(warm_start=False)
+    if not binning_is_identity(model, dataset.edges):
+        return None
+    result["warm_start"] = {"from_iterations": previous_iter, "added_iterations": result["n_iter"] - previous_iter}
+    return result
+
+
+def model_metadata(dataset: BinnedDataset, group: str, result: Dict, data_path: str, max_rows: Optional[int] = None,
+                   weighting: Optional[str] = None, seed: int = 42, seconds: Optional[Dict] = None) -> Dict:
+    """
+    What train_model.py writes next to a model: how it was trained, how long
+    it took and how accurate it is on the held-out test rows. Call before
+    to_raw_thresholds(), while the model still predicts on codes.
+    """
+    import sklearn
+    model = result["model"]
+    split = dataset.split(group, max_rows, seed)
+    X_test = np.asarray(dataset.codes[split.test], dtype=np.float64)
+    return {
+        "model": type(model).__name__,
+        "tier": group,
+        "features": FEATURE_NAMES,
+        "target": TARGET,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "data": {"path": data_path, "source": dataset.meta["source"], "max_rows": max_rows,
+                 "rows": {"fit": len(split.fit), "validation": len(split.validation), "test": len(split.test)},
+                 "sample_weighting": weighting},
+        "params": result["params"],
+        "n_iter": result["n_iter"],
+        "warm_start": result.get("warm_start"),
+        "training_seconds": {**(seconds or {}), "fit": result["fit_seconds"]},
+        "accuracy": evaluate(model, X_test, dataset.target[split.test]),
+        "validation_mse": result["validation_mse"],
+        "search": result.get("search", []),
+        "binning": {"max_bins": dataset.meta["max_bins"], "edges": dataset.meta["edges"],
+                    "identity": binning_is_identity(model, dataset.edges)},
+        "environment": {"scikit-learn": sklearn.__version__, "cpu_count": os.cpu_count(),
+                        "processes": result.get("processes", 1), "threads_per_process": result.get("threads_per_process")},
+    }
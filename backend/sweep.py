@@ -0,0 +1,42 @@
+import argparse
+import json
+from simulation.sweep import CsvResultWriter, run_sweep
+from simulation.storage import ShardWriter
+
+def main():
+    """
+    Runs a headless scenario sweep across a process pool and streams one
+    result row per run to disk.
+    """
+    parser = argparse.ArgumentParser(description="Headless ChainReact scenario sweep.")
+    parser.add_argument("--grid", help="JSON file with agent_configs, demand, target_inventory, holding_cost, stockout_cost, seeds and weeks (defaults fill any missing key)")
+    parser.add_argument("--out", default="sweep_results.csv", help="Where to stream per-run results (a directory for npy/parquet)")
+    parser.add_argument("--format", default="csv", choices=["csv", "npy", "parquet"], help="Result file format")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Runs per batch handed to a worker")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed; per-run seeds derive from it")
+    parser.add_argument("--seeds", type=int, help="Override the number of replicates per grid cell")
+    parser.add_argument("--weeks", type=int, help="Override the number of weeks per run")
+    args = parser.parse_args()
+
+    spec = {}
+    if args.grid:
+        with open(args.grid) as f:
+            spec = json.load(f)
+    if args.seeds is not None:
+        spec["seeds"] = args.seeds
+    if args.weeks is not None:
+        spec["weeks"] = args.weeks
+
+    writer = CsvResultWriter(args.out) if args.format == "csv" else ShardWriter(args.out, format=args.format)
+    try:
+        stats = run_sweep(spec, writer, processes=args.processes, chunk_size=args.chunk_size, base_seed=args.seed)
+    finally:
+        writer.close()
+
+    print(f"\nSweep complete: {stats['runs']} runs, {stats['chain_weeks']:,} chain-weeks in {stats['seconds']:.2f}s "
+          f"({stats['chain_weeks_per_sec']:,.0f} chain-weeks/s on {stats['processes']} processes).")
+    print(f"Results streamed to '{args.out}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+The regression gate in benchmarks/suite.py, on synthetic results.
+
+Run from the backend folder: python -m pytest tests
+"""
+import json
+from benchmarks.suite import compare, direction, main
+
+
+def results(**figures):
+    return {"benchmark_seconds": {key.split(".", 1)[0]: 1.0 for key in figures}, "results": figures}
+
+
+BASELINE = results(**{"engine.weeks_per_sec": 1000.0, "engine.step_ms": 2.0, "engine.weeks": 500})
+
+
+def test_direction():
+    assert direction("weeks_per_sec") == 1
+    assert direction("step_ms") == -1 and direction("snapshot_kb") == -1
+    assert direction("weeks") == 0
+
+
+def test_passes_within_tolerance():
+    current = results(**{"engine.weeks_per_sec": 900.0, "engine.step_ms": 2.2, "engine.weeks": 500})
+    assert compare(current, BASELINE, threshold=0.15) == []
+    assert compare(current, BASELINE, threshold=0.15, strict=True) == []
+
+
+def test_fails_on_throughput_regression():
+    current = results(**{"engine.weeks_per_sec": 800.0, "engine.step_ms": 2.0, "engine.weeks": 500})
+    assert compare(current, BASELINE, threshold=0.15) == ["engine.weeks_per_sec"]
+
+
+def test_latency_only_gates_when_strict():
+    current = results(**{"engine.weeks_per_sec": 1000.0, "engine.step_ms": 3.0, "engine.weeks": 900})
+    assert compare(current, BASELINE, threshold=0.15) == []
+    assert compare(current, BASELINE, threshold=0.15, strict=True) == ["engine.step_ms"]
+
+
+def test_improvements_and_benchmarks_not_run_never_fail():
+    current = results(**{"engine.weeks_per_sec": 5000.0, "engine.step_ms": 0.5, "engine.weeks": 500})
+    baseline = {"results": {**BASELINE["results"], "server.frames_per_sec": 100.0}}
+    assert compare(current, baseline, threshold=0.15, strict=True) == []
+
+
+def test_cli_exit_code(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(BASELINE))
+    for throughput, expected in ((950.0, 0), (500.0, 1)):
+        current_path = tmp_path / "current.json"
+        current_path.write_text(json.dumps(results(**{"engine.weeks_per_sec": throughput, "engine.step_ms": 2.0})))
+        assert main(["--results", str(current_path), "--compare", str(baseline_path)]) == expected
@@ -0,0 +1,39 @@
+"""
+What-if branches forked from a snapshot.
+
+Run from the backend folder: python -m pytest tests
+"""
+import contextlib
+import io
+import pytest
+from simulation.engine import SimulationEngine
+from simulation.snapshot import MAX_DISRUPTIONS, run_branch
+
+
+def snapshot_at(week: int):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=week)
+        for step in range(1, week + 1):
+            engine.run_step(step)
+    return engine.snapshot()
+
+
+def test_disruptions_match_adding_them_one_by_one():
+    snapshot = snapshot_at(20)
+    events = [{"week": 25, "type": "DEMAND_SPIKE", "value": 80, "duration": 3},
+              {"week": 27, "type": "CAPACITY", "tier": "Factory", "value": 5, "duration": 4}]
+    branch = run_branch(snapshot, {"weeks": 15, "disruptions": events})
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = snapshot.restore(35)
+        for event in events:
+            engine.timeline.add(event)
+        for week in range(21, 36):
+            engine.run_step(week)
+    assert branch["total_costs"] == dict(zip([agent.name for agent in engine.agents], engine.metrics.total_cost))
+
+
+def test_rejects_too_many_disruptions():
+    events = [{"week": 21 + n % 10, "type": "DEMAND_SHIFT", "value": 1, "duration": 1} for n in range(MAX_DISRUPTIONS + 1)]
+    with pytest.raises(ValueError, match="disruptions"):
+        run_branch(snapshot_at(20), {"weeks": 10, "disruptions": events})
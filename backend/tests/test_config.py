@@ -0,0 +1,32 @@
+"""
+agent_config validation in agent_spec.
+
+Run from the backend folder: python -m pytest tests
+"""
+import pytest
+from simulation.config import DEFAULT_TARGET_INVENTORY, MAX_TARGET_INVENTORY, agent_spec
+
+
+def test_plain_types_and_objects():
+    assert agent_spec({}, "Retailer")["type"] == "RULE"
+    assert agent_spec({"Retailer": "AI"}, "Retailer")["type"] == "AI"
+    spec = agent_spec({"Retailer": {"type": "AI", "model_version": "v3", "target_inventory": 120}}, "Retailer")
+    assert spec == {"type": "AI", "model_path": None, "model_version": "v3", "target_inventory": 120}
+    assert agent_spec({"Retailer": {}}, "Retailer")["target_inventory"] == DEFAULT_TARGET_INVENTORY
+
+
+@pytest.mark.parametrize("entry", [5, 2.5, None, ["AI"], {"type": 1}, {"model_path": 7}])
+def test_rejects_malformed_entries(entry):
+    with pytest.raises(ValueError, match="Retailer"):
+        agent_spec({"Retailer": entry}, "Retailer")
+
+
+@pytest.mark.parametrize("target", [-1, 3e9, MAX_TARGET_INVENTORY + 1, 10.5, float("nan"), float("inf"), "100", True])
+def test_rejects_target_inventory_out_of_range(target):
+    with pytest.raises(ValueError, match="target_inventory"):
+        agent_spec({"Retailer": {"target_inventory": target}}, "Retailer")
+
+
+def test_rejects_a_config_that_is_not_an_object():
+    with pytest.raises(ValueError):
+        agent_spec(["AI"], "Retailer")
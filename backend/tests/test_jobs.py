@@ -0,0 +1,63 @@
+"""
+Start-message validation in JobScheduler.submit and subscriber pacing.
+
+Run from the backend folder: python -m pytest tests
+"""
+import asyncio
+import pytest
+from simulation.analyst import AnalystPipeline, FakeLLM
+from simulation.jobs import JobScheduler, stream_job
+from simulation.streaming import StreamOptions
+
+
+class NullStore:
+    async def save(self, summary, agents):
+        pass
+
+
+def submit_all(messages, max_weeks: int = 100):
+    async def submit():
+        scheduler = JobScheduler(AnalystPipeline(FakeLLM(latency=0.0)), NullStore(), max_weeks=max_weeks)
+        try:
+            return [scheduler.submit(message).num_weeks for message in messages]
+        finally:
+            await scheduler.close()
+    return asyncio.run(submit())
+
+
+@pytest.mark.parametrize("weeks", [0, -5, 101, 10**9, "many", None])
+def test_rejects_weeks_out_of_range(weeks):
+    with pytest.raises(ValueError, match="weeks"):
+        submit_all([{"weeks": weeks}])
+
+
+def test_accepts_weeks_up_to_the_cap():
+    assert submit_all([{"weeks": 1}, {"weeks": 100}, {}]) == [1, 100, 50]
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.times = []
+
+    async def send_json(self, message):
+        if "week" in message:
+            self.times.append(asyncio.get_running_loop().time())
+
+    async def send_bytes(self, message):
+        pass
+
+
+def test_subscriber_replays_at_its_own_tick():
+    async def replay(tick):
+        scheduler = JobScheduler(AnalystPipeline(FakeLLM(latency=0.0)), NullStore())
+        job = scheduler.submit({"weeks": 6, "stream": {"tick": 0}})
+        while not job.finished:
+            await asyncio.sleep(0.01)
+        socket = RecordingSocket()
+        await stream_job(job, socket, StreamOptions(tick=tick))
+        await scheduler.close()
+        return [b - a for a, b in zip(socket.times, socket.times[1:])]
+
+    gaps = asyncio.run(replay(0.05))
+    assert len(gaps) == 5 and min(gaps) >= 0.045
+    assert max(asyncio.run(replay(0.0))) < 0.045
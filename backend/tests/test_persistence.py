@@ -0,0 +1,39 @@
+"""
+RunStore's write-behind writer on a mongomock stand-in.
+
+Run from the backend folder: python -m pytest tests
+"""
+import asyncio
+import contextlib
+import io
+import pytest
+from simulation.engine import SimulationEngine
+from simulation.persistence import RunStore
+
+pytest.importorskip("mongomock")
+
+
+def finished_agents(num_weeks: int = 10):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = SimulationEngine(agent_config={}, enable_analyst=False, num_weeks=num_weeks)
+    for week in range(1, num_weeks + 1):
+        engine.run_step(week)
+    return engine.agents
+
+
+def test_a_run_that_cannot_be_bucketed_does_not_stop_the_writer():
+    store = RunStore("mongomock://", max_queue=1, flush_interval=0.01)
+    agents = finished_agents()
+
+    async def save_all():
+        store.start()
+        await store.save({"simulation_id": "broken"}, [object()])
+        await store.save({"simulation_id": "first"}, agents)
+        await asyncio.wait_for(store.flush(), 5)
+        await store.save({"simulation_id": "second"}, agents)
+        db = store.db
+        await asyncio.wait_for(store.close(), 5)
+        return sorted(run["simulation_id"] for run in db.simulations.find())
+
+    assert asyncio.run(save_all()) == ["first", "second"]
+    assert store.stats()["saved"] == 2 and store.stats()["failed"] == 1
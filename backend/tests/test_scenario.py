@@ -0,0 +1,53 @@
+"""
+Scenario timelines on engines created without a run length.
+
+Run from the backend folder: python -m pytest tests
+"""
+import contextlib
+import io
+import numpy as np
+from simulation.engine import SimulationEngine
+from simulation.scenario import DEFAULT_SCENARIO, Timeline, compile_scenario
+
+
+def engine(scenario, num_weeks: int = 0) -> SimulationEngine:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return SimulationEngine(agent_config={}, enable_analyst=True, num_weeks=num_weeks, scenario=scenario)
+
+
+def demand(timeline: Timeline, weeks):
+    return [timeline.demand_at(week) for week in weeks]
+
+
+def test_default_scenario_steps_up_without_num_weeks():
+    weeks = [1, 9, 10, 11, 50]
+    assert demand(engine(DEFAULT_SCENARIO).timeline, weeks) == [20, 20, 25, 25, 25]
+    assert demand(engine(DEFAULT_SCENARIO).timeline, weeks) == demand(engine(DEFAULT_SCENARIO, 60).timeline, weeks)
+
+
+def test_step_note_is_emitted_when_the_timeline_grows_past_it():
+    run = engine(DEFAULT_SCENARIO)
+    for week in range(1, 11):
+        run.run_step(week)
+    assert [request["event"] for request in run.analyst_requests] == ["DEMAND_SHIFT"]
+
+
+def test_explicit_demand_list_compiles_in_full():
+    timeline = engine({"demand": [5, 6, 7, 8]}).timeline
+    assert demand(timeline, range(1, 7)) == [5, 6, 7, 8, 8, 8]
+
+
+def test_deterministic_demand_extends_like_a_full_compile():
+    spec = {"demand": {"process": "step", "before": 10, "after": 40, "week": 30},
+            "seasonality": [{"period": 13, "amplitude": 0.3}]}
+    grown = compile_scenario(spec, 0)
+    grown.extend(100)
+    assert np.array_equal(grown.base[:100], compile_scenario(spec, 100).base)
+
+
+def test_extension_survives_a_round_trip():
+    timeline = compile_scenario({"demand": {"process": "uniform", "low": 15, "high": 35}, "seed": 3}, 8)
+    restored = Timeline.from_dict(timeline.to_dict())
+    timeline.extend(40)
+    restored.extend(40)
+    assert np.array_equal(timeline.base, restored.base)
@@ -1,50 +1,177 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.metrics import mean_squared_error, r2_score
 import joblib
+from simulation.model_registry import compiled_model_path, model_metadata_path
+from simulation.compiled_model import compile_model, file_digest
+from simulation.storage import has_shards, read_shards
+from simulation.training import (BinnedDataset, candidates, continue_training, evaluate, model_metadata, search,
+                                 to_raw_thresholds)
 
-def train_model():
+FEATURES = ['inventory', 'backlog', 'demand_trend'] # ADDED demand_trend
+TARGET = 'placed_order'
+
+def load_training_data(data_path='training_data_v2', max_rows=None):
     """
-    Loads the enhanced V2 data, trains a smarter model, and saves it.
+    Loads the training columns from the .npy/Parquet shards written by
+    data_generator.py, memory-mapped so max_rows only reads what it needs.
+    Falls back to the legacy CSV when no shards exist.
     """
-    print("--- Starting V2 Model Training ---")
+    if has_shards(data_path):
+        columns = read_shards(data_path, columns=FEATURES + [TARGET], max_rows=max_rows)
+        X = np.column_stack([columns[name] for name in FEATURES])
+        return pd.DataFrame(X, columns=FEATURES), np.asarray(columns[TARGET])
+    df = pd.read_csv(data_path + '.csv', nrows=max_rows)
+    return df[FEATURES], df[TARGET]
 
-    # 1. Load V2 Data
-    try:
-        df = pd.read_csv('training_data_v2.csv')
-        print(f"Successfully loaded V2 data with {len(df)} records.")
-    except FileNotFoundError:
-        print("Error: 'training_data_v2.csv' not found. Please run data_generator.py first.")
-        return
+def export_compiled_model(model_filename='agent_model.joblib', X_check=None):
+    """
+    Flattens the saved model's trees into NumPy arrays (agent_model.npz) that
+    AIAgent evaluates without importing sklearn, and checks both agree.
+    """
+    model = joblib.load(model_filename)
+    compiled = compile_model(model, source_digest=file_digest(model_filename))
+    compiled_filename = compiled_model_path(model_filename)
+    compiled.save(compiled_filename)
 
-    # 2. Prepare Data with new feature
-    features = ['inventory', 'backlog', 'demand_trend'] # ADDED demand_trend
-    X = df[features]
-    y = df['placed_order']
+    if X_check is not None:
+        max_diff = np.max(np.abs(model.predict(X_check) - compiled.predict(np.asarray(X_check))))
+        print(f"Compiled model max abs difference vs sklearn: {max_diff:.3g}")
+    print(f"Compiled model saved as '{compiled_filename}' ({compiled}).")
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    print(f"Data split into {len(X_train)} training records and {len(X_test)} testing records.")
+def tier_model_path(model_filename, tier):
+    """
+    agent_model_retailer.joblib for the Retailer, so agent_config can pick it
+    with {"type": "AI", "model_version": "retailer"}.
+    """
+    root, ext = os.path.splitext(model_filename)
+    return f"{root}_{tier.lower()}{ext}"
 
-    # 3. Train the Model
-    print("Training smarter Gradient Boosting Regressor model...")
+def train_legacy_model(data_path='training_data_v2', max_rows=None):
+    """
+    The previous single-threaded GradientBoostingRegressor on the same test
+    split, trained only to record its time and accuracy for comparison.
+    """
+    X, y = load_training_data(data_path, max_rows)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    start = time.perf_counter()
     model = GradientBoostingRegressor(n_estimators=150, learning_rate=0.1, max_depth=5, random_state=42)
     model.fit(X_train, y_train)
-    print("Model training complete.")
-
-    # 4. Evaluate the Model
-    print("\n--- V2 Model Evaluation ---")
-    predictions = model.predict(X_test)
-    mse = mean_squared_error(y_test, predictions)
-    r2 = r2_score(y_test, predictions)
-    
-    print(f"Mean Squared Error (MSE): {mse:.2f}")
-    print(f"R-squared (R2 Score): {r2:.2f}")
-
-    # 5. Save the Trained Model (overwrite the old one)
-    model_filename = 'agent_model.joblib'
+    return {"model": "GradientBoostingRegressor", "training_seconds": round(time.perf_counter() - start, 6),
+            "accuracy": evaluate(model, X_test, y_test)}
+
+def load_previous_model(model_filename):
+    metadata_filename = model_metadata_path(model_filename)
+    if not (os.path.exists(model_filename) and os.path.exists(metadata_filename)):
+        return None, None
+    with open(metadata_filename) as f:
+        return joblib.load(model_filename), json.load(f)
+
+def save_trained_model(model, metadata, model_filename, X_check=None):
     joblib.dump(model, model_filename)
-    print(f"\nSmarter model successfully saved as '{model_filename}'.")
+    export_compiled_model(model_filename, X_check)
+    metadata_filename = model_metadata_path(model_filename)
+    with open(metadata_filename, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"Training metadata saved as '{metadata_filename}'.")
+
+def train_model(data_path='training_data_v2', max_rows=None, num_candidates=12, processes=None, per_tier=False,
+                warm_start=False, extra_iter=100, compare_legacy=False, weighting=None, refresh_cache=False,
+                model_filename='agent_model.joblib'):
+    """
+    Trains histogram gradient-boosting models with early stopping on the
+    pre-binned, cached training data: a parallel search over num_candidates
+    parameter sets per model, or with warm_start, more trees on top of the
+    saved models. Saves each model with its compiled export and a metadata
+    JSON recording training time and test accuracy.
+    """
+    print("--- Starting Model Training ---")
+    start = time.perf_counter()
+
+    # 1. Load (or build) the binned cache of the training data
+    try:
+        dataset = BinnedDataset.load(data_path, refresh=refresh_cache)
+    except FileNotFoundError:
+        print(f"Error: '{data_path}' not found. Please run data_generator.py first.")
+        return
+    binning_seconds = time.perf_counter() - start
+    print(f"Loaded {dataset} from '{dataset.directory}' in {binning_seconds:.2f}s.")
+
+    groups = dataset.groups(per_tier)
+    filenames = {group: model_filename if group == 'all' else tier_model_path(model_filename, group) for group in groups}
+
+    # 2. Continue the saved models, where possible
+    results = {}
+    if warm_start:
+        for group in groups:
+            model, metadata = load_previous_model(filenames[group])
+            result = None if model is None else continue_training(dataset, group, model, metadata, extra_iter,
+                                                                  max_rows, weighting)
+            if result is None:
+                print(f"'{filenames[group]}' cannot be warm-started; training it from scratch.")
+            else:
+                results[group] = result
+                print(f"Warm-started '{filenames[group]}': {result['warm_start']['added_iterations']} trees added "
+                      f"to {result['warm_start']['from_iterations']}.")
+
+    # 3. Search for the rest
+    remaining = [group for group in groups if group not in results]
+    if remaining:
+        params_list = candidates(num_candidates)
+        print(f"Searching {len(params_list)} parameter sets for {', '.join(remaining)}...")
+        results.update(search(dataset, remaining, params_list, processes, max_rows, weighting))
+    training_seconds = time.perf_counter() - start - binning_seconds
+    print(f"Model training complete in {training_seconds:.2f}s.")
+
+    legacy = None
+    if compare_legacy:
+        print("Training the previous GradientBoostingRegressor for comparison...")
+        legacy = train_legacy_model(data_path, max_rows)
+
+    # 4. Evaluate and save every model
+    X_check, _ = load_training_data(data_path, max_rows=min(max_rows or 10_000, 10_000))
+    seconds = {"binning": round(binning_seconds, 6), "training": round(training_seconds, 6),
+               "total": round(binning_seconds + training_seconds, 6)}
+    for group in groups:
+        result = results[group]
+        metadata = model_metadata(dataset, group, result, data_path, max_rows, weighting, seconds=seconds)
+        if legacy is not None and group == 'all':
+            metadata["legacy"] = legacy
+
+        accuracy = metadata["accuracy"]
+        print(f"\n--- {group} Model Evaluation ({result['n_iter']} trees, {result['params']}) ---")
+        print(f"Mean Squared Error (MSE): {accuracy['mse']:.2f}")
+        print(f"R-squared (R2 Score): {accuracy['r2']:.2f}")
+        if metadata.get("legacy"):
+            print(f"Previous model: MSE {legacy['accuracy']['mse']:.2f}, R2 {legacy['accuracy']['r2']:.2f}, "
+                  f"trained in {legacy['training_seconds']:.2f}s")
+
+        to_raw_thresholds(result["model"], dataset.edges)
+        save_trained_model(result["model"], metadata, filenames[group], X_check)
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the AI agent model.")
+    parser.add_argument("--data", default="training_data_v2", help="Shard directory (or CSV path without .csv)")
+    parser.add_argument("--max-rows", type=int, default=None, help="Train on the first N rows only")
+    parser.add_argument("--export-only", action="store_true", help="Only re-export agent_model.npz")
+    parser.add_argument("--output", default="agent_model.joblib", help="Model file to write")
+    parser.add_argument("--search", type=int, default=12, help="Parameter sets to try per model")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes for the search (default: all cores)")
+    parser.add_argument("--per-tier", action="store_true", help="Also train one model per tier (agent_model_<tier>.joblib)")
+    parser.add_argument("--warm-start", action="store_true", help="Add trees to the saved models instead of retraining")
+    parser.add_argument("--extra-iter", type=int, default=100, help="Most trees a warm start adds")
+    parser.add_argument("--weight-by-cost", action="store_true", help="Down-weight orders placed in costly weeks")
+    parser.add_argument("--compare-legacy", action="store_true", help="Also time the previous model and record it")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-bin the data instead of using the cache")
+    args = parser.parse_args()
+    if args.export_only:
+        export_compiled_model(args.output)
+    else:
+        train_model(args.data, args.max_rows, args.search, args.processes, args.per_tier, args.warm_start,
+                    args.extra_iter, args.compare_legacy, 'cost' if args.weight_by_cost else None,
+                    args.refresh_cache, args.output)
\ No newline at end of file
@@ -1,5 +1,5 @@
 "use client";
-import { useState, useEffect, useCallback, Dispatch } from 'react';
+import { useState, useEffect, useCallback, useRef, Dispatch } from 'react';
 import useWebSocket, { ReadyState } from 'react-use-websocket';
 
 export interface AgentState {
@@ -19,9 +19,20 @@ export interface AgentData {
   Distributor: AgentState;
   Factory: AgentState;
 }
+// Running per-agent totals the engine keeps as it steps
+export interface AgentMetrics {
+    total_cost: number;
+    holding_cost: number;
+    stockout_cost: number;
+    peak_backlog: number;
+    fill_rate: number;
+    order_variance_ratio: number | null;
+}
+export type MetricsData = Record<keyof AgentData, AgentMetrics>;
 export interface SimulationMessage {
     week: number;
     agents: AgentData;
+    metrics?: MetricsData;
     analysis?: string;
     events?: EventMessage[];
     type?: undefined;
@@ -35,11 +46,18 @@ export interface FinalSummaryMessage {
     title: string;
     summary_text: string;
     total_cost_data: { name: string, cost: number }[];
+    // Built client-side from the weekly frames
     inventory_stability_data: { week: number, inventory: number }[];
     cost_breakdown_data: { name: string, value: number }[];
+    metrics?: MetricsData;
+}
+
+export interface EventsMessage {
+    type: 'events';
+    events: EventMessage[];
 }
 
-type WebSocketMessage = SimulationMessage | SimulationIdMessage | FinalSummaryMessage;
+type WebSocketMessage = SimulationMessage | SimulationIdMessage | FinalSummaryMessage | EventsMessage;
 
 export const useSimulationSocket = () => {
     const SIMULATION_URL = process.env.NEXT_PUBLIC_WEBSOCKET_URL || 'ws://127.0.0.1:8001/ws/simulation';
@@ -54,6 +72,7 @@ export const useSimulationSocket = () => {
     const [dataHistory, setDataHistory] = useState<SimulationMessage[]>([]);
     const [eventHistory, setEventHistory] = useState<EventMessage[]>([]);
     const [summaryData, setSummaryData] = useState<FinalSummaryMessage | null>(null);
+    const inventoryStability = useRef<{ week: number, inventory: number }[]>([]);
 
     const { lastJsonMessage, readyState, sendJsonMessage } = useWebSocket(SIMULATION_URL, {
         shouldReconnect: (_closeEvent) => true,
@@ -66,6 +85,7 @@ export const useSimulationSocket = () => {
         setDataHistory([]); 
         setEventHistory([]);
         setSummaryData(null);
+        inventoryStability.current = [];
         sendJsonMessage({ type: "start_simulation", config: args.config, weeks: args.weeks });
     }, [sendJsonMessage]);
 
@@ -76,9 +96,16 @@ export const useSimulationSocket = () => {
             if (message.type === 'simulation_id') {
                 setSimulationId(message.id);
             } else if (message.type === 'final_summary') {
-                setSummaryData(message);
+                setSummaryData({
+                    ...message,
+                    inventory_stability_data: message.inventory_stability_data ?? inventoryStability.current,
+                });
+            } else if (message.type === 'events') {
+                // Analyst commentary that arrived after the last weekly frame
+                setEventHistory(prev => [...prev, ...message.events]);
             } else if (message.agents) {
                 setDataHistory((prev) => [...prev, message]);
+                inventoryStability.current.push({ week: message.week, inventory: message.agents.Retailer.inventory });
                 if (message.events) {
                     setEventHistory(prev => [...prev, ...message.events!]);
                 }